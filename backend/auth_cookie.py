@@ -16,6 +16,9 @@ from typing import Optional
 from dotenv import load_dotenv
 from pathlib import Path
 
+from config.db import get_db as get_shared_db
+from services.principals import load_principal
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -51,16 +54,8 @@ def set_db_client(client: AsyncIOMotorClient):
 def get_db():
     if not db_client:
         raise HTTPException(500, "Database not initialized")
-    # Extract database name from MONGO_URL or use environment variable
-    db_name = os.getenv("DB_NAME")
-    if not db_name:
-        # Extract from MONGO_URL
-        mongo_url = os.getenv("MONGO_URL", "")
-        if "/" in mongo_url:
-            db_name = mongo_url.split("/")[-1].split("?")[0]
-        else:
-            db_name = "kuryecini"  # fallback
-    return db_client[db_name]
+    # Same database handle as the rest of the app (config/db.py)
+    return get_shared_db()
 
 # Models
 class LoginRequest(BaseModel):
@@ -122,18 +117,13 @@ async def get_current_user_from_cookie_or_bearer(request: Request):
     payload = verify_token(token)
     email = payload["sub"]  # Changed: sub contains email, not user_id
     
-    # Get user from database - import from server.py
-    from server import db
-    user = await db.users.find_one({"email": email})  # Changed: lookup by email
+    # Get user (request-memoized, short-TTL cached)
+    db = get_shared_db()
+    user = await load_principal(db, email, request)
     
     if not user:
         raise HTTPException(404, "User not found")
     
-    # Debug: Check user ID fields
-    print(f"🔍 User document _id: {user.get('_id')}")
-    print(f"🔍 User document id: {user.get('id')}")
-    print(f"🔍 User email: {user.get('email')}")
-    
     # Ensure consistent user ID format - use 'id' field if available, otherwise use '_id'
     if "id" in user and user["id"]:
         # User has custom 'id' field, use it
@@ -241,8 +231,8 @@ async def get_current_user(request: Request):
         email = payload["sub"]
         print(f"🔍 Token verified, email: {email}")
         
-        # Get user from database - import from server.py
-        from server import db
+        # Get user from database
+        db = get_shared_db()
         user = await db.users.find_one({"email": email})
         print(f"🔍 User lookup result: {user is not None}")
         
@@ -320,8 +310,8 @@ async def register(
     import shutil
     from pathlib import Path
     
-    # Import db from server.py
-    from server import db
+    # Shared database handle
+    db = get_shared_db()
     
     # Check if user exists
     existing = await db.users.find_one({"email": email})
@@ -8,6 +8,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 import os
 from models import UserRole
+from config.db import get_db
+from services.principals import load_principal
 from typing import Optional
 
 security = HTTPBearer(auto_error=False)  # Make it optional
@@ -20,15 +22,12 @@ async def get_current_user(
     try:
         # Try cookie first (primary method)
         token = request.cookies.get("access_token")
-        print(f"🔍 AUTH: Cookie token present: {token is not None}")
         
         # Fallback to bearer token if no cookie
         if not token and credentials:
             token = credentials.credentials
-            print(f"🔍 AUTH: Using bearer token")
         
         if not token:
-            print("❌ AUTH: No token found")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Not authenticated - no token provided"
@@ -39,9 +38,9 @@ async def get_current_user(
         
         email = payload.get("sub")
         
-        # Get user from database (no test users)
-        from server import db
-        user = await db.users.find_one({"email": email})
+        # Get user (request-memoized, short-TTL cached; no test users)
+        db = get_db()
+        user = await load_principal(db, email, request)
         
         if not user:
             raise HTTPException(
@@ -9,7 +9,15 @@ from config.cache import (
     cache_set,
     cache_delete,
     cache_exists,
-    get_cache_stats
+    get_cache_stats,
+    async_cache_get,
+    async_cache_get_many,
+    async_cache_set,
+    async_cache_delete,
+    async_cache_get_or_load,
+    get_async_redis,
+    init_async_cache,
+    close_async_cache
 )
 
 __all__ = [
@@ -22,4 +30,12 @@ __all__ = [
     "cache_delete",
     "cache_exists",
     "get_cache_stats",
+    "async_cache_get",
+    "async_cache_get_many",
+    "async_cache_set",
+    "async_cache_delete",
+    "async_cache_get_or_load",
+    "get_async_redis",
+    "init_async_cache",
+    "close_async_cache",
 ]
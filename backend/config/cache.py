@@ -1,10 +1,16 @@
 """
 Cache Layer - Optional Redis with NullCache Fallback
 Safe serialization and configurable TTL
+
+Async API (async_cache_*) adds an in-process TTL/LRU L1 tier in front of Redis
+and single-flight loading for concurrent misses on the same key.
 """
 
-from typing import Optional, Any
+from typing import Optional, Any, Awaitable, Callable, Dict, Iterable, Tuple
+from collections import OrderedDict
+import asyncio
 import json
+import time
 from config.settings import settings
 
 
@@ -111,27 +117,328 @@ def cache_exists(key: str) -> bool:
         return False
 
 
-# Cache statistics (for monitoring)
-def get_cache_stats() -> dict:
-    """Get cache statistics for monitoring"""
-    if isinstance(redis, NullCache):
-        return {
-            "enabled": False,
-            "type": "NullCache"
-        }
+# ---------------------------------------------------------------------------
+# Async cache client (pooled) - for use from async route handlers
+# ---------------------------------------------------------------------------
+
+class _NullPipeline:
+    """Pipeline counterpart of AsyncNullCache - queues nothing"""
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            return self
+        return _queue
+    
+    async def execute(self):
+        return []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class AsyncNullCache:
+    """
+    Async null object for cache
+    Used when Redis is disabled or unreachable
+    """
+    async def get(self, key: str) -> Optional[str]:
+        return None
+    
+    async def mget(self, keys, *args):
+        return [None] * len(keys)
+    
+    async def set(self, key: str, value: str, ex: Optional[int] = None):
+        return True
+    
+    async def delete(self, *keys: str):
+        return 0
+    
+    async def exists(self, *keys: str):
+        return 0
+    
+    async def ping(self):
+        return False
+    
+    def pipeline(self, transaction: bool = False):
+        return _NullPipeline()
+    
+    async def aclose(self):
+        return None
+
+
+def _create_async_redis():
+    """Build the pooled asyncio Redis client (connections are opened lazily)"""
+    if not settings.REDIS_ENABLED:
+        return AsyncNullCache()
+    try:
+        from redis.asyncio import Redis as AsyncRedis, ConnectionPool
+        pool = ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+        return AsyncRedis(connection_pool=pool)
+    except Exception as e:
+        print(f"⚠️ Async Redis client unavailable, using AsyncNullCache: {e}")
+        return AsyncNullCache()
+
+
+async_redis = _create_async_redis()
+
+
+def get_async_redis():
+    """
+    Get the shared async Redis client
+    Always call this instead of importing `async_redis` directly - the client
+    is swapped for AsyncNullCache if Redis turns out to be unreachable.
+    """
+    return async_redis
+
+
+async def init_async_cache() -> bool:
+    """Verify the async Redis connection on startup, fall back to AsyncNullCache"""
+    global async_redis
+    if isinstance(async_redis, AsyncNullCache):
+        return False
+    try:
+        await async_redis.ping()
+        print(f"✅ Async Redis pool ready: {settings.REDIS_URL} (max {settings.REDIS_MAX_CONNECTIONS} connections)")
+        return True
+    except Exception as e:
+        print(f"⚠️ Async Redis connection failed, using AsyncNullCache: {e}")
+        client, async_redis = async_redis, AsyncNullCache()
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+        return False
+
+
+async def close_async_cache():
+    """Release pooled connections on shutdown"""
+    try:
+        await async_redis.aclose()
+    except Exception as e:
+        print(f"⚠️ Async Redis close error: {e}")
+
+
+# ---------------------------------------------------------------------------
+# L1 (in-process) tier + async cache API
+# ---------------------------------------------------------------------------
+
+class LocalCache:
+    """
+    In-process TTL + LRU cache
+    Values are stored as-is (not copied) - callers must treat them as read-only
+    """
+    def __init__(self, max_entries: int, max_ttl_s: int):
+        self.max_entries = max_entries
+        self.max_ttl_s = max_ttl_s
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value) - refreshes LRU position on hit"""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = min(ttl or self.max_ttl_s, self.max_ttl_s)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    
+    def delete(self, key: str) -> bool:
+        return self._data.pop(key, None) is not None
+    
+    def clear(self):
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+local_cache = LocalCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_MAX_TTL_S)
+
+_stats: Dict[str, int] = {
+    "l1_hits": 0,
+    "l2_hits": 0,
+    "misses": 0,
+    "sets": 0,
+    "loads": 0,
+    "coalesced": 0,
+    "errors": 0,
+}
+
+# key -> Future of the load currently in flight (single-flight)
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def async_cache_get(key: str) -> Optional[Any]:
+    """
+    Get value from L1, then Redis (populating L1 on an L2 hit)
+    Returns deserialized object or None
+    """
+    found, value = local_cache.get(key)
+    if found:
+        _stats["l1_hits"] += 1
+        return value
+    
+    try:
+        raw = await get_async_redis().get(key)
+    except Exception as e:
+        _stats["errors"] += 1
+        print(f"⚠️ Async cache get error for key {key}: {e}")
+        raw = None
+    
+    if raw is None:
+        _stats["misses"] += 1
+        return None
+    
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    value = _deserializer(raw)
+    if value is None:
+        _stats["misses"] += 1
+        return None
+    
+    _stats["l2_hits"] += 1
+    local_cache.set(key, value)
+    return value
+
+
+async def async_cache_get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    {key: value} for the keys found - L1 first, then one Redis MGET for the rest
+    Lets batch loaders share entries across workers without a round trip per key.
+    """
+    found: Dict[str, Any] = {}
+    remote = []
+    for key in dict.fromkeys(keys):
+        hit, value = local_cache.get(key)
+        if hit:
+            _stats["l1_hits"] += 1
+            found[key] = value
+        else:
+            remote.append(key)
+    if not remote:
+        return found
     
     try:
-        info = redis.info("stats")
-        return {
-            "enabled": True,
-            "type": "Redis",
-            "hits": info.get("keyspace_hits", 0),
-            "misses": info.get("keyspace_misses", 0),
-            "hit_ratio": info.get("keyspace_hits", 0) / max(info.get("keyspace_hits", 0) + info.get("keyspace_misses", 1), 1)
-        }
+        raws = await get_async_redis().mget(remote)
     except Exception as e:
-        return {
-            "enabled": True,
-            "type": "Redis",
-            "error": str(e)
-        }
+        _stats["errors"] += 1
+        print(f"⚠️ Async cache mget error for {len(remote)} keys: {e}")
+        raws = [None] * len(remote)
+    
+    for key, raw in zip(remote, raws):
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        value = _deserializer(raw) if raw is not None else None
+        if value is None:
+            _stats["misses"] += 1
+            continue
+        _stats["l2_hits"] += 1
+        local_cache.set(key, value)
+        found[key] = value
+    return found
+
+
+async def async_cache_set(key: str, value: Any, ttl: Optional[int] = None) -> bool:
+    """Set value in L1 and Redis"""
+    ttl = ttl or settings.CACHE_DEFAULT_TTL_S
+    local_cache.set(key, value, ttl)
+    _stats["sets"] += 1
+    try:
+        return bool(await get_async_redis().set(key, _serializer(value), ex=ttl))
+    except Exception as e:
+        _stats["errors"] += 1
+        print(f"⚠️ Async cache set error for key {key}: {e}")
+        return False
+
+
+async def async_cache_delete(key: str) -> bool:
+    """Delete key from L1 and Redis"""
+    removed = local_cache.delete(key)
+    try:
+        return (await get_async_redis().delete(key)) > 0 or removed
+    except Exception as e:
+        _stats["errors"] += 1
+        print(f"⚠️ Async cache delete error for key {key}: {e}")
+        return removed
+
+
+async def async_cache_get_or_load(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: Optional[int] = None
+) -> Any:
+    """
+    Read-through helper
+    On a miss only one caller per key runs `loader`; concurrent callers for the
+    same key await that result instead of hitting the database again.
+    None results are returned but not cached.
+    """
+    value = await async_cache_get(key)
+    if value is not None:
+        return value
+    
+    pending = _inflight.get(key)
+    if pending is not None:
+        _stats["coalesced"] += 1
+        return await asyncio.shield(pending)
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        _stats["loads"] += 1
+        value = await loader()
+        if value is not None:
+            await async_cache_set(key, value, ttl)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+def get_cache_stats() -> dict:
+    """Get cache statistics for monitoring (L1 + Redis tier counters)"""
+    lookups = _stats["l1_hits"] + _stats["l2_hits"] + _stats["misses"]
+    hits = _stats["l1_hits"] + _stats["l2_hits"]
+    backend = get_async_redis()
+    return {
+        "enabled": not isinstance(backend, AsyncNullCache),
+        "type": "NullCache" if isinstance(backend, AsyncNullCache) else "Redis",
+        **_stats,
+        "hits": hits,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+        "l1_size": len(local_cache),
+        "l1_max_entries": local_cache.max_entries,
+        "l1_evictions": local_cache.evictions,
+        "l1_expirations": local_cache.expirations,
+        "inflight_loads": len(_inflight),
+    }
@@ -1,11 +1,28 @@
 """
-Database Configuration - Environment-based with Timeout Parameters
-Eliminates hardcoded MongoDB URLs
+Database Configuration - one MongoDB client per worker
+Every module shares this client (and its connection pool). Workloads get
+database handles with their own read preference / write concern:
+  default - primary reads, configured write concern (orders, CAS updates)
+  hot     - primary reads, light write concern for high-volume, loss-tolerant writes
+  reports   - secondary reads (bounded staleness) for analytics / reporting
+  discovery - secondary reads (bounded staleness) for public restaurant/menu listings
+Order creation, claims and CAS updates stay on the default (primary) handle.
+Routes take a handle via FastAPI dependencies (Depends(get_db), ...).
 """
 
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
 from urllib.parse import urlparse, urlencode, urlunparse, parse_qs
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.read_preferences import (
+    Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+)
+from pymongo.write_concern import WriteConcern
+
 from config.settings import settings
 
 
@@ -16,27 +33,27 @@ def _add_connection_params(url: str) -> str:
     """
     parsed = urlparse(url)
     query_params = parse_qs(parsed.query)
-    
+
     # Add or update parameters
     params = {
         "appname": settings.APP_NAME,
         "connectTimeoutMS": str(settings.DB_CONNECT_TIMEOUT_MS),
         "serverSelectionTimeoutMS": str(settings.DB_SERVER_SELECTION_TIMEOUT_MS),
     }
-    
+
     # Merge with existing params (don't override if already set)
     for key, value in params.items():
         if key.lower() not in [k.lower() for k in query_params.keys()]:
             query_params[key] = [value]
-    
+
     # Rebuild query string
     query_items = []
     for key, values in query_params.items():
         for value in values:
             query_items.append(f"{key}={value}")
-    
+
     new_query = "&".join(query_items)
-    
+
     # Rebuild URL
     return urlunparse((
         parsed.scheme,
@@ -48,28 +65,203 @@ def _add_connection_params(url: str) -> str:
     ))
 
 
-# Get URL from environment (never hardcoded)
-DATABASE_URL = _add_connection_params(settings.DATABASE_URL)
+def _is_atlas(url: str) -> bool:
+    return "mongodb+srv://" in url or "mongodb.net" in url
+
+
+def _database_name(url: str) -> str:
+    """Database name from the MONGO_URL path, else 'kuryecini'"""
+    path = urlparse(url).path
+    if path and len(path) > 1:
+        return path.lstrip("/").split("?")[0]
+    return "kuryecini"
+
+
+def _write_concern(value: str) -> Optional[WriteConcern]:
+    if not value:
+        return None
+    return WriteConcern(w=int(value) if value.isdigit() else value)
+
+
+_READ_PREFERENCES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+# Server-side floor for maxStalenessSeconds
+MIN_MAX_STALENESS_S = 90
+
+
+def read_preference(name: str, max_staleness: int = -1):
+    """
+    Read preference by name; max_staleness (seconds, -1/0 = no limit) drops
+    secondaries lagging the primary by more than that (ignored for primary)
+    """
+    try:
+        mode = _READ_PREFERENCES[name.replace("_", "").lower()]
+    except KeyError:
+        raise ValueError(f"Unknown read preference: {name}")
+    if mode is Primary or max_staleness is None or max_staleness <= 0:
+        return mode()
+    if max_staleness < MIN_MAX_STALENESS_S:
+        raise ValueError(f"max staleness must be -1 or >= {MIN_MAX_STALENESS_S}s, got {max_staleness}")
+    return mode(max_staleness=max_staleness)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters per server (pymongo CMAP events)
+    Events arrive on driver threads, so updates take a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def _add(self, address, field: str, value: float = 1):
+        with self._lock:
+            server = self._servers[f"{address[0]}:{address[1]}"]
+            server[field] += value
+            if field == "checked_out":
+                server["max_checked_out"] = max(server["max_checked_out"], server["checked_out"])
+
+    def pool_created(self, event):
+        self._add(event.address, "pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add(event.address, "pools_cleared")
+
+    def pool_closed(self, event):
+        pass
 
-# Create MongoDB client with configured parameters
-client = AsyncIOMotorClient(DATABASE_URL)
+    def connection_created(self, event):
+        self._add(event.address, "open")
+        self._add(event.address, "created")
 
-# Get database (extract name from URL or use default)
-def get_database():
-    """Get database instance from client"""
-    # Try to get default database from URL
-    db = client.get_default_database()
-    if db is not None:
-        return db
-    
-    # Extract database name from URL
-    parsed = urlparse(settings.DATABASE_URL)
-    if parsed.path and len(parsed.path) > 1:
-        db_name = parsed.path.lstrip("/").split("?")[0]
-        return client[db_name]
-    
-    # Fallback to app name
-    return client[settings.APP_NAME]
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(event.address, "open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add(event.address, "waiting")
+
+    def connection_check_out_failed(self, event):
+        self._add(event.address, "waiting", -1)
+        self._add(event.address, f"check_out_failed_{event.reason}")
+
+    def connection_checked_out(self, event):
+        self._add(event.address, "waiting", -1)
+        self._add(event.address, "checked_out")
+        self._add(event.address, "check_outs")
+        duration = getattr(event, "duration", None)  # pymongo >= 4.7
+        if duration is not None:
+            self._add(event.address, "check_out_wait_s", duration)
+
+    def connection_checked_in(self, event):
+        self._add(event.address, "checked_out", -1)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {address: dict(counters) for address, counters in self._servers.items()}
+
+
+def _client_options(url: str) -> Dict:
+    options = {
+        "maxPoolSize": settings.DB_MAX_POOL_SIZE,
+        "minPoolSize": settings.DB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.DB_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.DB_WAIT_QUEUE_TIMEOUT_MS,
+        "event_listeners": [pool_metrics],
+    }
+    if _is_atlas(url):
+        import certifi
+        options.update(
+            tls=True,
+            tlsCAFile=certifi.where(),
+            tlsAllowInvalidHostnames=True,
+            tlsAllowInvalidCertificates=True,
+            serverSelectionTimeoutMS=10000,
+            socketTimeoutMS=30000,
+            connectTimeoutMS=30000,
+            retryWrites=True,
+            w="majority"
+        )
+    if settings.DB_WRITE_CONCERN:
+        value = settings.DB_WRITE_CONCERN
+        options["w"] = int(value) if value.isdigit() else value
+    return options
+
+
+# MONGO_URL is what deployments set; DATABASE_URL (settings) is the local default
+MONGO_URL = os.getenv("MONGO_URL") or settings.DATABASE_URL
+DATABASE_URL = _add_connection_params(MONGO_URL)
+DB_NAME = _database_name(MONGO_URL)
+
+pool_metrics = PoolMetrics()
+
+# The one MongoDB client for this worker
+client = AsyncIOMotorClient(DATABASE_URL, **_client_options(MONGO_URL))
+
+db = client[DB_NAME]
+
+_workloads: Dict[str, AsyncIOMotorDatabase] = {
+    "default": db,
+    "hot": client.get_database(DB_NAME, write_concern=_write_concern(settings.DB_HOT_WRITE_CONCERN)),
+    "reports": client.get_database(DB_NAME, read_preference=read_preference(
+        settings.DB_REPORTS_READ_PREFERENCE, settings.DB_REPORTS_MAX_STALENESS_S
+    )),
+    "discovery": client.get_database(DB_NAME, read_preference=read_preference(
+        settings.DB_DISCOVERY_READ_PREFERENCE, settings.DB_DISCOVERY_MAX_STALENESS_S
+    )),
+}
+
+
+def get_database(workload: str = "default") -> AsyncIOMotorDatabase:
+    """Database handle for a workload (see module docstring)"""
+    return _workloads[workload]
+
+
+# FastAPI dependencies
+def get_db() -> AsyncIOMotorDatabase:
+    return _workloads["default"]
+
+
+def get_hot_db() -> AsyncIOMotorDatabase:
+    return _workloads["hot"]
+
+
+def get_reports_db() -> AsyncIOMotorDatabase:
+    return _workloads["reports"]
+
+
+def get_discovery_db() -> AsyncIOMotorDatabase:
+    return _workloads["discovery"]
+
+
+def get_pool_stats() -> Dict:
+    return {
+        "max_pool_size": settings.DB_MAX_POOL_SIZE,
+        "min_pool_size": settings.DB_MIN_POOL_SIZE,
+        "workloads": {
+            name: {
+                "read_preference": handle.read_preference.mongos_mode,
+                "max_staleness_s": handle.read_preference.max_staleness,
+                "write_concern": handle.write_concern.document or "server default"
+            }
+            for name, handle in _workloads.items()
+        },
+        "servers": pool_metrics.snapshot()
+    }
 
 
-db = get_database()
+def close_client():
+    client.close()
@@ -4,12 +4,20 @@ Replaces hardcoded values with environment variables
 """
 
 import os
+from pathlib import Path
+
+from dotenv import load_dotenv
 from pydantic import Field
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
     from pydantic import BaseSettings
 
+# backend/.env must be in os.environ before anything reads it: config.db builds
+# the shared client at import time, which is before server.py's own load_dotenv
+# (existing environment variables still win)
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
 
 class Settings(BaseSettings):
     """Application settings from environment"""
@@ -32,6 +40,46 @@ class Settings(BaseSettings):
         default="kuryecini",
         description="Application name for MongoDB connection"
     )
+    DB_MAX_POOL_SIZE: int = Field(
+        default=100,
+        description="Max MongoDB connections per worker (shared by all workloads)"
+    )
+    DB_MIN_POOL_SIZE: int = Field(
+        default=0,
+        description="Connections kept open per server even when idle"
+    )
+    DB_MAX_IDLE_TIME_MS: int = Field(
+        default=300000,
+        description="Idle pooled connections are closed after this long"
+    )
+    DB_WAIT_QUEUE_TIMEOUT_MS: int = Field(
+        default=5000,
+        description="How long a request waits for a free pooled connection before failing"
+    )
+    DB_WRITE_CONCERN: str = Field(
+        default="",
+        description="Default write concern ('majority', '1', ...); empty keeps the URL/server default"
+    )
+    DB_HOT_WRITE_CONCERN: str = Field(
+        default="1",
+        description="Write concern for high-volume, loss-tolerant writes (GPS history, telemetry)"
+    )
+    DB_REPORTS_READ_PREFERENCE: str = Field(
+        default="secondaryPreferred",
+        description="Read preference for reporting/analytics queries (primary, primaryPreferred, secondaryPreferred, ...)"
+    )
+    DB_REPORTS_MAX_STALENESS_S: int = Field(
+        default=120,
+        description="Max replication lag (seconds) of secondaries serving reports; -1 = no limit, minimum 90"
+    )
+    DB_DISCOVERY_READ_PREFERENCE: str = Field(
+        default="secondaryPreferred",
+        description="Read preference for public discovery reads (restaurant lists, nearby, public menus)"
+    )
+    DB_DISCOVERY_MAX_STALENESS_S: int = Field(
+        default=90,
+        description="Max replication lag (seconds) of secondaries serving discovery; -1 = no limit, minimum 90"
+    )
     
     # Redis/Cache Configuration
     REDIS_ENABLED: bool = Field(
@@ -46,6 +94,124 @@ class Settings(BaseSettings):
         default=60,
         description="Default cache TTL in seconds"
     )
+    CACHE_L1_MAX_ENTRIES: int = Field(
+        default=10000,
+        description="Max entries in the in-process (L1) cache per worker"
+    )
+    CACHE_L1_MAX_TTL_S: int = Field(
+        default=30,
+        description="Upper bound for L1 entry lifetime (bounds cross-worker staleness)"
+    )
+    REDIS_MAX_CONNECTIONS: int = Field(
+        default=50,
+        description="Max pooled connections for the async Redis client (per worker)"
+    )
+    
+    # Real-time Event Bus
+    EVENT_BUS_BACKEND: str = Field(
+        default="memory",
+        description="Event bus transport: 'memory' (single process) or 'redis' (pub/sub across workers)"
+    )
+    EVENT_BUS_CHANNEL_PREFIX: str = Field(
+        default="kuryecini:events:",
+        description="Redis pub/sub channel prefix for event bus topics"
+    )
+    WS_SEND_TIMEOUT_S: float = Field(
+        default=2.0,
+        description="Per-socket send timeout for WebSocket broadcasts; slower clients are evicted"
+    )
+    READY_ORDERS_GEOHASH_PRECISION: int = Field(
+        default=5,
+        description="Geohash length for courier ready-order subscriptions (5 ~ 4.9km cells, neighbours included)"
+    )
+    
+    # Authenticated principals
+    AUTH_PRINCIPAL_CACHE_TTL_S: int = Field(
+        default=30,
+        description="How long a token subject's user document is reused by auth dependencies (per worker)"
+    )
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(
+        default=10000,
+        description="Max principals held in the per-worker auth cache"
+    )
+    
+    # User summaries (order listings)
+    USER_SUMMARY_CACHE_TTL_S: int = Field(
+        default=15,
+        description="How long a user's name/phone summary is reused by order listings (L1 + Redis)"
+    )
+    
+    # Public menu catalog snapshots (/menus, /menus/public)
+    MENU_CATALOG_CACHE_TTL_S: float = Field(
+        default=5.0,
+        description="How long a worker serves its copy of a catalog snapshot before checking the stored ETag"
+    )
+    MENU_CATALOG_REFRESH_DELAY_S: float = Field(
+        default=0.5,
+        description="Debounce before rebuilding snapshots after menu/business writes (bursts rebuild once)"
+    )
+    MENU_CATALOG_REBUILD_INTERVAL_S: float = Field(
+        default=900.0,
+        description="Full catalog rebuild interval (picks up writes made outside the refresh hooks)"
+    )
+    
+    # Per-business menu responses (public menu endpoints)
+    MENU_CACHE_TTL_S: int = Field(
+        default=600,
+        description="How long a serialized menu response is kept in Redis (keyed by menu version; L1 is capped at CACHE_L1_MAX_TTL_S)"
+    )
+    MENU_VERSION_CACHE_TTL_S: float = Field(
+        default=2.0,
+        description="How long a worker reuses a business's menu version before re-reading it"
+    )
+    
+    # Nearby business discovery (customer home screen)
+    NEARBY_CACHE_TTL_S: int = Field(
+        default=30,
+        description="How long a discovery page is reused for the same geohash cell and radius (L1 + Redis)"
+    )
+    NEARBY_GEOHASH_PRECISION: int = Field(
+        default=7,
+        description="Geohash length of the shared search cell (7 ~ 153m x 153m)"
+    )
+    NEARBY_PAGE_SIZE: int = Field(
+        default=20,
+        description="Default number of businesses per discovery page"
+    )
+    NEARBY_MAX_PAGE_SIZE: int = Field(
+        default=50,
+        description="Largest discovery page a client may request"
+    )
+
+    # Restaurant search (GET /restaurants)
+    RESTAURANT_SEARCH_REINDEX_INTERVAL_S: float = Field(
+        default=300.0,
+        description="How often businesses with new or changed name/cuisine/coordinates get search fields"
+    )
+
+    # Order codes
+    ORDER_CODE_BLOCK_SIZE: int = Field(
+        default=50,
+        description="Order-code sequence numbers a worker reserves per counter round trip"
+    )
+    
+    # Courier Location History
+    COURIER_LOCATION_HISTORY_TTL_S: int = Field(
+        default=86400,
+        description="How long GPS points are kept in courier_locations (TTL index)"
+    )
+    COURIER_LOCATION_FLUSH_INTERVAL_S: float = Field(
+        default=2.0,
+        description="Max time a GPS point waits in the write-behind buffer"
+    )
+    COURIER_LOCATION_FLUSH_BATCH: int = Field(
+        default=500,
+        description="Pending GPS points that trigger an immediate insert_many"
+    )
+    COURIER_LOCATION_BUFFER_MAX: int = Field(
+        default=20000,
+        description="Max buffered GPS points per worker (oldest dropped beyond this)"
+    )
     
     # Performance Monitoring
     PERF_P95_TARGET_MS: int = Field(
@@ -0,0 +1,331 @@
+"""
+Shared in-memory Motor stand-in for the unit tests (no MongoDB required)
+The fake_db fixture hands out collections by attribute or item access. Each
+collection keeps plain dict documents in .docs, counts calls per method in
+.calls, records find/find_one filters in .queries and covers the query and
+update shapes the services use. $expr is evaluated by the collection's .expr
+callable, which a test sets to the Python equivalent of the expression; it
+is called with the document and the expression.
+"""
+
+import copy
+from collections import Counter
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def _lookup(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _set_path(doc, path, value):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[leaf] = value
+
+
+def _unset_path(doc, path):
+    *parents, leaf = path.split(".")
+    parent = _lookup(doc, ".".join(parents)) if parents else doc
+    if isinstance(parent, dict):
+        parent.pop(leaf, None)
+
+
+def _compare(value, op, arg):
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {"$gt": value > arg, "$gte": value >= arg, "$lt": value < arg, "$lte": value <= arg}[op]
+    except TypeError:
+        return False
+
+
+def _match_value(value, condition):
+    if not (isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)):
+        # Missing fields compare equal to null, as in MongoDB
+        return (None if value is _MISSING else value) == condition
+    plain = None if value is _MISSING else value
+    for op, arg in condition.items():
+        if op == "$exists":
+            ok = (value is not _MISSING) == bool(arg)
+        elif op == "$in":
+            ok = plain in arg
+        elif op == "$nin":
+            ok = plain not in arg
+        elif op == "$ne":
+            ok = plain != arg
+        elif op == "$not":
+            ok = not _match_value(value, arg)
+        elif op == "$type":
+            assert arg == "number", arg
+            ok = isinstance(plain, (int, float)) and not isinstance(plain, bool)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = _compare(value, op, arg)
+        else:
+            raise NotImplementedError(f"fake_db does not support {op}")
+        if not ok:
+            return False
+    return True
+
+
+def _resolve(expression, doc):
+    # Aggregation-style update values: "$field" references, nested dicts/lists
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _lookup(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        return {k: _resolve(v, doc) for k, v in expression.items()}
+    if isinstance(expression, list):
+        return [_resolve(v, doc) for v in expression]
+    return expression
+
+
+def _sort_key(value):
+    # Missing / null fields sort first, as in MongoDB
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+
+class FakeResult:
+    def __init__(self, matched=0, modified=0, upserted_id=None, deleted=0, inserted_id=None):
+        self.matched_count = matched
+        self.modified_count = modified
+        self.upserted_id = upserted_id
+        self.deleted_count = deleted
+        self.inserted_id = inserted_id
+
+
+class FakeCursor:
+    def __init__(self, docs, on_load=None):
+        self.docs = docs
+        self.on_load = on_load
+
+    def sort(self, key, direction=1):
+        keys = [(key, direction)] if isinstance(key, str) else list(key)
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda d: _sort_key(_lookup(d, field)), reverse=order < 0)
+        return self
+
+    def skip(self, count):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    def _load(self):
+        if self.on_load:
+            self.on_load()
+            self.on_load = None
+        return self.docs
+
+    async def to_list(self, length=None):
+        return self._load()[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._load())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.calls = Counter()
+        self.queries = []
+        self.pipelines = []
+        self.expr = None
+        # Hooks: called when a find() cursor is first read / writes that raise first
+        self.on_load = None
+        self.fail_times = 0
+
+    def _call(self, method):
+        self.calls[method] += 1
+
+    def _write(self, method):
+        self._call(method)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("primary stepped down")
+
+    def _matches(self, doc, query):
+        for key, condition in (query or {}).items():
+            if key == "$or":
+                ok = any(self._matches(doc, clause) for clause in condition)
+            elif key == "$and":
+                ok = all(self._matches(doc, clause) for clause in condition)
+            elif key == "$expr":
+                ok = self.expr(doc, condition)
+            else:
+                ok = _match_value(_lookup(doc, key), condition)
+            if not ok:
+                return False
+        return True
+
+    def _first(self, query):
+        return next((d for d in self.docs if self._matches(d, query)), None)
+
+    def _upsert_doc(self, query):
+        doc = {}
+        for key, value in query.items():
+            if not key.startswith("$") and not isinstance(value, dict):
+                _set_path(doc, key, value)
+        self.docs.append(doc)
+        return doc
+
+    def _apply(self, doc, update, inserted=False):
+        if isinstance(update, list):
+            for stage in update:
+                for path, value in _resolve(stage.get("$set", {}), doc).items():
+                    _set_path(doc, path, value)
+            return
+        if inserted:
+            for path, value in update.get("$setOnInsert", {}).items():
+                _set_path(doc, path, value)
+        for path, value in update.get("$set", {}).items():
+            _set_path(doc, path, value)
+        for path, value in update.get("$inc", {}).items():
+            current = _lookup(doc, path)
+            _set_path(doc, path, (0 if current is _MISSING else current) + value)
+        for path in update.get("$unset", {}):
+            _unset_path(doc, path)
+
+    def find(self, query=None, projection=None):
+        self._call("find")
+        self.queries.append(query or {})
+        docs = [copy.deepcopy(d) for d in self.docs if self._matches(d, query)]
+        return FakeCursor(docs, self.on_load)
+
+    async def find_one(self, query=None, projection=None):
+        self._call("find_one")
+        self.queries.append(query or {})
+        doc = self._first(query)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    async def count_documents(self, query):
+        self._call("count_documents")
+        return sum(1 for d in self.docs if self._matches(d, query))
+
+    def aggregate(self, pipeline):
+        # Stored documents stand in for the pipeline's output rows
+        self._call("aggregate")
+        self.pipelines.append(pipeline)
+        return FakeCursor([copy.deepcopy(d) for d in self.docs])
+
+    async def insert_one(self, doc):
+        self._write("insert_one")
+        self._insert([doc])
+        return FakeResult(inserted_id=doc.get("_id"))
+
+    async def insert_many(self, docs, ordered=True):
+        self._write("insert_many")
+        self._insert(docs)
+
+    def _insert(self, docs):
+        for doc in docs:
+            if "_id" in doc and any(d.get("_id") == doc["_id"] for d in self.docs):
+                raise DuplicateKeyError(f"duplicate _id {doc['_id']}")
+            self.docs.append(copy.deepcopy(doc))
+
+    async def update_one(self, query, update, upsert=False):
+        self._write("update_one")
+        doc = self._first(query)
+        if doc is None:
+            if not upsert:
+                return FakeResult()
+            doc = self._upsert_doc(query)
+            self._apply(doc, update, inserted=True)
+            return FakeResult(upserted_id=doc.get("_id", len(self.docs)))
+        self._apply(doc, update)
+        return FakeResult(matched=1, modified=1)
+
+    async def update_many(self, query, update, upsert=False):
+        self._write("update_many")
+        docs = [d for d in self.docs if self._matches(d, query)]
+        for doc in docs:
+            self._apply(doc, update)
+        return FakeResult(matched=len(docs), modified=len(docs))
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=False):
+        self._write("find_one_and_update")
+        doc = self._first(query)
+        before = copy.deepcopy(doc)
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self._upsert_doc(query)
+            self._apply(doc, update, inserted=True)
+        else:
+            self._apply(doc, update)
+        # ReturnDocument.AFTER is True
+        return copy.deepcopy(doc) if return_document else before
+
+    async def find_one_and_replace(self, query, replacement, projection=None, upsert=False):
+        self._write("find_one_and_replace")
+        old = self._first(query)
+        if old is not None:
+            self.docs.remove(old)
+        if old is not None or upsert:
+            self.docs.append(copy.deepcopy(replacement))
+        return old
+
+    async def find_one_and_delete(self, query, projection=None):
+        self._write("find_one_and_delete")
+        old = self._first(query)
+        if old is not None:
+            self.docs.remove(old)
+        return old
+
+    async def delete_one(self, query):
+        self._write("delete_one")
+        doc = self._first(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return FakeResult(deleted=int(doc is not None))
+
+    async def delete_many(self, query):
+        self._write("delete_many")
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not self._matches(d, query)]
+        return FakeResult(deleted=before - len(self.docs))
+
+    async def bulk_write(self, requests, ordered=True):
+        self._write("bulk_write")
+        for request in requests:
+            doc = self._first(request._filter)
+            if doc is None and request._upsert:
+                doc = self._upsert_doc(request._filter)
+            if doc is not None:
+                self._apply(doc, request._doc)
+
+
+class FakeDB:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDB()
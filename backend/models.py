@@ -144,9 +144,9 @@ INDEXES = {
         {"courier_id": 1, "status": 1}
     ],
     "courier_locations": [
-        {"courier_id": 1, "ts": -1},  # Latest first
-        {"point": "2dsphere"},  # Geospatial queries
-        {"created_at": -1}  # TTL index potential
+        {"courier_id": 1, "timestamp": -1},  # Latest first / history reads
+        {"location": "2dsphere"},  # Geospatial queries
+        # created_at TTL index: services.courier_locations.ensure_location_history_indexes
     ],
     "earnings": [
         {"courier_id": 1},
@@ -0,0 +1,66 @@
+"""
+Concurrent WebSocket fan-out helpers
+Serialize once, send to every socket in parallel with a per-send timeout and
+report the sockets that failed or were too slow, so callers can evict them
+instead of letting one slow mobile client delay everyone on the channel.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+from fastapi import WebSocket
+
+# Close code for evicted slow consumers ("try again later" - clients reconnect)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def _send_timeout() -> float:
+    from config.settings import settings
+    return settings.WS_SEND_TIMEOUT_S
+
+
+def serialize(message: Dict[str, Any]) -> str:
+    """Encode a message once for all recipients (same format as send_json)"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+async def send_text(websocket: WebSocket, text: str, timeout: float = None) -> bool:
+    """Send pre-serialized text to one socket; False if it failed or timed out"""
+    try:
+        await asyncio.wait_for(websocket.send_text(text), timeout=timeout or _send_timeout())
+        return True
+    except Exception:
+        # Timeout, closed socket or transport error - caller evicts it
+        return False
+
+
+async def broadcast_text(
+    targets: Iterable[Tuple[Hashable, WebSocket]],
+    text: str,
+    timeout: float = None
+) -> List[Hashable]:
+    """
+    Send text to all (key, websocket) targets concurrently
+    Returns the keys whose send failed or exceeded the timeout.
+    """
+    targets = list(targets)
+    if not targets:
+        return []
+    timeout = timeout or _send_timeout()
+    results = await asyncio.gather(*(send_text(ws, text, timeout) for _, ws in targets))
+    return [key for (key, _), ok in zip(targets, results) if not ok]
+
+
+async def evict(websocket: WebSocket, reason: str = "Slow consumer", timeout: float = 1.0):
+    """Best-effort close of a failed/slow socket (never blocks the broadcaster for long)"""
+    try:
+        await asyncio.wait_for(
+            websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason=reason),
+            timeout=timeout
+        )
+    except Exception:
+        pass
+
+
+async def evict_all(websockets: Iterable[WebSocket], reason: str = "Slow consumer"):
+    await asyncio.gather(*(evict(ws, reason) for ws in websockets))
@@ -0,0 +1,168 @@
+"""
+In-process index: courier_id -> active order ids
+Lets courier location fan-out find the order tracking channels to notify
+without querying orders on every GPS ping.
+
+Kept current by the courier status transitions (claim / accept / pickup /
+deliver / status PATCH), rebuilt from MongoDB on startup and re-synced
+periodically to pick up transitions made by legacy endpoints. Transitions
+are also published on the event bus so the other workers apply them too
+(with the in-memory bus only this worker sees them; the others catch up at
+the next re-sync).
+"""
+import asyncio
+from typing import Dict, Optional, Set
+
+# Statuses in which customers/businesses track the courier's position
+ACTIVE_COURIER_STATUSES = {"courier_assigned", "assigned", "picked_up", "delivering"}
+
+# Event bus topic carrying index updates between workers
+TOPIC = "courier_orders:index"
+
+
+def _order_courier(order: Dict) -> Optional[str]:
+    # Claim flow (routes/courier_tasks) sets assigned_courier_id, the others courier_id
+    return order.get("courier_id") or order.get("assigned_courier_id")
+
+
+class CourierOrderIndex:
+    """courier_id -> set of order ids (the ids order tracking channels subscribe with)"""
+
+    def __init__(self, resync_interval_s: float = 60.0):
+        self.resync_interval_s = resync_interval_s
+        self._by_courier: Dict[str, Set[str]] = {}
+        self._by_order: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Transitions seen while a rebuild query is in flight, replayed after the swap
+        self._replay: Optional[list] = None
+        self._bus = None
+        self._handler = None
+
+    def assign(self, order_id: str, courier_id: str):
+        previous = self._by_order.get(order_id)
+        if previous == courier_id:
+            return
+        if previous is not None:
+            self.release(order_id)
+        self._by_order[order_id] = courier_id
+        self._by_courier.setdefault(courier_id, set()).add(order_id)
+
+    def release(self, order_id: str):
+        courier_id = self._by_order.pop(order_id, None)
+        if courier_id is None:
+            return
+        orders = self._by_courier.get(courier_id)
+        if orders is not None:
+            orders.discard(order_id)
+            if not orders:
+                del self._by_courier[courier_id]
+
+    def apply_order(self, order: Optional[Dict]):
+        """Update the index from an order document after a status transition"""
+        if not order:
+            return
+        if self._replay is not None:
+            self._replay.append(order)
+        order_id = str(order["_id"])
+        courier_id = _order_courier(order)
+        if courier_id and order.get("status") in ACTIVE_COURIER_STATUSES:
+            self.assign(order_id, courier_id)
+        else:
+            self.release(order_id)
+
+    async def order_changed(self, order: Optional[Dict]):
+        """apply_order here, and on the other workers through the event bus"""
+        if not order:
+            return
+        self.apply_order(order)
+        if self._bus is not None:
+            await self._bus.publish(TOPIC, {
+                "event_type": "courier_order.changed",
+                "_id": str(order["_id"]),
+                "status": order.get("status"),
+                "courier_id": order.get("courier_id"),
+                "assigned_courier_id": order.get("assigned_courier_id")
+            })
+
+    async def _on_event(self, data: Dict):
+        self.apply_order(data)
+
+    async def attach(self, bus):
+        """Apply transitions published by other workers (applying our own again is a no-op)"""
+        self._bus, self._handler = bus, self._on_event
+        await bus.subscribe(TOPIC, self._handler, max_queue=1000)
+
+    async def detach(self):
+        if self._bus is not None:
+            await self._bus.unsubscribe(TOPIC, self._handler)
+            self._bus = self._handler = None
+
+    def active_orders(self, courier_id: str) -> Set[str]:
+        return set(self._by_courier.get(courier_id, ()))
+
+    async def rebuild(self, db):
+        """Load all active courier orders from MongoDB and replace the index"""
+        self._replay = []
+        try:
+            orders = await self._load_active_orders(db)
+        except Exception:
+            self._replay = None
+            raise
+
+        by_courier: Dict[str, Set[str]] = {}
+        by_order: Dict[str, str] = {}
+        for order in orders:
+            courier_id = _order_courier(order)
+            order_id = str(order["_id"])
+            by_order[order_id] = courier_id
+            by_courier.setdefault(courier_id, set()).add(order_id)
+
+        self._by_courier, self._by_order = by_courier, by_order
+        replay, self._replay = self._replay, None
+        for order in replay:
+            self.apply_order(order)
+        return len(self._by_order)
+
+    async def _load_active_orders(self, db):
+        return await db.orders.find(
+            {
+                "status": {"$in": list(ACTIVE_COURIER_STATUSES)},
+                "$or": [
+                    {"courier_id": {"$nin": [None, ""]}},
+                    {"assigned_courier_id": {"$nin": [None, ""]}}
+                ]
+            },
+            {"_id": 1, "status": 1, "courier_id": 1, "assigned_courier_id": 1}
+        ).to_list(length=None)
+
+    def start(self, db):
+        """Start the periodic re-sync loop (call after the initial rebuild)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._resync_loop(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _resync_loop(self, db):
+        while True:
+            await asyncio.sleep(self.resync_interval_s)
+            try:
+                await self.rebuild(db)
+            except Exception as e:
+                print(f"⚠️ Courier order index re-sync failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "couriers": len(self._by_courier),
+            "active_orders": len(self._by_order)
+        }
+
+
+# Global index instance
+courier_order_index = CourierOrderIndex()
@@ -1,64 +1,290 @@
 """
 Real-time Event Bus for Order Notifications
-Simple in-memory pub/sub for MVP (can be upgraded to Redis later)
+In-memory pub/sub with a pluggable transport for cross-process fan-out:
+- memory: single process (default)
+- redis: Redis pub/sub, every worker/pod delivers to its own subscribers
 """
-from typing import Dict, List, Callable, Any
+from typing import Dict, List, Callable, Any, Awaitable, Optional
 import asyncio
+from collections import deque
 from datetime import datetime, timezone
 import json
+import uuid
 
-class EventBus:
-    """Simple event bus for real-time notifications"""
+Deliver = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class InMemoryTransport:
+    """Single-process transport - events are only delivered locally"""
+    name = "memory"
     
-    def __init__(self):
-        self._subscribers: Dict[str, List[Callable]] = {}
-        self._lock = asyncio.Lock()
+    async def start(self, deliver: Deliver):
+        pass
     
-    async def subscribe(self, topic: str, callback: Callable):
-        """Subscribe to a topic"""
-        async with self._lock:
-            if topic not in self._subscribers:
-                self._subscribers[topic] = []
-            self._subscribers[topic].append(callback)
-            print(f"✅ Subscribed to topic: {topic}")
+    async def publish(self, topic: str, data: Dict[str, Any]):
+        pass
     
-    async def unsubscribe(self, topic: str, callback: Callable):
-        """Unsubscribe from a topic"""
-        async with self._lock:
-            if topic in self._subscribers:
-                try:
-                    self._subscribers[topic].remove(callback)
-                    print(f"✅ Unsubscribed from topic: {topic}")
-                except ValueError:
-                    pass
+    async def stop(self):
+        pass
+
+
+class RedisPubSubTransport:
+    """
+    Redis pub/sub transport
+    Publishes every event to {prefix}{topic}; a listener task in each process
+    pattern-subscribes to {prefix}* and delivers events from other processes
+    to local subscribers. Own events are skipped (already delivered locally).
+    """
+    name = "redis"
+    # An idle channel just returns no message after this long
+    poll_timeout_s = 1.0
+    
+    def __init__(self, redis, channel_prefix: str):
+        self._redis = redis
+        self._prefix = channel_prefix
+        self._origin = uuid.uuid4().hex
+        self._deliver: Optional[Deliver] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self._task = asyncio.create_task(self._listen())
     
     async def publish(self, topic: str, data: Dict[str, Any]):
-        """Publish event to all subscribers"""
-        print(f"📡 Publishing to topic '{topic}': {data.get('event_type', 'unknown')}")
-        
-        async with self._lock:
-            subscribers = self._subscribers.get(topic, []).copy()
-        
-        # Call all subscribers asynchronously
-        tasks = []
-        for callback in subscribers:
+        envelope = json.dumps(
+            {"origin": self._origin, "topic": topic, "data": data},
+            ensure_ascii=False,
+            default=str
+        )
+        await self._redis.publish(f"{self._prefix}{topic}", envelope)
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _listen(self):
+        backoff = 1
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
             try:
-                task = asyncio.create_task(callback(data))
-                tasks.append(task)
+                await pubsub.psubscribe(f"{self._prefix}*")
+                backoff = 1
+                while True:
+                    # Poll with a read timeout: the shared pool's short socket_timeout
+                    # would make listen() raise on every idle second and resubscribe
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=self.poll_timeout_s
+                    )
+                    if message is None or message.get("type") != "pmessage":
+                        continue
+                    try:
+                        envelope = json.loads(message["data"])
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    if envelope.get("origin") == self._origin:
+                        continue
+                    await self._deliver(envelope["topic"], envelope["data"])
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"❌ Error calling subscriber: {e}")
+                print(f"⚠️ Event bus Redis listener error, reconnecting in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+# Subscriber queue overflow policies
+DROP_OLDEST = "drop_oldest"    # discard the oldest queued event (default)
+DROP_NEWEST = "drop_newest"    # discard the incoming event
+COALESCE = "coalesce"          # replace a queued event with the same key, else drop oldest
+
+
+def default_coalesce_key(data: Dict[str, Any]):
+    """Events for the same order and event type supersede each other"""
+    order_id = data.get("order_id")
+    if order_id is None:
+        return None
+    return (data.get("event_type"), order_id)
+
+
+class Subscription:
+    """
+    One subscriber: a bounded queue drained by its own task
+    A slow callback only backs up its own queue, never the publisher.
+    """
+    
+    def __init__(
+        self,
+        topic: str,
+        callback: Callable,
+        max_queue: int = 100,
+        policy: str = DROP_OLDEST,
+        coalesce_key: Callable[[Dict[str, Any]], Any] = default_coalesce_key,
+        callback_timeout: float = 5.0
+    ):
+        self.topic = topic
+        self.callback = callback
+        self.max_queue = max_queue
+        self.policy = policy
+        self.coalesce_key = coalesce_key
+        self.callback_timeout = callback_timeout
+        self._queue: deque = deque()
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._drain())
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.failed = 0
+    
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+    
+    def offer(self, data: Dict[str, Any]) -> bool:
+        """Enqueue without waiting; returns False if the event was dropped"""
+        if self.policy == COALESCE:
+            key = self.coalesce_key(data)
+            if key is not None:
+                for i, queued in enumerate(self._queue):
+                    if self.coalesce_key(queued) == key:
+                        self._queue[i] = data
+                        self.coalesced += 1
+                        return True
+        
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return False
+            self._queue.popleft()
         
-        # Wait for all callbacks (with timeout)
-        if tasks:
+        self._queue.append(data)
+        self._ready.set()
+        return True
+    
+    async def _drain(self):
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            data = self._queue.popleft()
+            # asyncio.wait instead of wait_for: wait_for can swallow a cancel
+            # that races with the callback finishing (Python < 3.12)
+            call = asyncio.ensure_future(self.callback(data))
             try:
-                await asyncio.wait_for(
-                    asyncio.gather(*tasks, return_exceptions=True),
-                    timeout=5.0
-                )
-            except asyncio.TimeoutError:
-                print(f"⚠️ Some subscribers timed out for topic: {topic}")
+                done, _ = await asyncio.wait({call}, timeout=self.callback_timeout)
+            except asyncio.CancelledError:
+                call.cancel()
+                raise
+            if not done:
+                call.cancel()
+                self.failed += 1
+                print(f"⚠️ Subscriber timed out on topic: {self.topic}")
+            elif call.cancelled() or call.exception() is not None:
+                self.failed += 1
+                print(f"❌ Error calling subscriber on topic {self.topic}: {call.exception() if not call.cancelled() else 'cancelled'}")
+            else:
+                self.delivered += 1
+    
+    def close(self):
+        self._task.cancel()
+        self._queue.clear()
+    
+    async def aclose(self):
+        """Cancel the drain task and wait for it to finish"""
+        self.close()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class EventBus:
+    """
+    Event bus for real-time notifications
+    publish() only enqueues (O(subscribers), no awaiting callbacks); each
+    subscriber is drained by its own task.
+    """
+    
+    def __init__(self, transport=None):
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._transport = transport or InMemoryTransport()
+        self._published = 0
+    
+    @property
+    def transport_name(self) -> str:
+        return self._transport.name
+    
+    async def start(self, transport=None):
+        """Attach a transport (optional) and start receiving remote events"""
+        if transport is not None:
+            await self._transport.stop()
+            self._transport = transport
+        await self._transport.start(self._deliver_local)
+        print(f"✅ Event bus started with {self._transport.name} transport")
+    
+    async def stop(self):
+        """Stop the transport and all subscriber drain tasks"""
+        await self._transport.stop()
+        subscriptions = [sub for subs in self._subscribers.values() for sub in subs]
+        self._subscribers = {}
+        for subscription in subscriptions:
+            await subscription.aclose()
+    
+    async def subscribe(
+        self,
+        topic: str,
+        callback: Callable,
+        max_queue: int = 100,
+        policy: str = DROP_OLDEST
+    ):
+        """Subscribe to a topic"""
+        subscription = Subscription(topic, callback, max_queue=max_queue, policy=policy)
+        # Copy-on-write so in-flight publishes iterate a stable list
+        self._subscribers[topic] = self._subscribers.get(topic, []) + [subscription]
+        print(f"✅ Subscribed to topic: {topic}")
+    
+    async def unsubscribe(self, topic: str, callback: Callable):
+        """Unsubscribe from a topic"""
+        subscriptions = self._subscribers.get(topic, [])
+        remaining = [sub for sub in subscriptions if sub.callback is not callback]
+        for sub in subscriptions:
+            if sub.callback is callback:
+                sub.close()
+        if len(remaining) == len(subscriptions):
+            return
+        if remaining:
+            self._subscribers[topic] = remaining
+        else:
+            del self._subscribers[topic]
+        print(f"✅ Unsubscribed from topic: {topic}")
+    
+    async def publish(self, topic: str, data: Dict[str, Any]):
+        """Publish event to local subscribers and to other processes via the transport"""
+        queued = await self._deliver_local(topic, data)
+        print(f"📡 Published '{data.get('event_type', 'unknown')}' to topic '{topic}' ({queued} local subscribers)")
         
-        print(f"✅ Published to {len(subscribers)} subscribers on topic '{topic}'")
+        try:
+            await self._transport.publish(topic, data)
+        except Exception as e:
+            print(f"⚠️ Event bus {self._transport.name} publish failed for topic '{topic}': {e}")
+    
+    async def _deliver_local(self, topic: str, data: Dict[str, Any]) -> int:
+        """Enqueue event for subscribers in this process (never waits on callbacks)"""
+        self._published += 1
+        subscriptions = self._subscribers.get(topic, ())
+        for subscription in subscriptions:
+            subscription.offer(data)
+        return len(subscriptions)
     
     def get_topics(self) -> List[str]:
         """Get all active topics"""
@@ -67,10 +293,46 @@ class EventBus:
     def get_subscriber_count(self, topic: str) -> int:
         """Get subscriber count for a topic"""
         return len(self._subscribers.get(topic, []))
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth / drop metrics for monitoring"""
+        subscriptions = [sub for subs in self._subscribers.values() for sub in subs]
+        return {
+            "transport": self._transport.name,
+            "published": self._published,
+            "topics": len(self._subscribers),
+            "subscribers": len(subscriptions),
+            "queue_depth": sum(sub.depth for sub in subscriptions),
+            "max_queue_depth": max((sub.depth for sub in subscriptions), default=0),
+            "delivered": sum(sub.delivered for sub in subscriptions),
+            "dropped": sum(sub.dropped for sub in subscriptions),
+            "coalesced": sum(sub.coalesced for sub in subscriptions),
+            "failed": sum(sub.failed for sub in subscriptions),
+        }
 
 # Global event bus instance
 event_bus = EventBus()
 
+
+async def start_event_bus():
+    """Start the global event bus with the transport selected by EVENT_BUS_BACKEND"""
+    from config.settings import settings
+    from config.cache import AsyncNullCache, get_async_redis
+    
+    transport = None
+    if settings.EVENT_BUS_BACKEND.lower() == "redis":
+        redis = get_async_redis()
+        if isinstance(redis, AsyncNullCache):
+            print("⚠️ EVENT_BUS_BACKEND=redis but Redis is unavailable - using in-memory event bus")
+        else:
+            transport = RedisPubSubTransport(redis, settings.EVENT_BUS_CHANNEL_PREFIX)
+    
+    await event_bus.start(transport)
+
+
+async def stop_event_bus():
+    await event_bus.stop()
+
 # Helper functions for order events
 async def publish_order_created(order_id: str, restaurant_id: str, business_id: str, order_data: Dict = None):
     """Publish order created event"""
@@ -2,12 +2,14 @@
 WebSocket endpoint for real-time order notifications with heartbeat & reconnection support
 """
 from fastapi import WebSocket, WebSocketDisconnect, Depends, Query, HTTPException
-from typing import Dict, Set, Optional
+from typing import Dict, List, Set, Optional, Tuple
 import json
 import asyncio
 from datetime import datetime, timezone
 import logging
 
+from realtime.broadcast import broadcast_text, evict, evict_all, send_text, serialize
+
 logger = logging.getLogger(__name__)
 
 class ConnectionManager:
@@ -58,34 +60,38 @@ class ConnectionManager:
             return
         
         connection = self.active_connections[business_id]
-        try:
-            await connection.send_json(message)
-        except Exception as e:
-            logger.error(f"❌ Error sending to business WebSocket: {e}")
+        if not await send_text(connection, serialize(message)):
+            logger.error(f"❌ Send to business WebSocket failed or timed out: business_id={business_id}")
             # Remove failed connection
             self.disconnect(connection, business_id, role="business")
+            await evict(connection)
     
     async def send_to_admins(self, message: dict):
         """Send message to all admin connections"""
-        # Make a copy to avoid modification during iteration
-        connections = self.admin_connections.copy()
-        
-        for connection in connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"❌ Error sending to admin WebSocket: {e}")
-                # Remove failed connection
-                self.admin_connections.discard(connection)
+        await self._fan_out([], message)
     
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients (businesses + admins)"""
-        # Send to all businesses
-        for business_id in list(self.active_connections.keys()):
-            await self.send_to_business(business_id, message)
+        await self._fan_out(list(self.active_connections.items()), message)
+    
+    async def _fan_out(self, businesses: List[Tuple[str, WebSocket]], message: dict):
+        """
+        Serialize once and send to the given businesses plus all admins concurrently
+        Failed or slow sockets (per-send timeout) are evicted.
+        """
+        targets = businesses + [("admin", ws) for ws in self.admin_connections]
         
-        # Send to all admins
-        await self.send_to_admins(message)
+        failed = await broadcast_text(list(enumerate(ws for _, ws in targets)), serialize(message))
+        if not failed:
+            return
+        
+        failed_sockets = []
+        for index in failed:
+            client_id, ws = targets[index]
+            self.disconnect(ws, client_id, role="admin" if client_id == "admin" else "business")
+            failed_sockets.append(ws)
+        print(f"❌ Evicted {len(failed_sockets)} slow/failed order WebSockets")
+        await evict_all(failed_sockets)
     
     def get_connection_count(self, business_id: str = None, role: str = None) -> int:
         """Get total connections or connections for a business/role"""
@@ -129,6 +135,9 @@ async def websocket_order_notifications(
     
     await manager.connect(websocket, client_id, role)
     
+    subscribed_topic = None
+    handler = None
+    
     try:
         # Send connection confirmation
         await websocket.send_json({
@@ -141,7 +150,7 @@ async def websocket_order_notifications(
         
         # Subscribe to event bus
         try:
-            from realtime.event_bus import event_bus
+            from realtime.event_bus import event_bus, COALESCE
             
             async def on_order_event(data: dict):
                 """Callback for order events"""
@@ -164,11 +173,16 @@ async def websocket_order_notifications(
             # Subscribe to appropriate topic
             if role == "admin":
                 # Subscribe to all order events
-                await event_bus.subscribe("orders:all", on_order_event)
+                subscribed_topic = "orders:all"
+                handler = on_order_event
+                await event_bus.subscribe(subscribed_topic, handler, max_queue=500)
                 print(f"✅ Admin subscribed to orders:all topic")
             else:
                 # Subscribe to business-specific topic
-                await event_bus.subscribe(f"business:{business_id}", on_order_event)
+                # (a lagging tablet only keeps the latest event per order + event type)
+                subscribed_topic = f"business:{business_id}"
+                handler = on_order_event
+                await event_bus.subscribe(subscribed_topic, handler, policy=COALESCE)
                 print(f"✅ Business {business_id} subscribed to business:{business_id} topic")
         except Exception as e:
             print(f"❌ Error subscribing to event bus: {e}")
@@ -252,3 +266,9 @@ async def websocket_order_notifications(
                 await websocket.close(code=1011, reason="Server error")
         except:
             pass
+    finally:
+        # Release the connection and its subscriber queue/task
+        manager.disconnect(websocket, client_id, role)
+        if subscribed_topic and handler:
+            from realtime.event_bus import event_bus
+            await event_bus.unsubscribe(subscribed_topic, handler)
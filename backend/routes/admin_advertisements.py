@@ -10,6 +10,8 @@ from auth_dependencies import get_admin_user
 import uuid
 import os
 import shutil
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter()
 
@@ -40,11 +42,10 @@ async def create_advertisement(
     city: str = Form(...),
     title: Optional[str] = Form(None),
     image: UploadFile = File(...),
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create new advertisement with image upload"""
-    from server import db
-    
     try:
         # Validate business exists
         business = await db.users.find_one({"id": business_id, "role": "business"})
@@ -87,10 +88,8 @@ async def create_advertisement(
         raise HTTPException(500, f"Error creating advertisement: {str(e)}")
 
 @router.get("/advertisements")
-async def get_all_advertisements(current_user: dict = Depends(get_admin_user)):
+async def get_all_advertisements(current_user: dict = Depends(get_admin_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get all advertisements for admin management"""
-    from server import db
-    
     try:
         advertisements = await db.advertisements.find().sort("created_at", -1).to_list(length=100)
         
@@ -108,10 +107,8 @@ async def get_all_advertisements(current_user: dict = Depends(get_admin_user)):
         raise HTTPException(500, f"Error fetching advertisements: {str(e)}")
 
 @router.get("/advertisements/{ad_id}")
-async def get_advertisement(ad_id: str, current_user: dict = Depends(get_admin_user)):
+async def get_advertisement(ad_id: str, current_user: dict = Depends(get_admin_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get specific advertisement details"""
-    from server import db
-    
     advertisement = await db.advertisements.find_one({"id": ad_id})
     if not advertisement:
         raise HTTPException(404, "Advertisement not found")
@@ -127,11 +124,10 @@ async def get_advertisement(ad_id: str, current_user: dict = Depends(get_admin_u
 async def update_advertisement(
     ad_id: str,
     update_data: AdvertisementUpdate,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update advertisement details"""
-    from server import db
-    
     # Check if advertisement exists
     advertisement = await db.advertisements.find_one({"id": ad_id})
     if not advertisement:
@@ -167,11 +163,10 @@ async def update_advertisement(
 @router.patch("/advertisements/{ad_id}/toggle")
 async def toggle_advertisement_status(
     ad_id: str,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Toggle advertisement active/inactive status"""
-    from server import db
-    
     # Check if advertisement exists
     advertisement = await db.advertisements.find_one({"id": ad_id})
     if not advertisement:
@@ -197,11 +192,10 @@ async def toggle_advertisement_status(
 @router.delete("/advertisements/{ad_id}")
 async def delete_advertisement(
     ad_id: str,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Delete advertisement"""
-    from server import db
-    
     # Check if advertisement exists
     advertisement = await db.advertisements.find_one({"id": ad_id})
     if not advertisement:
@@ -11,6 +11,8 @@ from auth_dependencies import get_admin_user
 from models_package.coupons import (
     Coupon, CouponCreate, CouponUpdate, CouponType, CouponScope
 )
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/admin/coupons", tags=["admin-coupons"])
 
@@ -21,11 +23,10 @@ async def require_admin(current_user: dict = Depends(get_admin_user)):
 
 @router.get("", response_model=List[Coupon])
 async def get_coupons(
-    current_user: dict = Depends(require_admin)
+    current_user: dict = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get all coupons"""
-    from server import db
-    
     try:
         coupons = await db.coupons.find({}).sort("created_at", -1).to_list(length=None)
         
@@ -61,11 +62,10 @@ async def get_coupons(
 @router.post("", response_model=Coupon)
 async def create_coupon(
     coupon_data: CouponCreate,
-    current_user: dict = Depends(require_admin)
+    current_user: dict = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create new coupon"""
-    from server import db
-    
     try:
         # Check if code already exists
         existing = await db.coupons.find_one({"code": coupon_data.code.upper()})
@@ -137,11 +137,10 @@ async def create_coupon(
 async def update_coupon(
     coupon_id: str,
     coupon_data: CouponUpdate,
-    current_user: dict = Depends(require_admin)
+    current_user: dict = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update coupon"""
-    from server import db
-    
     try:
         # Check if coupon exists
         coupon = await db.coupons.find_one({"_id": coupon_id})
@@ -193,11 +192,10 @@ async def update_coupon(
 @router.delete("/{coupon_id}")
 async def delete_coupon(
     coupon_id: str,
-    current_user: dict = Depends(require_admin)
+    current_user: dict = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Delete coupon"""
-    from server import db
-    
     try:
         result = await db.coupons.delete_one({"_id": coupon_id})
         
@@ -6,6 +6,9 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
 from auth_dependencies import get_admin_user
+from services import menu_cache, principals
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter()
 
@@ -15,10 +18,8 @@ class KYCApprovalRequest(BaseModel):
     reason: Optional[str] = None
 
 @router.get("/kyc/pending")
-async def get_pending_kyc_requests(current_user: dict = Depends(get_admin_user)):
+async def get_pending_kyc_requests(current_user: dict = Depends(get_admin_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get all pending KYC requests"""
-    from server import db
-    
     # Get all users with pending KYC
     pending_users = await db.users.find({
         "kyc_status": "pending",
@@ -50,11 +51,10 @@ async def get_pending_kyc_requests(current_user: dict = Depends(get_admin_user))
 @router.post("/kyc/action")
 async def process_kyc_action(
     request: KYCApprovalRequest,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Approve or reject KYC request"""
-    from server import db
-    
     if request.action not in ["approve", "reject"]:
         raise HTTPException(400, "Invalid action. Must be 'approve' or 'reject'")
     
@@ -75,6 +75,8 @@ async def process_kyc_action(
     
     if result.matched_count == 0:
         raise HTTPException(404, "User not found")
+    principals.invalidate_user(request.user_id)
+    await menu_cache.menu_changed(db, request.user_id)
     
     return {
         "success": True,
@@ -84,10 +86,8 @@ async def process_kyc_action(
     }
 
 @router.get("/kyc/stats")
-async def get_kyc_stats(current_user: dict = Depends(get_admin_user)):
+async def get_kyc_stats(current_user: dict = Depends(get_admin_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get KYC statistics"""
-    from server import db
-    
     pending_count = await db.users.count_documents({"kyc_status": "pending"})
     approved_count = await db.users.count_documents({"kyc_status": "approved"})
     rejected_count = await db.users.count_documents({"kyc_status": "rejected"})
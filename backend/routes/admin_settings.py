@@ -7,6 +7,8 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timezone
 from auth_dependencies import get_admin_user
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/admin", tags=["admin-settings"])
 
@@ -30,14 +32,13 @@ class SettingsResponse(BaseModel):
 
 @router.get("/settings", response_model=SettingsResponse)
 async def get_global_settings(
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get current global settings
     """
     try:
-        from server import db
-        
         settings = await db.settings.find_one({"_id": "global"})
         
         if not settings:
@@ -80,7 +81,8 @@ async def get_global_settings(
 @router.patch("/settings", response_model=SettingsResponse)
 async def update_global_settings(
     settings_update: GlobalSettings,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Update global settings
@@ -89,8 +91,6 @@ async def update_global_settings(
     Ayar Etkisi: courier_rate_per_package admin'den değişince sonraki teslim bu yeni değerle yazılır
     """
     try:
-        from server import db
-        
         # Prepare update data (only include non-None fields)
         update_data = {}
         
@@ -172,14 +172,13 @@ async def update_global_settings(
 
 @router.get("/earnings/summary")
 async def get_earnings_summary(
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get earnings summary statistics for admin dashboard
     """
     try:
-        from server import db
-        
         # Total earnings paid out
         total_earnings = await db.earnings.aggregate([
             {
@@ -12,6 +12,8 @@ from models_package.ai_diagnostics import (
     LogIngestRequest, redact_pii, compute_fingerprint,
     classify_severity, extract_tags, AppType, LogLevel
 )
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/admin/logs", tags=["ai-diagnostics"])
 
@@ -38,7 +40,8 @@ async def verify_service_key(authorization: Optional[str] = Header(None)):
 async def ingest_logs(
     log_entry: LogIngestRequest,
     x_app_name: str = Header(..., alias="X-App-Name"),
-    _auth: bool = Depends(verify_service_key)
+    _auth: bool = Depends(verify_service_key),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Ingest log entry with PII redaction and clustering
@@ -47,8 +50,6 @@ async def ingest_logs(
     - Authorization: Bearer <ADMIN_SERVICE_KEY>
     - X-App-Name: customer|business|courier|admin
     """
-    from server import db
-    
     try:
         # Validate app name
         try:
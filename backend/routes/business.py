@@ -11,6 +11,9 @@ from models import MenuItem, UserRole
 from auth_dependencies import get_business_user, get_approved_business_user
 from auth_cookie import get_approved_business_user_from_cookie
 from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
+from services import menu_cache
 
 router = APIRouter(prefix="/business", tags=["business"])
 
@@ -87,12 +90,11 @@ class MenuItemResponse(BaseModel):
 async def create_menu_item(
     request: Request,
     item_data: MenuItemCreate,
-    current_user: dict = Depends(get_approved_business_user_from_cookie)
+    current_user: dict = Depends(get_approved_business_user_from_cookie),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create new menu item - Business role only (KYC approved)"""
     try:
-        from server import db
-        
         # Validate category
         MenuItemCreate.validate_category(item_data.category)
         # Validate VAT rate
@@ -150,6 +152,7 @@ async def create_menu_item(
         }
         
         await db.products.insert_one(product_doc)
+        await menu_cache.menu_changed(db, menu_item_doc["business_id"])
         
         return MenuItemResponse(
             id=menu_item_doc["_id"],
@@ -182,12 +185,11 @@ async def create_menu_item(
 @router.get("/menu", response_model=List[MenuItemResponse])
 async def get_my_menu(
     request: Request,
-    current_user: dict = Depends(get_approved_business_user_from_cookie)
+    current_user: dict = Depends(get_approved_business_user_from_cookie),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get business's own menu items only"""
     try:
-        from server import db
-        
         # Use current user ID as business ID (since business is registered as user)
         business_user_id = current_user["id"]
         
@@ -230,12 +232,11 @@ async def update_menu_item(
     request: Request,
     item_id: str,
     item_data: MenuItemUpdate,
-    current_user: dict = Depends(get_approved_business_user_from_cookie)
+    current_user: dict = Depends(get_approved_business_user_from_cookie),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update menu item - Business can only update their own items"""
     try:
-        from server import db
-        
         # Validate optional fields if provided
         if item_data.category is not None:
             MenuItemCreate.validate_category(item_data.category)
@@ -327,6 +328,7 @@ async def update_menu_item(
         
         # Get updated item
         updated_item = await db.menu_items.find_one({"_id": item_id})
+        await menu_cache.menu_changed(db, updated_item["business_id"])
         
         return MenuItemResponse(
             id=str(updated_item["_id"]),
@@ -361,7 +363,8 @@ async def delete_menu_item(
     request: Request,
     item_id: str,
     soft_delete: bool = True,
-    current_user: dict = Depends(get_approved_business_user_from_cookie)
+    current_user: dict = Depends(get_approved_business_user_from_cookie),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Delete menu item - Business can only delete their own items
@@ -369,8 +372,6 @@ async def delete_menu_item(
     - soft_delete=False: Permanently deletes from database
     """
     try:
-        from server import db
-        
         # Use current user ID as business ID (since business is registered as user)
         business_user_id = current_user["id"]
         
@@ -396,6 +397,7 @@ async def delete_menu_item(
                 {"_id": item_id},
                 {"$set": {"availability": False, "updated_at": datetime.utcnow()}}
             )
+            await menu_cache.menu_changed(db, business_user_id)
             return {"success": True, "message": "Menu item disabled (soft delete)"}
         else:
             # Hard delete: permanently remove from database
@@ -412,6 +414,7 @@ async def delete_menu_item(
             
             # Also delete from products collection
             await db.products.delete_one({"_id": item_id})
+            await menu_cache.menu_changed(db, business_user_id)
             
             return {"success": True, "message": "Menu item permanently deleted"}
         
@@ -426,16 +429,16 @@ async def delete_menu_item(
 # Public endpoint for customers to view business menu
 @router.get("/{business_id}/menu", response_model=List[MenuItemResponse])
 async def get_business_menu(
+    request: Request,
     business_id: str,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Public endpoint - Get menu items for a specific business
-    Optionally filter by category
+    Optionally filter by category (cached per menu version, ETag)
     """
-    try:
-        from server import db
-        
+    async def build():
         # Build query - only show available items
         query = {
             "business_id": business_id,
@@ -468,7 +471,9 @@ async def get_business_menu(
             )
             for item in menu_items
         ]
-        
+    
+    try:
+        return await menu_cache.cached_menu_response(request, db, business_id, f"menu:{category or ''}", build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -476,11 +481,9 @@ async def get_business_menu(
         )
 
 @router.get("/menu/{item_id}", response_model=MenuItemResponse)
-async def get_menu_item(item_id: str):
+async def get_menu_item(item_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     """Public endpoint - Get single menu item details"""
     try:
-        from server import db
-        
         item = await db.menu_items.find_one({"_id": item_id})
         
         if not item:
@@ -517,14 +520,12 @@ async def get_menu_item(item_id: str):
 # ============================================
 
 @router.get("/businesses/{business_id}/products", response_model=List[MenuItemResponse])
-async def get_public_business_menu(business_id: str):
+async def get_public_business_menu(request: Request, business_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     """
     Get public menu for a business - accessible by customers
-    Returns only available items
+    Returns only available items (cached per menu version, ETag)
     """
-    try:
-        from server import db
-        
+    async def build():
         # Get menu items for this business (only available ones)
         menu_items = await db.menu_items.find({
             "business_id": business_id,
@@ -554,7 +555,9 @@ async def get_public_business_menu(business_id: str):
             )
             for item in menu_items
         ]
-        
+    
+    try:
+        return await menu_cache.cached_menu_response(request, db, business_id, "products", build)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -566,15 +569,13 @@ async def get_public_business_menu(business_id: str):
 # ============================================
 
 @router.get("/public/{business_id}/menu")
-async def get_business_public_menu(business_id: str):
+async def get_business_public_menu(request: Request, business_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     """
     Get public menu of a business - NO AUTH REQUIRED
     Customers can view menus of approved businesses
-    Only returns available items
+    Only returns available items (cached per menu version, ETag)
     """
-    try:
-        from server import db
-        
+    async def build():
         # Verify business exists and is approved
         business = await db.users.find_one({
             "id": business_id,
@@ -615,7 +616,9 @@ async def get_business_public_menu(business_id: str):
             result.append(menu_item)
         
         return result
-        
+    
+    try:
+        return await menu_cache.cached_menu_response(request, db, business_id, "public", build)
     except HTTPException:
         raise
     except Exception as e:
@@ -2,17 +2,19 @@
 Business Dashboard Summary Endpoint
 Provides real-time metrics and activities for business panel
 """
-from fastapi import APIRouter, HTTPException, Query, Request
-from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
-import os
+
+from services import business_stats
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter()
 
 # Timezone configuration
 DEFAULT_TZ = "Europe/Istanbul"
-REVENUE_STATUSES = os.getenv("CONFIRM_STATUSES", "confirmed,delivered").split(",")
 
 
 # Response Models
@@ -40,7 +42,8 @@ class DashboardSummaryResponse(BaseModel):
 async def get_dashboard_summary(
     request: Request,
     date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format"),
-    tz: str = Query(DEFAULT_TZ, description="Timezone")
+    tz: str = Query(DEFAULT_TZ, description="Timezone"),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get dashboard summary for business
@@ -49,7 +52,6 @@ async def get_dashboard_summary(
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-    from server import db
     from auth_cookie import get_current_user_from_cookie_or_bearer
     
     # Get authenticated user
@@ -69,35 +71,18 @@ async def get_dashboard_summary(
     else:
         target_date = datetime.now(timezone.utc)
     
+    if target_date.tzinfo is None:
+        target_date = target_date.replace(tzinfo=timezone.utc)
     start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_day = target_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-    
-    # 1. Today's orders count
-    today_orders_count = await db.orders.count_documents({
-        "business_id": business_id,
-        "created_at": {"$gte": start_of_day, "$lte": end_of_day},
-        "status": {"$in": ["pending", "preparing", "ready", "confirmed", "delivered"]}
-    })
-    
-    # 2. Today's revenue
-    revenue_pipeline = [
-        {
-            "$match": {
-                "business_id": business_id,
-                "created_at": {"$gte": start_of_day, "$lte": end_of_day},
-                "status": {"$in": REVENUE_STATUSES}
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total": {"$sum": "$totals.grand"}
-            }
-        }
-    ]
+    end_of_day = start_of_day + timedelta(days=1)
     
-    revenue_result = await db.orders.aggregate(revenue_pipeline).to_list(length=1)
-    today_revenue = revenue_result[0]["total"] if revenue_result else 0.0
+    # 1-2. Today's orders count and revenue from the hourly rollups
+    buckets = await business_stats.load_buckets(db, business_id, start_of_day)
+    today = business_stats.sum_buckets(
+        buckets, start_of_day, end_of_day, fields=("dashboard_orders", "confirmed_revenue")
+    )
+    today_orders_count = today["dashboard_orders"]
+    today_revenue = today["confirmed_revenue"]
     
     # 3. Pending orders count
     pending_orders_count = await db.orders.count_documents({
@@ -111,15 +96,8 @@ async def get_dashboard_summary(
         "is_available": True
     })
     
-    # 5. Total unique customers
-    customers_pipeline = [
-        {"$match": {"business_id": business_id}},
-        {"$group": {"_id": "$customer_id"}},
-        {"$count": "total"}
-    ]
-    
-    customers_result = await db.orders.aggregate(customers_pipeline).to_list(length=1)
-    total_customers = customers_result[0]["total"] if customers_result else 0
+    # 5. Total unique customers (maintained counter)
+    total_customers = await business_stats.get_total_customers(db, business_id)
     
     # 6. Ratings
     rating_avg = 0.0
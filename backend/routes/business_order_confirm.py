@@ -11,6 +11,9 @@ import uuid
 from auth_cookie import get_approved_business_user_from_cookie
 from models_package.courier_tasks import CourierTaskStatus, Coordinates
 from models import OrderStatus
+from services import business_stats
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/business/orders", tags=["business-orders"])
 
@@ -27,7 +30,8 @@ class ConfirmOrderResponse(BaseModel):
 async def confirm_order(
     order_id: str,
     request: ConfirmOrderRequest,
-    current_user: dict = Depends(get_approved_business_user_from_cookie)
+    current_user: dict = Depends(get_approved_business_user_from_cookie),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Confirm order and create courier task
@@ -36,7 +40,6 @@ async def confirm_order(
     Creates a courier task in 'waiting' status.
     Publishes WebSocket event to courier:global topic.
     """
-    from server import db
     from realtime.event_bus import event_bus
     
     try:
@@ -113,6 +116,8 @@ async def confirm_order(
             }
         )
         
+        business_stats.schedule_sync(db, {**order, "status": "confirmed"})
+        
         # Get restaurant/business location for pickup coordinates
         restaurant = await db.businesses.find_one({"_id": order.get("restaurant_id") or order.get("business_id")})
         
@@ -6,14 +6,18 @@ from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timezone
 
 from auth_cookie import get_current_user_from_cookie_or_bearer
-from models_package.coupons import ApplyCouponRequest, ApplyCouponResponse, CouponType, CouponScope
+from models_package.coupons import ApplyCouponRequest, ApplyCouponResponse
+from services import pricing
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/cart", tags=["cart-coupons"])
 
 @router.post("/apply-coupon", response_model=ApplyCouponResponse)
 async def apply_coupon(
     request: ApplyCouponRequest,
-    current_user: dict = Depends(get_current_user_from_cookie_or_bearer)
+    current_user: dict = Depends(get_current_user_from_cookie_or_bearer),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Apply coupon to cart
@@ -22,8 +26,6 @@ async def apply_coupon(
     For scope=item: applies to individual items (unit_discount).
     For scope=cart: applies to cart total.
     """
-    from server import db
-    
     try:
         user_id = current_user["id"]
         coupon_code = request.code.upper()
@@ -73,99 +75,42 @@ async def apply_coupon(
                 detail="Kupon kullanım limiti dolmuş."
             )
         
-        # For actual implementation, we'd need cart data here
-        # For now, return a mock response showing how it would work
-        
-        # MOCK CART DATA (in real implementation, this comes from request or session)
-        mock_items = [
-            {
-                "product_id": "1",
-                "name": "Pizza Margherita",
-                "unit_price": 50.0,
-                "quantity": 2,
-                "category": "pizza"
-            },
-            {
-                "product_id": "2",
-                "name": "Cola",
-                "unit_price": 10.0,
-                "quantity": 1,
-                "category": "beverage"
-            }
-        ]
-        
-        subtotal = sum(item["unit_price"] * item["quantity"] for item in mock_items)
+        # Price the customer's saved cart (one product query) and apply the discount
+        try:
+            quote = pricing.apply_coupon(await pricing.price_saved_cart(db, user_id), coupon)
+        except pricing.PricingError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
         
-        # Check min_basket
-        min_basket = coupon.get("min_basket")
-        if min_basket and subtotal < min_basket:
+        applicable_restaurants = coupon.get("applicable_restaurants") or []
+        if applicable_restaurants and quote["business_id"] not in applicable_restaurants:
             raise HTTPException(
                 status_code=400,
-                detail=f"Minimum sepet tutarı ₺{min_basket:.2f} olmalıdır."
+                detail="Kupon geçersiz veya kullanım koşulları sağlanmıyor."
             )
         
-        # Calculate discount
-        coupon_type = coupon.get("type")
-        coupon_scope = coupon.get("scope")
-        coupon_value = coupon.get("value", 0)
-        
-        discount_amount = 0
-        discounted_items = []
-        
-        if coupon_scope == CouponScope.ITEM.value:
-            # Item-level discount
-            for item in mock_items:
-                unit_price = item["unit_price"]
-                quantity = item["quantity"]
-                
-                if coupon_type == CouponType.PERCENT.value:
-                    unit_discount = unit_price * (coupon_value / 100)
-                else:  # fixed
-                    unit_discount = min(coupon_value, unit_price)
-                
-                final_unit_price = max(0, unit_price - unit_discount)
-                line_total = final_unit_price * quantity
-                
-                discounted_items.append({
-                    "name": item["name"],
-                    "quantity": quantity,
-                    "unit_price": unit_price,
-                    "unit_discount": unit_discount,
-                    "final_unit_price": final_unit_price,
-                    "line_total": line_total
-                })
-                
-                discount_amount += unit_discount * quantity
-        
-        else:  # cart-level discount
-            if coupon_type == CouponType.PERCENT.value:
-                discount_amount = subtotal * (coupon_value / 100)
-            else:  # fixed
-                discount_amount = min(coupon_value, subtotal)
-            
-            # Items remain unchanged
-            for item in mock_items:
-                discounted_items.append({
-                    "name": item["name"],
-                    "quantity": item["quantity"],
-                    "unit_price": item["unit_price"],
-                    "unit_discount": 0,
-                    "final_unit_price": item["unit_price"],
-                    "line_total": item["unit_price"] * item["quantity"]
-                })
-        
-        grand_total = max(0, subtotal - discount_amount)
+        discounted_items = [
+            {
+                "name": line["name"],
+                "quantity": line["quantity"],
+                "unit_price": line["unit_price"],
+                "unit_discount": line["unit_discount"],
+                "final_unit_price": line["final_unit_price"],
+                "line_total": line["line_total"]
+            }
+            for line in quote["items"]
+        ]
         
         return ApplyCouponResponse(
             success=True,
             message=f"Kupon uygulandı: {coupon.get('title')}",
             coupon_id=coupon.get("_id"),
-            discount_amount=discount_amount,
+            discount_amount=quote["discount"],
             items=discounted_items,
             totals={
-                "subtotal": subtotal,
-                "discount": discount_amount,
-                "grand": grand_total
+                "subtotal": quote["subtotal"],
+                "delivery": quote["delivery_fee"],
+                "discount": quote["discount"],
+                "grand": quote["grand"]
             }
         )
         
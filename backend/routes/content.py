@@ -9,21 +9,10 @@ from datetime import datetime, timezone
 from auth_dependencies import get_admin_user
 import os
 
-# MongoDB connection
-MONGO_URL = os.environ.get('MONGO_URL')
-if MONGO_URL:
-    from motor.motor_asyncio import AsyncIOMotorClient
-    client = AsyncIOMotorClient(MONGO_URL)
-    # Extract database name from MONGO_URL or environment
-    db_name = os.environ.get("DB_NAME")
-    if not db_name:
-        if "/" in MONGO_URL:
-            db_name = MONGO_URL.split("/")[-1].split("?")[0]
-        else:
-            db_name = "kuryecini"
-    db = client[db_name]
-else:
+# MongoDB connection (shared client)
+if not os.environ.get('MONGO_URL'):
     raise RuntimeError("MONGO_URL environment variable required")
+from config.db import db
 
 router = APIRouter(prefix="/content", tags=["content"])
 
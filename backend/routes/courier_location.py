@@ -3,12 +3,22 @@ Phase 3: Courier Location System with Real-time Tracking
 Kurye Konum Sistemi - POST /courier/location
 """
 from fastapi import APIRouter, HTTPException, Depends, status
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timezone
-import json
-import uuid
 from auth_dependencies import get_courier_user
+from realtime.courier_orders import courier_order_index
+from services.courier_locations import (
+    build_history_doc,
+    build_location_payload,
+    cache_latest_locations,
+    get_last_stored_location,
+    get_latest_location,
+    get_location_history,
+    location_history_buffer
+)
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/courier", tags=["courier-location"])
 
@@ -35,10 +45,49 @@ class CourierLocationHistory(BaseModel):
     locations: List[dict]
     total_count: int
 
+class CourierLocationBatch(BaseModel):
+    points: List[CourierLocationUpdate] = Field(..., min_length=1, max_length=500)
+
+class CourierLocationBatchResponse(BaseModel):
+    courier_id: str
+    accepted: int
+    latest: CourierLocationResponse
+
+
+async def _publish_location(courier_id: str, payload: dict):
+    """Broadcast latest location to the courier channel and active order trackers"""
+    location = {
+        "lat": payload["lat"],
+        "lng": payload["lng"],
+        "heading": payload["heading"],
+        "speed": payload["speed"],
+        "accuracy": payload["accuracy"]
+    }
+    try:
+        from websocket_manager import websocket_manager
+        
+        # Broadcast to courier's own channel
+        await websocket_manager.send_courier_update(courier_id, {
+            "type": "location_updated",
+            **location
+        })
+        
+        # Broadcast location to tracking channels of this courier's active orders
+        # (in-memory index - no orders query per GPS ping)
+        for order_id in courier_order_index.active_orders(courier_id):
+            await websocket_manager.send_courier_location_to_order_subscribers(
+                order_id, 
+                {"courier_id": courier_id, **location}
+            )
+        
+    except Exception as ws_error:
+        print(f"⚠️ WebSocket broadcast failed: {ws_error}")
+
 @router.post("/location", response_model=CourierLocationResponse)
 async def update_courier_location(
     location_data: CourierLocationUpdate,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Update courier location
@@ -46,122 +95,32 @@ async def update_courier_location(
     
     Depolama:
     - Son konum: cache (Redis varsa) courier:loc:{courier_id}
-    - Geçmiş: courier_locations (son 100 nokta, ts index)
+    - Geçmiş: courier_locations (TTL index ile süreli, courier_id + timestamp index)
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         timestamp = location_data.ts or datetime.now(timezone.utc)
         
-        # Prepare location data
-        location_doc = {
-            "_id": str(uuid.uuid4()),
-            "courier_id": courier_id,
-            "location": {
-                "type": "Point",
-                "coordinates": [location_data.lng, location_data.lat]  # GeoJSON format [lng, lat]
-            },
-            "lat": location_data.lat,
-            "lng": location_data.lng,
-            "heading": location_data.heading,
-            "speed": location_data.speed,
-            "accuracy": location_data.accuracy,
-            "timestamp": timestamp
-        }
-        
-        cached = False
-        
-        # Try Redis cache first (if available)
-        try:
-            import redis
-            r = redis.Redis(host='localhost', port=6379, decode_responses=True, socket_connect_timeout=1)
-            
-            # Test Redis connection
-            r.ping()
-            
-            # Cache latest location (expire in 10 minutes)
-            cache_key = f"courier:loc:{courier_id}"
-            cache_data = {
-                "courier_id": courier_id,
-                "lat": location_data.lat,
-                "lng": location_data.lng,
-                "heading": location_data.heading,
-                "speed": location_data.speed,
-                "accuracy": location_data.accuracy,
-                "timestamp": timestamp.isoformat()
-            }
-            
-            r.setex(cache_key, 600, json.dumps(cache_data))  # 10 minutes TTL
-            cached = True
-            
-            print(f"📍 COURIER LOCATION CACHED: {courier_id} at ({location_data.lat}, {location_data.lng})")
-            
-        except Exception as redis_error:
-            print(f"⚠️ Redis cache failed: {redis_error}")
-            # Continue without Redis caching
+        payload = build_location_payload(
+            courier_id,
+            location_data.lat,
+            location_data.lng,
+            heading=location_data.heading,
+            speed=location_data.speed,
+            accuracy=location_data.accuracy,
+            timestamp=timestamp
+        )
         
-        # Store in MongoDB history (keep last 100 locations)
-        await db.courier_locations.insert_one(location_doc)
+        # Cache latest location (pooled async client, 10 minutes TTL)
+        cached = await cache_latest_locations([payload])
         
-        # Maintain only last 100 locations per courier
-        try:
-            # Count total locations for this courier
-            total_count = await db.courier_locations.count_documents({"courier_id": courier_id})
-            
-            if total_count > 100:
-                # Remove oldest locations (keep most recent 100)
-                oldest_locations = await db.courier_locations.find(
-                    {"courier_id": courier_id}
-                ).sort("timestamp", 1).limit(total_count - 100).to_list(length=None)
-                
-                if oldest_locations:
-                    oldest_ids = [loc["_id"] for loc in oldest_locations]
-                    await db.courier_locations.delete_many({"_id": {"$in": oldest_ids}})
-                    print(f"🗑️ Cleaned up {len(oldest_ids)} old locations for courier {courier_id}")
-                    
-        except Exception as cleanup_error:
-            print(f"⚠️ Location cleanup failed: {cleanup_error}")
-            # Continue without cleanup
+        # Store in MongoDB history (write-behind batch insert - old points expire via TTL index)
+        await location_history_buffer.add(db, [build_history_doc(payload)])
         
         print(f"📍 COURIER LOCATION UPDATED: {courier_id} at ({location_data.lat}, {location_data.lng}) | Accuracy: {location_data.accuracy}m")
         
         # WebSocket broadcast for real-time updates
-        try:
-            from websocket_manager import websocket_manager
-            
-            # Broadcast to courier's own channel
-            await websocket_manager.send_courier_update(courier_id, {
-                "type": "location_updated",
-                "lat": location_data.lat,
-                "lng": location_data.lng,
-                "heading": location_data.heading,
-                "speed": location_data.speed,
-                "accuracy": location_data.accuracy
-            })
-            
-            # Find active orders for this courier and broadcast location to order tracking
-            from server import db
-            active_orders = await db.orders.find({
-                "courier_id": courier_id,
-                "status": {"$in": ["courier_assigned", "picked_up", "delivering"]}
-            }).to_list(length=None)
-            
-            for order in active_orders:
-                await websocket_manager.send_courier_location_to_order_subscribers(
-                    str(order["_id"]), 
-                    {
-                        "courier_id": courier_id,
-                        "lat": location_data.lat,
-                        "lng": location_data.lng,
-                        "heading": location_data.heading,
-                        "speed": location_data.speed,
-                        "accuracy": location_data.accuracy
-                    }
-                )
-            
-        except Exception as ws_error:
-            print(f"⚠️ WebSocket broadcast failed: {ws_error}")
+        await _publish_location(courier_id, payload)
         
         return CourierLocationResponse(
             courier_id=courier_id,
@@ -183,42 +142,89 @@ async def update_courier_location(
             detail=f"Error updating location: {str(e)}"
         )
 
+@router.post("/location/batch", response_model=CourierLocationBatchResponse)
+async def update_courier_location_batch(
+    batch: CourierLocationBatch,
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Upload several timestamped points at once (offline catch-up / low signal)
+    
+    Tüm noktalar geçmişe yazılır (write-behind); yalnızca en yeni nokta
+    anında cache'e ve WebSocket kanallarına yayınlanır.
+    """
+    try:
+        courier_id = current_user["id"]
+        received_at = datetime.now(timezone.utc)
+        
+        payloads = [
+            build_location_payload(
+                courier_id,
+                point.lat,
+                point.lng,
+                heading=point.heading,
+                speed=point.speed,
+                accuracy=point.accuracy,
+                timestamp=point.ts or received_at
+            )
+            for point in batch.points
+        ]
+        payloads.sort(key=lambda p: p["ts"])
+        latest = payloads[-1]
+        
+        await location_history_buffer.add(db, [build_history_doc(p) for p in payloads])
+        
+        # Only publish if this batch is newer than what trackers already saw
+        current = await get_latest_location(courier_id)
+        cached = False
+        if current is None or current.get("ts", 0) <= latest["ts"]:
+            cached = await cache_latest_locations([latest])
+            await _publish_location(courier_id, latest)
+        
+        print(f"📍 COURIER LOCATION BATCH: {courier_id} | {len(payloads)} points")
+        
+        return CourierLocationBatchResponse(
+            courier_id=courier_id,
+            accepted=len(payloads),
+            latest=CourierLocationResponse(
+                courier_id=courier_id,
+                lat=latest["lat"],
+                lng=latest["lng"],
+                heading=latest["heading"],
+                speed=latest["speed"],
+                accuracy=latest["accuracy"],
+                timestamp=datetime.fromisoformat(latest["timestamp"]),
+                cached=cached
+            )
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error updating courier location batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error updating location batch: {str(e)}"
+        )
+
 @router.get("/location/{courier_id}")
 async def get_courier_location(
     courier_id: str,
-    current_user: dict = Depends(get_courier_user)  # Any authenticated user can read
+    current_user: dict = Depends(get_courier_user),  # Any authenticated user can read
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get current courier location (from cache or database)
     """
     try:
-        from server import db
-        
-        location_data = None
-        cached = False
-        
-        # Try Redis cache first
-        try:
-            import redis
-            r = redis.Redis(host='localhost', port=6379, decode_responses=True, socket_connect_timeout=1)
-            
-            cache_key = f"courier:loc:{courier_id}"
-            cached_location = r.get(cache_key)
-            
-            if cached_location:
-                location_data = json.loads(cached_location)
-                cached = True
-                print(f"📍 COURIER LOCATION FROM CACHE: {courier_id}")
-                
-        except Exception as redis_error:
-            print(f"⚠️ Redis read failed: {redis_error}")
+        # Try cache first
+        location_data = await get_latest_location(courier_id)
+        cached = location_data is not None
         
         # Fallback to MongoDB if not cached
         if not location_data:
-            latest_location = await db.courier_locations.find_one(
-                {"courier_id": courier_id},
-                sort=[("timestamp", -1)]
-            )
+            latest_location = await get_last_stored_location(db, courier_id)
             
             if latest_location:
                 location_data = {
@@ -267,18 +273,15 @@ async def get_courier_location(
 async def get_courier_location_history(
     courier_id: str,
     limit: int = 50,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get courier location history (last N points)
     """
     try:
-        from server import db
-        
-        # Get location history (most recent first)
-        locations = await db.courier_locations.find(
-            {"courier_id": courier_id}
-        ).sort("timestamp", -1).limit(limit).to_list(length=limit)
+        # Get location history (most recent first, single indexed read)
+        locations = await get_location_history(db, courier_id, limit)
         
         # Convert to simple dict format
         location_list = []
@@ -292,12 +295,10 @@ async def get_courier_location_history(
                 "timestamp": loc["timestamp"].isoformat()
             })
         
-        total_count = await db.courier_locations.count_documents({"courier_id": courier_id})
-        
         return CourierLocationHistory(
             courier_id=courier_id,
             locations=location_list,
-            total_count=total_count
+            total_count=len(location_list)
         )
         
     except Exception as e:
@@ -3,12 +3,18 @@ Courier Ready Orders - Real-time map system
 GET endpoint for initial load + WebSocket for real-time updates
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 from datetime import datetime, timezone
 import asyncio
 import json
+from functools import lru_cache
 from auth_cookie import get_current_user_from_cookie_or_bearer
+from realtime.broadcast import broadcast_text, evict_all, serialize
+from utils import geohash
+from utils.city_normalize import normalize_city_name
 from pydantic import BaseModel
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/courier", tags=["courier-ready-orders"])
 
@@ -36,21 +42,135 @@ class ReadyOrderResponse(BaseModel):
     estimated_time: str
     created_at: datetime
 
-# Store active WebSocket connections for couriers
-active_courier_connections: Dict[str, List[WebSocket]] = {}
+# City keys are normalized on every broadcast; the fuzzy matcher is not free
+_city_key = lru_cache(maxsize=1024)(normalize_city_name)
+
+
+class ReadyOrderSubscriptions:
+    """
+    Courier /ws/ready connections indexed by city and geohash cell
+    An event is delivered to couriers in the order's city (city-wide subscribers
+    plus those in the pickup cell and its neighbours), so fan-out cost follows
+    local couriers rather than all connected couriers. Couriers without a city
+    keep receiving every event, matching their unfiltered initial snapshot.
+    """
+    
+    def __init__(self, precision: int = 5):
+        self.precision = precision
+        self._unscoped: Set[WebSocket] = set()
+        self._by_city: Dict[str, Set[WebSocket]] = {}
+        self._by_cell: Dict[str, Dict[str, Set[WebSocket]]] = {}
+        # websocket -> (courier_id, city, cell)
+        self._meta: Dict[WebSocket, Tuple[str, Optional[str], Optional[str]]] = {}
+    
+    def _cell(self, lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+        if lat is None or lng is None:
+            return None
+        return geohash.encode(lat, lng, self.precision)
+    
+    def subscribe(self, websocket: WebSocket, courier_id: str, city: Optional[str],
+                  lat: Optional[float] = None, lng: Optional[float] = None):
+        self.unsubscribe(websocket)
+        city = _city_key(city) if city else None
+        cell = self._cell(lat, lng) if city else None
+        self._meta[websocket] = (courier_id, city, cell)
+        if not city:
+            self._unscoped.add(websocket)
+        elif cell is None:
+            self._by_city.setdefault(city, set()).add(websocket)
+        else:
+            self._by_cell.setdefault(city, {}).setdefault(cell, set()).add(websocket)
+    
+    def move(self, websocket: WebSocket, lat: Optional[float], lng: Optional[float]):
+        """Re-index a courier after a position update"""
+        meta = self._meta.get(websocket)
+        if meta is None:
+            return
+        courier_id, city, cell = meta
+        if city and self._cell(lat, lng) != cell:
+            self.subscribe(websocket, courier_id, city, lat, lng)
+    
+    def unsubscribe(self, websocket: WebSocket):
+        meta = self._meta.pop(websocket, None)
+        if meta is None:
+            return
+        _, city, cell = meta
+        if not city:
+            self._unscoped.discard(websocket)
+        elif cell is None:
+            sockets = self._by_city.get(city)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self._by_city[city]
+        else:
+            cells = self._by_cell.get(city, {})
+            sockets = cells.get(cell)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del cells[cell]
+                if not cells:
+                    self._by_cell.pop(city, None)
+    
+    def targets(self, city: Optional[str] = None, lat: Optional[float] = None,
+                lng: Optional[float] = None) -> List[Tuple[Tuple[str, WebSocket], WebSocket]]:
+        """(key, websocket) pairs that should receive an event for this area"""
+        if not city:
+            # Unknown area: fall back to everyone
+            sockets = list(self._meta)
+        else:
+            city = _city_key(city)
+            sockets = list(self._unscoped)
+            sockets.extend(self._by_city.get(city, ()))
+            cells = self._by_cell.get(city, {})
+            cell = self._cell(lat, lng)
+            if cell is None:
+                for cell_sockets in cells.values():
+                    sockets.extend(cell_sockets)
+            else:
+                for neighbor in geohash.neighbors(cell):
+                    sockets.extend(cells.get(neighbor, ()))
+        return [((self._meta[ws][0], ws), ws) for ws in sockets]
+    
+    def __len__(self):
+        return len(self._meta)
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "connections": len(self._meta),
+            "cities": len(set(self._by_city) | set(self._by_cell)),
+            "cells": sum(len(cells) for cells in self._by_cell.values()),
+            "unscoped": len(self._unscoped)
+        }
+
+
+def _ready_order_subscriptions() -> ReadyOrderSubscriptions:
+    from config.settings import settings
+    return ReadyOrderSubscriptions(settings.READY_ORDERS_GEOHASH_PRECISION)
+
+
+# Active courier /ws/ready connections, indexed by area
+ready_order_subscriptions = _ready_order_subscriptions()
+
+
+def _parse_coordinate(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
 @router.get("/orders/ready", response_model=List[ReadyOrderResponse])
 async def get_ready_orders(
     city: Optional[str] = Query(None, description="Filter by city"),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get orders with status='ready_for_pickup' for courier map
     Initial load endpoint (polling fallback: call every 10s)
     """
     try:
-        from server import db
-        
         courier_city = current_user.get('city', '')
         
         # Build query - only ready_for_pickup orders
@@ -117,15 +237,22 @@ async def get_ready_orders(
 @router.websocket("/ws/ready")
 async def websocket_ready_orders(
     websocket: WebSocket,
-    token: str = Query(..., description="JWT token for authentication")
+    token: str = Query(..., description="JWT token for authentication"),
+    lat: Optional[float] = Query(None, description="Courier latitude (narrows updates to nearby cells)"),
+    lng: Optional[float] = Query(None, description="Courier longitude"),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     WebSocket endpoint for real-time ready order updates
-    ws://localhost:8001/api/courier/ws/ready?token=JWT_TOKEN
+    ws://localhost:8001/api/courier/ws/ready?token=JWT_TOKEN[&lat=..&lng=..]
     
     Broadcasts when:
     - Order status changes to 'ready_for_pickup'
     - Order is accepted by another courier (removed from ready list)
+    
+    Only events in the courier's city are delivered; with a position (query
+    params or {"type": "location", "lat": .., "lng": ..} messages) only those
+    in the courier's geohash cell and its neighbours.
     """
     courier_id = None
     try:
@@ -138,7 +265,6 @@ async def websocket_ready_orders(
             payload = jwt.decode(token, secret_key, algorithms=["HS256"])
             user_email = payload.get("sub")
             
-            from server import db
             user = await db.users.find_one({"email": user_email, "role": "courier"})
             
             if not user:
@@ -157,14 +283,11 @@ async def websocket_ready_orders(
         await websocket.accept()
         
         # Store connection
-        if courier_id not in active_courier_connections:
-            active_courier_connections[courier_id] = []
-        active_courier_connections[courier_id].append(websocket)
+        ready_order_subscriptions.subscribe(websocket, courier_id, courier_city, lat, lng)
         
         print(f"✅ Courier {courier_id} connected to ready orders WebSocket")
         
         # Send initial ready orders
-        from server import db
         query = {"status": "ready_for_pickup"}
         if courier_city:
             query["city"] = courier_city
@@ -185,6 +308,17 @@ async def websocket_ready_orders(
                 
                 if data == "ping":
                     await websocket.send_text("pong")
+                elif data.startswith("{"):
+                    try:
+                        msg = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    if msg.get("type") == "location":
+                        ready_order_subscriptions.move(
+                            websocket,
+                            _parse_coordinate(msg.get("lat")),
+                            _parse_coordinate(msg.get("lng"))
+                        )
                 
         except WebSocketDisconnect:
             print(f"📴 Courier {courier_id} disconnected from ready orders WebSocket")
@@ -196,44 +330,50 @@ async def websocket_ready_orders(
     
     finally:
         # Remove connection
-        if courier_id and courier_id in active_courier_connections:
-            if websocket in active_courier_connections[courier_id]:
-                active_courier_connections[courier_id].remove(websocket)
-            if not active_courier_connections[courier_id]:
-                del active_courier_connections[courier_id]
+        ready_order_subscriptions.unsubscribe(websocket)
 
-async def broadcast_ready_order_update(order_id: str, event_type: str, order_data: Optional[Dict] = None):
+async def broadcast_ready_order_update(
+    order_id: str,
+    event_type: str,
+    order_data: Optional[Dict] = None,
+    city: Optional[str] = None,
+    location: Optional[Dict[str, float]] = None
+):
     """
-    Broadcast ready order updates to all connected couriers
+    Broadcast ready order updates to couriers in the order's area
     
     event_type: 'new_ready' | 'order_accepted' | 'order_cancelled'
+    city/location: pickup city and {lat, lng}; default to order_data's
+    'city' and 'business_location'. Without a city every courier is notified.
     """
-    if not active_courier_connections:
+    if not len(ready_order_subscriptions):
         return
     
+    order_data = order_data or {}
+    city = city or order_data.get("city")
+    location = location or order_data.get("business_location") or {}
+    
     message = {
         "type": event_type,
         "order_id": order_id,
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "data": order_data or {}
+        "data": order_data
     }
     
-    # Send to all connected couriers
-    disconnected = []
-    for courier_id, connections in active_courier_connections.items():
-        for ws in connections:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                print(f"⚠️ Failed to send to courier {courier_id}: {e}")
-                disconnected.append((courier_id, ws))
+    # Serialize once, send to the area's couriers concurrently
+    targets = ready_order_subscriptions.targets(
+        city,
+        _parse_coordinate(location.get("lat")),
+        _parse_coordinate(location.get("lng"))
+    )
+    disconnected = await broadcast_text(targets, serialize(message))
+    if disconnected:
+        print(f"⚠️ Evicting {len(disconnected)} slow/failed courier ready-order WebSockets")
     
     # Clean up disconnected connections
-    for courier_id, ws in disconnected:
-        if courier_id in active_courier_connections and ws in active_courier_connections[courier_id]:
-            active_courier_connections[courier_id].remove(ws)
-            if not active_courier_connections[courier_id]:
-                del active_courier_connections[courier_id]
+    for _, ws in disconnected:
+        ready_order_subscriptions.unsubscribe(ws)
+    await evict_all(ws for _, ws in disconnected)
 
 # Export broadcast function for use in other modules
 __all__ = ['router', 'broadcast_ready_order_update']
@@ -16,6 +16,9 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 from auth_cookie import get_current_user_from_cookie_or_bearer
+from services import principals
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/courier", tags=["courier-reports"])
 
@@ -265,7 +268,8 @@ async def get_earnings_pdf(
     range: str = Query("daily", regex="^(daily|weekly|monthly)$"),
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Generate PDF earnings report for courier
@@ -274,8 +278,6 @@ async def get_earnings_pdf(
     from_date/to_date: YYYY-MM-DD format (optional, auto-calculated if not provided)
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Calculate date range
@@ -355,12 +357,11 @@ async def get_earnings_pdf(
 @router.put("/profile")
 async def update_courier_profile(
     profile: ProfileUpdateRequest,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update courier profile information"""
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Build update dict (only include non-None values)
@@ -393,6 +394,7 @@ async def update_courier_profile(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Courier not found")
+        principals.invalidate_user(courier_id)
         
         # Fetch updated profile
         updated_courier = await db.users.find_one({"id": courier_id})
@@ -423,12 +425,11 @@ async def update_courier_profile(
 
 @router.get("/availability")
 async def get_courier_availability(
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get courier availability schedule"""
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         courier = await db.users.find_one({"id": courier_id, "role": "courier"})
@@ -454,12 +455,11 @@ async def get_courier_availability(
 @router.post("/availability")
 async def set_courier_availability(
     availability: AvailabilityRequest,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Set courier availability schedule (persistent)"""
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Convert to dict for MongoDB storage
@@ -478,6 +478,7 @@ async def set_courier_availability(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Courier not found")
+        principals.invalidate_user(courier_id)
         
         return {
             "success": True,
@@ -504,7 +505,8 @@ async def get_courier_order_history(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     sort: str = Query("createdAt:desc"),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get courier order history with advanced filters
@@ -518,8 +520,6 @@ async def get_courier_order_history(
     - sort: Sort field and direction (createdAt:desc, total_amount:asc, etc.)
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Build query
@@ -558,6 +558,15 @@ async def get_courier_order_history(
         skip = (page - 1) * size
         orders = await db.orders.find(query).sort(sort_field, sort_direction).skip(skip).limit(size).to_list(length=None)
         
+        # Business info for the page in one $in query
+        business_ids = list({order['business_id'] for order in orders if order.get('business_id')})
+        businesses = {}
+        if business_ids:
+            async for business_doc in db.businesses.find(
+                {"_id": {"$in": business_ids}}, {"name": 1, "address": 1}
+            ):
+                businesses[business_doc["_id"]] = business_doc
+        
         # Enrich with business info and apply business filter if needed
         enriched_orders = []
         for order in orders:
@@ -566,7 +575,7 @@ async def get_courier_order_history(
             business_address = ''
             
             if business_id:
-                business_doc = await db.businesses.find_one({"_id": business_id})
+                business_doc = businesses.get(business_id)
                 if business_doc:
                     business_name = business_doc.get('name', 'Bilinmiyor')
                     business_address = business_doc.get('address', '')
@@ -9,6 +9,10 @@ from datetime import datetime, timezone
 
 from auth_cookie import get_current_user_from_cookie_or_bearer
 from models_package.courier_tasks import CourierTaskStatus
+from realtime.courier_orders import courier_order_index
+from services.user_summaries import UserSummaryLoader, display_name
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/courier/tasks", tags=["courier-tasks"])
 
@@ -43,73 +47,68 @@ async def get_nearby_businesses(
     lng: float = Query(..., description="Courier longitude"),
     lat: float = Query(..., description="Courier latitude"),
     radius_m: int = Query(7000, description="Search radius in meters"),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get nearby businesses with ready orders count for map display
     Returns: [{business_id, name, location, pending_ready_count, address_short}]
     """
-    from server import db
-    
     try:
-        # Simplified approach: Get all businesses with GPS coordinates first
-        businesses = await db.users.find({
-            "role": "business",
-            "kyc_status": "approved",
-            "lat": {"$exists": True, "$ne": None},
-            "lng": {"$exists": True, "$ne": None}
-        }).to_list(length=None)
-        
-        results = []
-        
-        for business in businesses:
-            try:
-                # Calculate distance using simple approximation
-                import math
-                
-                business_lat = float(business.get("lat", 0))
-                business_lng = float(business.get("lng", 0))
-                
-                # Haversine distance calculation
-                R = 6371000  # Earth radius in meters
-                lat1_rad = math.radians(lat)
-                lat2_rad = math.radians(business_lat)
-                delta_lat = math.radians(business_lat - lat)
-                delta_lng = math.radians(business_lng - lng)
-                
-                a = (math.sin(delta_lat/2) * math.sin(delta_lat/2) +
-                     math.cos(lat1_rad) * math.cos(lat2_rad) *
-                     math.sin(delta_lng/2) * math.sin(delta_lng/2))
-                c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                distance = R * c
-                
-                # Skip if outside radius
-                if distance > radius_m:
-                    continue
-                
-                # Count ready orders for this business
-                ready_count = await db.orders.count_documents({
-                    "business_id": business.get("id"),
-                    "status": "ready"
-                })
-                
-                # Only include businesses with ready orders
-                if ready_count > 0:
-                    results.append({
-                        "business_id": business.get("id"),
-                        "name": business.get("business_name", "Business"),
-                        "location": {
-                            "type": "Point",
-                            "coordinates": [business_lng, business_lat]
-                        },
-                        "pending_ready_count": ready_count,
-                        "address_short": business.get("address", ""),
-                        "distance": round(distance)
-                    })
-                    
-            except Exception as business_error:
-                print(f"⚠️ Error processing business {business.get('id')}: {business_error}")
-                continue
+        # One $geoNear pass over the users.location 2dsphere index, joined with
+        # ready-order counts (orders business_id + status index)
+        pipeline = [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [lng, lat]},
+                "key": "location",
+                "distanceField": "distance",
+                "maxDistance": radius_m,
+                "spherical": True,
+                "query": {"role": "business", "kyc_status": "approved"}
+            }},
+            {"$lookup": {
+                "from": "orders",
+                "let": {"business_id": "$id"},
+                "pipeline": [
+                    {"$match": {
+                        "status": "ready",
+                        "$expr": {"$eq": ["$business_id", "$$business_id"]}
+                    }},
+                    {"$count": "count"}
+                ],
+                "as": "ready"
+            }},
+            {"$addFields": {
+                "pending_ready_count": {"$ifNull": [{"$arrayElemAt": ["$ready.count", 0]}, 0]}
+            }},
+            # Only include businesses with ready orders
+            {"$match": {"pending_ready_count": {"$gt": 0}}},
+            {"$project": {
+                "_id": 0,
+                "id": 1,
+                "business_name": 1,
+                "address": 1,
+                "location": 1,
+                "distance": 1,
+                "pending_ready_count": 1
+            }}
+        ]
+        businesses = await db.users.aggregate(pipeline).to_list(length=None)
+        
+        results = [
+            {
+                "business_id": business.get("id"),
+                "name": business.get("business_name", "Business"),
+                "location": {
+                    "type": "Point",
+                    "coordinates": business["location"]["coordinates"]
+                },
+                "pending_ready_count": business["pending_ready_count"],
+                "address_short": business.get("address", ""),
+                "distance": round(business["distance"])
+            }
+            for business in businesses
+        ]
         
         print(f"✅ Found {len(results)} nearby businesses with ready orders")
         return results
@@ -122,14 +121,13 @@ async def get_nearby_businesses(
 async def get_business_available_orders(
     business_id: str,
     limit: int = Query(50, description="Max orders to return"),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get available (ready) orders for a specific business
     Returns order summary for courier to select and claim
     """
-    from server import db
-    
     try:
         # Get ready orders for this business
         orders = await db.orders.find({
@@ -145,12 +143,15 @@ async def get_business_available_orders(
         business_lat = business.get("lat") if business else None
         business_lng = business.get("lng") if business else None
         
+        # Customer info for all orders in one batched lookup
+        users = UserSummaryLoader(db)
+        await users.load_for_orders(orders)
+        
         # Format for courier view
         formatted = []
         for order in orders:
-            # Get customer info with phone
-            customer = await db.users.find_one({"id": order.get("customer_id")})
-            customer_name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip() if customer else "Müşteri"
+            customer = users.get(order.get("customer_id"))
+            customer_name = display_name(customer, "Müşteri")
             customer_phone = customer.get("phone", "") if customer else ""
             
             # Parse delivery address
@@ -211,13 +212,12 @@ async def get_business_available_orders(
 
 @router.get("/my-orders")
 async def get_courier_active_orders(
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get courier's active orders (assigned, picked_up, delivering)
     """
-    from server import db
-    
     try:
         courier_id = current_user["id"]
         
@@ -229,6 +229,10 @@ async def get_courier_active_orders(
         
         orders = await orders_cursor.to_list(length=50)
         
+        # Customers and businesses for all orders in one batched lookup
+        users = UserSummaryLoader(db)
+        await users.load_for_orders(orders, "customer_id", "business_id")
+        
         formatted = []
         for order in orders:
             # Get customer info with phone
@@ -236,7 +240,7 @@ async def get_courier_active_orders(
             customer_name = customer_info.get("name") or order.get("customer_name", "Müşteri")
             
             # Get customer phone
-            customer = await db.users.find_one({"id": order.get("customer_id")})
+            customer = users.get(order.get("customer_id"))
             customer_phone = customer.get("phone", "") if customer else ""
             
             # Parse delivery address and coordinates
@@ -259,7 +263,7 @@ async def get_courier_active_orders(
                     delivery_lng = address_snapshot.get("lng")
             
             # Parse business info for pickup
-            business = await db.users.find_one({"id": order.get("business_id")})
+            business = users.get(order.get("business_id"))
             business_name = business.get("business_name", "İşletme") if business else "İşletme"
             business_address = business.get("address", "") if business else ""
             business_phone = business.get("phone", "") if business else ""
@@ -315,13 +319,13 @@ async def get_courier_active_orders(
 @router.post("/orders/{order_id}/claim")
 async def claim_order(
     order_id: str,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Courier claims a ready order (atomic operation)
     Returns 200 if successful, 409 if already taken
     """
-    from server import db
     from datetime import datetime, timezone
     
     try:
@@ -355,6 +359,7 @@ async def claim_order(
         
         # Get full order details
         order = await db.orders.find_one({"id": order_id})
+        await courier_order_index.order_changed(order)
         
         # Broadcast WebSocket events
         try:
@@ -400,7 +405,8 @@ async def claim_order(
 @router.get("", response_model=List[TaskResponse])
 async def get_courier_tasks(
     status: Optional[str] = Query(None, description="Filter by status: waiting, assigned, picked_up, delivering, delivered"),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get courier tasks
@@ -410,8 +416,6 @@ async def get_courier_tasks(
     - status=assigned: Tasks assigned to this courier
     - No status: All tasks for this courier
     """
-    from server import db
-    
     try:
         courier_id = current_user["id"]
         
@@ -479,7 +483,8 @@ async def get_courier_tasks(
 @router.put("/{task_id}/accept", response_model=AcceptTaskResponse)
 async def accept_task(
     task_id: str,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Accept a courier task
@@ -488,7 +493,6 @@ async def accept_task(
     Updates courier_id to current user.
     Publishes WebSocket events.
     """
-    from server import db
     from realtime.event_bus import event_bus
     
     try:
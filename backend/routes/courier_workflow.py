@@ -6,11 +6,14 @@ from fastapi import APIRouter, HTTPException, Depends, status, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
-import math
 import asyncio
 import uuid
 from models import OrderStatus
 from auth_dependencies import get_courier_user
+from realtime.courier_orders import courier_order_index
+from services import business_stats
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/courier", tags=["courier-workflow"])
 
@@ -33,66 +36,53 @@ class OrderAcceptResponse(BaseModel):
     accepted_at: datetime
     pickup_address: dict
 
-def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371000  # Earth's radius in meters
-    
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lng2 - lng1)
-    
-    a = (math.sin(delta_phi / 2) ** 2 + 
-         math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
-
 @router.get("/orders/available", response_model=List[AvailableOrderResponse])
 async def get_available_orders(
     lat: float = Query(..., description="Courier current latitude"),
     lng: float = Query(..., description="Courier current longitude"),
     radius_m: Optional[int] = Query(5000, description="Search radius in meters"),
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get available orders for courier - courier_pending status only
     Sorted by proximity to business location (yakınlık sırasıyla)
     """
     try:
-        from server import db
-        
         print(f"🚚 COURIER {current_user['id']} requesting available orders at ({lat}, {lng})")
         
-        # Find orders with courier_pending status
-        available_orders = await db.orders.find({
-            "status": "courier_pending"
-        }).to_list(length=None)
-        
-        print(f"📦 Found {len(available_orders)} courier_pending orders")
+        # courier_pending orders within radius, nearest first, straight from the
+        # orders (status, pickup_location) 2dsphere index - pickup business
+        # name/address/location are denormalized onto the order
+        available_orders = await db.orders.aggregate([
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [lng, lat]},
+                "key": "pickup_location",
+                "distanceField": "distance_m",
+                "maxDistance": radius_m,
+                "spherical": True,
+                "query": {"status": "courier_pending"}
+            }},
+            {"$project": {
+                "business_id": 1,
+                "pickup_location": 1,
+                "pickup_business_name": 1,
+                "pickup_address": 1,
+                "total_amount": 1,
+                "delivery_address": 1,
+                "created_at": 1,
+                "distance_m": 1
+            }}
+        ]).to_list(length=None)
+        
+        print(f"📦 Found {len(available_orders)} courier_pending orders within {radius_m}m")
         
-        if not available_orders:
-            return []
-        
-        # Get business locations and calculate distances
         order_responses = []
         
         for order in available_orders:
             try:
-                # Get business location
-                business = await db.businesses.find_one({"_id": order["business_id"]})
-                if not business or not business.get("location"):
-                    continue
-                
-                # Calculate distance from courier to business
-                business_coords = business["location"]["coordinates"]  # [lng, lat]
-                business_lat, business_lng = business_coords[1], business_coords[0]
-                
-                distance = calculate_distance(lat, lng, business_lat, business_lng)
-                
-                # Skip if outside radius
-                if distance > radius_m:
-                    continue
+                business_lng, business_lat = order["pickup_location"]["coordinates"][:2]
+                distance = order["distance_m"]
                 
                 # Estimated pickup time (5 minutes + travel time based on distance)
                 travel_time_minutes = max(5, int(distance / 1000 * 3))  # 3 minutes per km minimum
@@ -101,8 +91,8 @@ async def get_available_orders(
                 order_responses.append(AvailableOrderResponse(
                     id=str(order["_id"]),
                     business_id=order["business_id"],
-                    business_name=business.get("name", "Unknown Business"),
-                    business_address=business.get("address", "Address not available"),
+                    business_name=order.get("pickup_business_name", "Unknown Business"),
+                    business_address=order.get("pickup_address", "Address not available"),
                     business_location={
                         "lat": business_lat,
                         "lng": business_lng
@@ -118,9 +108,7 @@ async def get_available_orders(
                 print(f"⚠️ Error processing order {order.get('_id')}: {e}")
                 continue
         
-        # Sort by distance (closest first - yakınlık sırasıyla)
-        order_responses.sort(key=lambda x: x.distance_m)
-        
+        # Already sorted by distance by $geoNear (closest first - yakınlık sırasıyla)
         print(f"✅ Returning {len(order_responses)} available orders sorted by distance")
         
         return order_responses
@@ -135,15 +123,14 @@ async def get_available_orders(
 @router.post("/{order_id}/accept", response_model=OrderAcceptResponse)
 async def accept_order(
     order_id: str,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Accept order - Atomik kilitle: yalnızca courier_pending'se courier_assigned + courier_id set
     Çift kabulda 409 (Conflict) döner
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         print(f"🤝 COURIER {courier_id} attempting to accept order {order_id}")
         
@@ -200,6 +187,7 @@ async def accept_order(
         }
         
         print(f"✅ ORDER ACCEPTED: {order_id} by courier {courier_id}")
+        await courier_order_index.order_changed(result)
         
         return OrderAcceptResponse(
             id=order_id,
@@ -221,14 +209,13 @@ async def accept_order(
 @router.post("/{order_id}/pickup")
 async def pickup_order(
     order_id: str,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Pickup order: courier_assigned → picked_up
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Atomic update with CAS
@@ -265,6 +252,7 @@ async def pickup_order(
                 raise HTTPException(status_code=409, detail="Pickup failed - status changed")
         
         print(f"📦 ORDER PICKED UP: {order_id} by courier {courier_id}")
+        await courier_order_index.order_changed(result)
         
         return {
             "id": order_id,
@@ -284,14 +272,13 @@ async def pickup_order(
 @router.post("/{order_id}/start_delivery")
 async def start_delivery(
     order_id: str,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Start delivery: picked_up → delivering
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Atomic update with CAS
@@ -328,6 +315,7 @@ async def start_delivery(
                 raise HTTPException(status_code=409, detail="Start delivery failed - status changed")
         
         print(f"🚚 DELIVERY STARTED: {order_id} by courier {courier_id}")
+        await courier_order_index.order_changed(result)
         
         return {
             "id": order_id,
@@ -347,7 +335,8 @@ async def start_delivery(
 @router.post("/{order_id}/deliver")
 async def deliver_order(
     order_id: str,
-    current_user: dict = Depends(get_courier_user)
+    current_user: dict = Depends(get_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Deliver order: delivering → delivered
@@ -357,8 +346,6 @@ async def deliver_order(
     - orders.totals.courier_earning = amount güncelle
     """
     try:
-        from server import db
-        
         courier_id = current_user["id"]
         
         # Get global settings for courier rate
@@ -413,6 +400,8 @@ async def deliver_order(
         await db.earnings.insert_one(earnings_record)
         
         print(f"✅ ORDER DELIVERED: {order_id} by courier {courier_id} | Earning: ₺{courier_rate}")
+        await courier_order_index.order_changed(result)
+        business_stats.schedule_sync(db, result)
         
         return {
             "id": order_id,
@@ -4,18 +4,18 @@ Get active advertisements based on customer's city
 """
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter()
 
 @router.get("/active")
-async def get_active_advertisements(city: Optional[str] = None):
+async def get_active_advertisements(city: Optional[str] = None, db: AsyncIOMotorDatabase = Depends(get_db)):
     """
     Get active advertisements for customer's city
     If city is not provided, returns all active advertisements
     Supports both city-only and city-district format matching
     """
-    from server import db
-    
     try:
         # Build query
         query = {"is_active": True}
@@ -8,6 +8,9 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
 import uuid
 from auth_dependencies import get_customer_user
+from services import pricing
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/customer", tags=["customer-cart"])
 
@@ -36,12 +39,11 @@ class AddToCartRequest(BaseModel):
 
 @router.get("/cart", response_model=CartData)
 async def get_customer_cart(
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get customer's cart from database"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         # Find customer's cart
@@ -80,15 +82,44 @@ async def get_customer_cart(
             detail=f"Error getting cart: {str(e)}"
         )
 
+@router.get("/cart/preview")
+async def preview_customer_cart(
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Price the saved cart with current product prices (same engine as checkout)"""
+    try:
+        quote = await pricing.price_saved_cart(db, current_user["id"])
+        return {
+            "business_id": quote["business_id"],
+            "items": quote["items"],
+            "totals": {
+                "sub": quote["subtotal"],
+                "delivery": quote["delivery_fee"],
+                "discount": quote["discount"],
+                "grand": quote["grand"]
+            },
+            "min_order": quote["min_order"],
+            "below_minimum": quote["below_minimum"]
+        }
+        
+    except pricing.PricingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        print(f"❌ Error previewing cart: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error previewing cart: {str(e)}"
+        )
+
 @router.post("/cart")
 async def save_customer_cart(
     cart_data: CartData,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Save customer's cart to database"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         # Prepare cart document
@@ -120,12 +151,11 @@ async def save_customer_cart(
 @router.post("/cart/add")
 async def add_to_cart(
     add_request: AddToCartRequest,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Add item to customer's cart"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         # Get current cart
@@ -183,12 +213,11 @@ async def add_to_cart(
 
 @router.delete("/cart")
 async def clear_customer_cart(
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Clear customer's cart"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         # Delete cart
@@ -209,12 +238,11 @@ async def clear_customer_cart(
 async def update_cart_item_quantity(
     product_id: str,
     quantity: int,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update item quantity in cart"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         if quantity <= 0:
@@ -7,6 +7,9 @@ from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, Literal
 from datetime import datetime, timezone
 from auth_cookie import get_current_user_from_cookie_or_bearer
+from services import principals
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/customer", tags=["customer-profile"])
 
@@ -53,12 +56,11 @@ async def get_customer_user(current_user: dict = Depends(get_current_user_from_c
 @router.put("/profile")
 async def update_customer_profile(
     profile: ProfileUpdateRequest,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Update customer profile information"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         # Build update dict (only include non-None values)
@@ -85,6 +87,7 @@ async def update_customer_profile(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Customer not found")
+        principals.invalidate_user(customer_id)
         
         # Fetch updated profile
         updated_customer = await db.users.find_one({"_id": customer_id})
@@ -113,12 +116,11 @@ async def update_customer_profile(
 @router.post("/ratings")
 async def create_rating(
     rating: RatingRequest,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create rating for courier or business after order delivery"""
     try:
-        from server import db
-        
         customer_id = current_user["id"]
         
         # Verify order exists and belongs to customer
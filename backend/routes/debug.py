@@ -5,18 +5,18 @@ Geçici debug endpoint'i Atlas bağlantısı test için
 from fastapi import APIRouter, HTTPException, Depends
 from auth_dependencies import get_admin_user
 from datetime import datetime, timezone
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/__debug", tags=["debug"])
 
 @router.get("/db-ping")
-async def db_ping():
+async def db_ping(db: AsyncIOMotorDatabase = Depends(get_db)):
     """
     Atlas ping test - admin koruması olmadan kolay test için
     Production'da silinebilir veya admin koruması eklenebilir
     """
     try:
-        from server import db, client
-        
         print("🔍 Testing MongoDB Atlas connection...")
         
         # Atlas ping test
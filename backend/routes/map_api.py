@@ -1,71 +1,196 @@
 """
 Map API for Courier - Business markers with custom icons
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import List, Optional
+import math
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from typing import Dict, List, Optional, Tuple
 from auth_dependencies import get_current_user
+from utils.http_cache import etag_json_response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/map", tags=["map"])
 
+# Order statuses counted as "active" on business markers
+ACTIVE_ORDER_STATUSES = ["ready", "confirmed"]
+
+# At/above this zoom every business is its own marker
+CLUSTER_MAX_ZOOM = 15
+# Grid cell size in screen pixels (256px tiles)
+CLUSTER_CELL_PX = 64
+
+MAX_MARKERS = 500
+
+
+def _cell_size_deg(zoom: int) -> float:
+    """Grid cell edge in degrees for a web-mercator zoom level"""
+    return 360.0 / (2 ** zoom) / (256 / CLUSTER_CELL_PX)
+
+
+def _parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    if not bbox:
+        return None
+    try:
+        min_lng, min_lat, max_lng, max_lat = map(float, bbox.split(','))
+        return min_lng, min_lat, max_lng, max_lat
+    except ValueError:
+        return None  # Ignore invalid bbox
+
+
+def _snap_bbox(bbox, cell: float):
+    """Expand bbox to whole grid cells so small pans hit the same query (and ETag)"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (
+        math.floor(min_lng / cell) * cell,
+        math.floor(min_lat / cell) * cell,
+        math.ceil(max_lng / cell) * cell,
+        math.ceil(max_lat / cell) * cell
+    )
+
+
+def _business_pipeline(filter_query: Dict, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Match businesses (in id order, at most `limit`) and join active-order counts
+    in the same aggregation - the limit comes before the per-business $lookup
+    """
+    pipeline: List[Dict] = [
+        {"$match": filter_query},
+        # Stable input order keeps markers, cluster centroids and the ETag deterministic
+        {"$sort": {"id": 1}}
+    ]
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    return pipeline + [
+        {"$lookup": {
+            "from": "orders",
+            "let": {"business_id": "$id"},
+            "pipeline": [
+                {"$match": {
+                    "status": {"$in": ACTIVE_ORDER_STATUSES},
+                    "$expr": {"$eq": ["$business_id", "$$business_id"]}
+                }},
+                {"$count": "count"}
+            ],
+            "as": "active"
+        }},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "business_name": 1,
+            "address": 1,
+            "phone": 1,
+            "city": 1,
+            "district": 1,
+            "lat": 1,
+            "lng": 1,
+            "icon_url": 1,
+            "icon2x_url": 1,
+            "package_photo_url": 1,
+            "active_order_count": {"$ifNull": [{"$arrayElemAt": ["$active.count", 0]}, 0]}
+        }}
+    ]
+
+
+def _format_marker(business: Dict) -> Dict:
+    # Get icon URLs
+    package_photo = business.get("package_photo_url")
+    icon_url = business.get("icon_url") or package_photo or "/static/icons/box-default.png"
+    icon2x_url = business.get("icon2x_url") or package_photo or "/static/icons/box-default.png"
+
+    return {
+        "id": business.get("id"),
+        "name": business.get("business_name"),
+        "address": business.get("address", ""),
+        "phone": business.get("phone", ""),
+        "city": business.get("city", ""),
+        "district": business.get("district", ""),
+        "location": {
+            "lat": business.get("lat"),
+            "lng": business.get("lng")
+        },
+        "active_order_count": business.get("active_order_count", 0),
+        "icon_url": icon_url,
+        "icon2x_url": icon2x_url,
+        "package_photo_url": package_photo
+    }
+
+
 @router.get("/businesses")
 async def get_map_businesses(
+    request: Request,
     bbox: Optional[str] = Query(None, description="Bounding box: minLng,minLat,maxLng,maxLat"),
-    current_user: dict = Depends(get_current_user)
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Map zoom; below 15 markers are grid-clustered"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Get businesses for map display with custom icons and active order counts
+
+    Without zoom (or zoom >= 15): list of business markers.
+    With zoom < 15: {"zoom", "clusters": [...], "businesses": [...]} where
+    nearby businesses are merged into grid cells with summed active orders.
+    Responses carry an ETag; send If-None-Match to get 304 when unchanged.
     """
-    from server import db
-    
     try:
-        # Parse bbox if provided
         filter_query = {"role": "business", "kyc_status": "approved"}
-        
-        if bbox:
-            try:
-                min_lng, min_lat, max_lng, max_lat = map(float, bbox.split(','))
-                filter_query.update({
-                    "lat": {"$gte": min_lat, "$lte": max_lat},
-                    "lng": {"$gte": min_lng, "$lte": max_lng}
-                })
-            except:
-                pass  # Ignore invalid bbox
-        
-        # Get businesses
-        businesses = await db.users.find(filter_query).to_list(length=500)
-        
-        result = []
-        for business in businesses:
-            # Count active orders (ready status)
-            active_count = await db.orders.count_documents({
-                "business_id": business.get("id"),
-                "status": {"$in": ["ready", "confirmed"]}
+        clustered = zoom is not None and zoom < CLUSTER_MAX_ZOOM
+        cell = _cell_size_deg(zoom) if clustered else None
+
+        # Parse bbox if provided
+        box = _parse_bbox(bbox)
+        if box and clustered:
+            box = _snap_bbox(box, cell)
+        if box:
+            min_lng, min_lat, max_lng, max_lat = box
+            filter_query.update({
+                "lat": {"$gte": min_lat, "$lte": max_lat},
+                "lng": {"$gte": min_lng, "$lte": max_lng}
             })
-            
-            # Get icon URLs
-            package_photo = business.get("package_photo_url")
-            icon_url = business.get("icon_url") or package_photo or "/static/icons/box-default.png"
-            icon2x_url = business.get("icon2x_url") or package_photo or "/static/icons/box-default.png"
-            
-            result.append({
-                "id": business.get("id"),
-                "name": business.get("business_name"),
-                "address": business.get("address", ""),
-                "phone": business.get("phone", ""),
-                "city": business.get("city", ""),
-                "district": business.get("district", ""),
-                "location": {
-                    "lat": business.get("lat"),
-                    "lng": business.get("lng")
+
+        if not clustered:
+            pipeline = _business_pipeline(filter_query, MAX_MARKERS)
+            businesses = await db.users.aggregate(pipeline).to_list(length=MAX_MARKERS)
+            return etag_json_response(request, [_format_marker(b) for b in businesses])
+
+        # Grid clustering in the same aggregation: bucket by floor(coord / cell)
+        filter_query.setdefault("lat", {})["$type"] = "number"
+        filter_query.setdefault("lng", {})["$type"] = "number"
+        pipeline = _business_pipeline(filter_query) + [
+            {"$group": {
+                "_id": {
+                    "x": {"$floor": {"$divide": ["$lng", cell]}},
+                    "y": {"$floor": {"$divide": ["$lat", cell]}}
                 },
-                "active_order_count": active_count,
-                "icon_url": icon_url,
-                "icon2x_url": icon2x_url,
-                "package_photo_url": package_photo
+                "count": {"$sum": 1},
+                "active_order_count": {"$sum": "$active_order_count"},
+                "lat": {"$avg": "$lat"},
+                "lng": {"$avg": "$lng"},
+                "business": {"$first": "$$ROOT"}
+            }},
+            {"$sort": {"_id.x": 1, "_id.y": 1}}
+        ]
+        groups = await db.users.aggregate(pipeline).to_list(length=None)
+
+        clusters = []
+        singles = []
+        for group in groups:
+            if group["count"] == 1:
+                singles.append(_format_marker(group["business"]))
+                continue
+            clusters.append({
+                "id": f"{zoom}:{int(group['_id']['x'])}:{int(group['_id']['y'])}",
+                "count": group["count"],
+                "active_order_count": group["active_order_count"],
+                "location": {"lat": group["lat"], "lng": group["lng"]}
             })
-        
-        return result
-        
+
+        return etag_json_response(request, {
+            "zoom": zoom,
+            "bbox": list(box) if box else None,
+            "clusters": clusters,
+            "businesses": singles
+        })
+
     except Exception as e:
         print(f"❌ Map businesses error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
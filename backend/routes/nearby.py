@@ -2,13 +2,18 @@
 Nearby Businesses with 2dsphere Geospatial Queries
 Phase 2: Real Database Geospatial Implementation
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-import math
 from models import UserRole
 from auth_dependencies import get_current_user
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db, get_discovery_db
+from config.cache import async_cache_get_or_load
+from config.settings import settings as app_settings
+from services import menu_cache, nearby_discovery
+from utils import geo
 
 router = APIRouter(prefix="/nearby", tags=["geospatial"])
 
@@ -28,16 +33,22 @@ class NearbyBusinessResponse(BaseModel):
     menu_items: List[BusinessMenuSnippet]
     is_active: bool
 
+async def _load_settings():
+    db = get_db()
+    settings = await db.settings.find_one(
+        {"_id": "global"},
+        {"_id": 0, "nearby_radius_m": 1, "courier_rate_per_package": 1, "business_commission_pct": 1}
+    )
+    return settings or {
+        "nearby_radius_m": 5000,
+        "courier_rate_per_package": 20,
+        "business_commission_pct": 5
+    }
+
 async def get_settings():
-    """Get global settings from database"""
+    """Get global settings from database (read on every home-screen open, so cached briefly)"""
     try:
-        from server import db
-        settings = await db.settings.find_one({"_id": "global"})
-        return settings or {
-            "nearby_radius_m": 5000,
-            "courier_rate_per_package": 20,
-            "business_commission_pct": 5
-        }
+        return await async_cache_get_or_load("nearby:settings", _load_settings, app_settings.NEARBY_CACHE_TTL_S)
     except:
         return {
             "nearby_radius_m": 5000,
@@ -45,111 +56,57 @@ async def get_settings():
             "business_commission_pct": 5
         }
 
-def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371000  # Earth's radius in meters
-    
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lng2 - lng1)
-    
-    a = (math.sin(delta_phi / 2) ** 2 + 
-         math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
-
 @router.get("/businesses", response_model=List[NearbyBusinessResponse])
 async def get_nearby_businesses(
+    response: Response,
     lat: float = Query(..., description="Customer latitude"),
     lng: float = Query(..., description="Customer longitude"),
     radius_m: Optional[int] = Query(None, description="Search radius in meters"),
-    current_user: dict = Depends(get_current_user)
+    limit: Optional[int] = Query(
+        None, ge=1, le=app_settings.NEARBY_MAX_PAGE_SIZE,
+        description="Businesses per page (omit with no cursor for every business in range)"
+    ),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_discovery_db)
 ):
     """
-    Get nearby businesses using MongoDB 2dsphere geospatial query
-    Real database implementation - NO MOCK DATA
+    Get nearby businesses using one MongoDB $geoNear aggregation
+    Closest first, each with up to 5 available menu items. Without limit
+    and cursor every business in range is returned (legacy behaviour);
+    with either, results are paged and the X-Next-Cursor header holds the
+    cursor for the next page while more businesses are in range.
     """
     try:
-        from server import db
-        
         # Get search radius from settings or parameter
         settings = await get_settings()
-        search_radius = radius_m or settings.get("nearby_radius_m", 5000)
-        
-        print(f"🔍 Searching businesses within {search_radius}m of ({lat}, {lng})")
-        
-        # MongoDB 2dsphere geospatial query
-        # Convert meters to radians (MongoDB requirement)
-        radius_radians = search_radius / 6371000.0  # Earth radius in meters
-        
-        geospatial_query = {
-            "location": {
-                "$geoWithin": {
-                    "$centerSphere": [[lng, lat], radius_radians]
-                }
-            },
-            "is_active": True
-        }
-        
-        # Find nearby businesses from users collection (role: business)
-        geospatial_query["role"] = "business"
-        businesses = await db.users.find(geospatial_query).to_list(length=None)
-        
-        print(f"📍 Found {len(businesses)} businesses in radius")
-        
-        nearby_businesses = []
-        
-        for business in businesses:
-            try:
-                # Calculate precise distance
-                biz_coords = business["location"]["coordinates"]  # [lng, lat]
-                distance = calculate_distance(lat, lng, biz_coords[1], biz_coords[0])
-                
-                # Get menu items for this business (limit to 5 for preview)
-                menu_items = await db.menu_items.find({
-                    "business_id": str(business["_id"]),
-                    "is_available": True
-                }).limit(5).to_list(length=5)
-                
-                # Build menu snippets
-                menu_snippets = [
-                    BusinessMenuSnippet(
-                        id=str(item["_id"]),
-                        title=item["title"],
-                        price=item["price"],
-                        category=item.get("category", "Ana Yemek")
-                    )
-                    for item in menu_items
-                ]
-                
-                nearby_businesses.append(
-                    NearbyBusinessResponse(
-                        id=business.get("id", str(business["_id"])),
-                        name=business.get("business_name", business.get("name", "Unknown Business")),
-                        address=business.get("full_address", business.get("address", "")),
-                        distance_m=round(distance, 0),
-                        location={
-                            "lat": biz_coords[1],
-                            "lng": biz_coords[0]
-                        },
-                        menu_items=menu_snippets,
-                        is_active=business.get("is_active", True)
-                    )
-                )
-                
-            except Exception as e:
-                print(f"⚠️ Error processing business {business.get('name', 'Unknown')}: {e}")
-                continue
-        
-        # Sort by distance (closest first)
-        nearby_businesses.sort(key=lambda x: x.distance_m)
-        
-        print(f"✅ Returning {len(nearby_businesses)} processed businesses")
+        search_radius = int(radius_m or settings.get("nearby_radius_m", 5000))
+        
+        if limit is None and cursor is not None:
+            limit = app_settings.NEARBY_PAGE_SIZE
+        page = await nearby_discovery.find_page(db, lat, lng, search_radius, limit, cursor)
+        
+        # Pages are shared per geohash cell; distance is the caller's own
+        businesses = page["businesses"]
+        distances = geo.haversine_m(
+            lat, lng,
+            [business["location"]["lat"] for business in businesses],
+            [business["location"]["lng"] for business in businesses]
+        )
+        nearby_businesses = [
+            NearbyBusinessResponse(
+                **{key: value for key, value in business.items() if key != "search_distance"},
+                distance_m=round(float(distance), 0)
+            )
+            for business, distance in zip(businesses, distances)
+        ]
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
         
         return nearby_businesses
         
+    except nearby_discovery.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Nearby businesses error: {e}")
         raise HTTPException(
@@ -159,13 +116,13 @@ async def get_nearby_businesses(
 
 @router.get("/businesses/{business_id}/menu", response_model=List[BusinessMenuSnippet])
 async def get_business_full_menu(
+    request: Request,
     business_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    """Get full menu for a specific business"""
-    try:
-        from server import db
-        
+    """Get full menu for a specific business (cached per menu version, ETag)"""
+    async def build():
         # Verify business exists and is active (from users collection)
         business = await db.users.find_one({
             "id": business_id,
@@ -194,7 +151,11 @@ async def get_business_full_menu(
             )
             for item in menu_items
         ]
-        
+    
+    try:
+        return await menu_cache.cached_menu_response(
+            request, db, business_id, "nearby", build, cache_control="private, no-cache"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -9,6 +9,10 @@ from datetime import datetime, timezone
 import uuid
 from models import OrderStatus
 from auth_dependencies import get_business_user, get_courier_user, get_current_user
+from realtime.courier_orders import courier_order_index
+from services import business_stats
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/orders", tags=["order-status"])
 
@@ -52,7 +56,8 @@ COURIER_TRANSITIONS = {
 async def update_order_status(
     order_id: str,
     status_update: OrderStatusUpdate,
-    current_user: dict = Depends(get_current_user)  # Allow both business and courier
+    current_user: dict = Depends(get_current_user),  # Allow both business and courier
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     Update order status with CAS (Compare-And-Swap) locking
@@ -61,8 +66,6 @@ async def update_order_status(
     - Courier: courier_assigned → picked_up → delivering → delivered
     """
     try:
-        from server import db
-        
         # Find order by 'id' field (UUID) first, then try '_id' for backward compatibility
         order = await db.orders.find_one({"id": order_id})
         
@@ -150,6 +153,11 @@ async def update_order_status(
             "updated_by_role": user_role
         }
         
+        # Denormalize pickup location for the courier available-orders $geoNear feed
+        if status_update.to == "courier_pending" and not order.get("pickup_location"):
+            from services.business_locations import build_pickup_fields
+            update_data.update(await build_pickup_fields(db, order.get("business_id")))
+        
         # Use atomic findOneAndUpdate for CAS
         # Try with 'id' field first (UUID), fallback to '_id' if needed
         result = await db.orders.find_one_and_update(
@@ -180,6 +188,10 @@ async def update_order_status(
         
         print(f"🔄 ORDER STATUS UPDATE: {order_id} | {current_status} → {status_update.to} | By: {user_role} {current_user['id']}")
         
+        # Keep courier -> active orders index current for location fan-out
+        await courier_order_index.order_changed(result)
+        business_stats.schedule_sync(db, result)
+        
         # Broadcast status update via WebSocket
         try:
             from websocket_manager import websocket_manager
@@ -193,6 +205,27 @@ async def update_order_status(
         except Exception as ws_error:
             print(f"⚠️ WebSocket broadcast failed: {ws_error}")
         
+        # Tell couriers near the business that a new order is ready
+        if status_update.to == "ready":
+            try:
+                from routes.courier_ready_orders import broadcast_ready_order_update
+                from services.business_locations import pickup_area
+                city, location = await pickup_area(db, result.get("business_id"))
+                city = city or result.get("city")
+                await broadcast_ready_order_update(
+                    order_id,
+                    "new_ready",
+                    order_data={
+                        "business_id": result.get("business_id"),
+                        "city": city,
+                        "business_location": location
+                    },
+                    city=city,
+                    location=location
+                )
+            except Exception as ws_error:
+                print(f"⚠️ Ready order broadcast failed: {ws_error}")
+        
         return OrderStatusResponse(
             id=order_id,
             status=result["status"],
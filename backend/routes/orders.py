@@ -9,6 +9,9 @@ from datetime import datetime, timezone
 import uuid
 from models import UserRole, OrderStatus
 from auth_dependencies import get_customer_user
+from services import business_stats, pricing
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -53,12 +56,11 @@ class OrderResponse(BaseModel):
 @router.post("/", response_model=OrderResponse)
 async def create_order(
     order_data: OrderCreate,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Create new customer order"""
     try:
-        from server import db
-        
         # Verify business exists and is active
         business = await db.businesses.find_one({
             "_id": order_data.business_id,
@@ -71,29 +73,17 @@ async def create_order(
                 detail="Business not found or inactive"
             )
         
-        # Verify all products exist and are available
-        product_ids = [item.product_id for item in order_data.items]
-        products = await db.menu_items.find({
-            "_id": {"$in": product_ids},
-            "business_id": order_data.business_id,
-            "is_available": True
-        }).to_list(length=None)
-        
-        if len(products) != len(product_ids):
-            raise HTTPException(
-                status_code=400,
-                detail="Some products are not available or don't belong to this business"
+        # Resolve, validate and price all products in one query
+        try:
+            quote = await pricing.price_cart(
+                db, business, order_data.items, collection="menu_items", default_delivery_fee=10.0,
+                strict=True
             )
+        except pricing.PricingError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
         
-        # Calculate total amount
-        total_amount = 0
-        for item in order_data.items:
-            product = next((p for p in products if p["_id"] == item.product_id), None)
-            if product:
-                total_amount += product["price"] * item.quantity
-        
-        # Delivery fee
-        delivery_fee = 10.0
+        total_amount = quote["subtotal"]
+        delivery_fee = quote["delivery_fee"]
         
         # Determine payment status based on payment method
         payment_status = "pending"
@@ -131,6 +121,8 @@ async def create_order(
             
             result = await db.orders.insert_one(order_doc)
             
+            business_stats.schedule_sync(db, dict(order_doc))
+            
             print(f"✅ Order inserted successfully!")
             print(f"   Inserted ID: {result.inserted_id}")
             print(f"   Acknowledged: {result.acknowledged}")
@@ -202,12 +194,11 @@ async def create_order(
 
 @router.get("/my", response_model=List[OrderResponse])
 async def get_my_orders(
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get customer's own orders"""
     try:
-        from server import db
-        
         orders = await db.orders.find({
             "customer_id": current_user["id"]
         }).sort("created_at", -1).to_list(length=None)
@@ -253,12 +244,11 @@ async def get_my_orders(
 @router.get("/{order_id}/track")
 async def track_order(
     order_id: str,
-    current_user: dict = Depends(get_customer_user)
+    current_user: dict = Depends(get_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Track specific order - customer can only track their own orders"""
     try:
-        from server import db
-        
         order = await db.orders.find_one({
             "_id": order_id,
             "customer_id": current_user["id"]
@@ -274,15 +264,16 @@ async def track_order(
         courier_location = None
         if order["status"] in ["picked_up", "delivering"] and order.get("courier_id"):
             try:
-                # Check Redis first for real-time location
-                import redis
-                r = redis.Redis(host='localhost', port=6379, decode_responses=True)
-                location_key = f"courier_location:{order['courier_id']}"
-                location_data = r.get(location_key)
+                # Check cache first for real-time location
+                from services.courier_locations import get_latest_location
+                location_data = await get_latest_location(order["courier_id"])
                 
                 if location_data:
-                    import json
-                    courier_location = json.loads(location_data)
+                    courier_location = {
+                        "lat": location_data["lat"],
+                        "lng": location_data["lng"],
+                        "timestamp": location_data["timestamp"]
+                    }
                 else:
                     # Fallback to MongoDB
                     courier_loc = await db.courier_locations.find_one(
@@ -2,92 +2,44 @@
 Stable Restaurant Discovery - Emergency Rollback
 GET /restaurants with legacy stable projection
 """
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 from typing import Optional
-from math import radians, cos, sin, asin, sqrt
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_discovery_db
+from services import restaurant_search
 
 router = APIRouter(prefix="/restaurants", tags=["stable-discovery"])
 
-def haversine(lon1, lat1, lon2, lat2):
-    """Calculate distance in meters between two coordinates"""
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a)) 
-    r = 6371000  # Radius of earth in meters
-    return c * r
-
 @router.get("")
 async def get_restaurants_stable(
     lat: Optional[float] = Query(None),
     lng: Optional[float] = Query(None),
     q: Optional[str] = Query(None, description="Search query"),
-    limit: int = Query(20, le=100),
-    skip: int = Query(0, ge=0)
+    limit: int = Query(20, ge=1, le=100),
+    skip: int = Query(0, ge=0),
+    db: AsyncIOMotorDatabase = Depends(get_discovery_db)
 ):
     """
     Stable restaurant discovery endpoint
     Returns only open restaurants with essential fields
     """
-    from server import db
-    
     try:
-        # Build query - only open restaurants
-        query = {"is_open": True}
-        
-        # Text search if provided
-        if q:
-            query["$or"] = [
-                {"name": {"$regex": q, "$options": "i"}},
-                {"cuisine": {"$regex": q, "$options": "i"}}
-            ]
-        
-        # Stable projection - only essential fields
-        projection = {
-            "_id": 1,
-            "name": 1,
-            "logo": 1,
-            "cuisine": 1,
-            "latitude": 1,
-            "longitude": 1,
-            "estimated_delivery_time": 1,
-            "average_rating": 1,
-            "min_order_amount": 1,
-            "delivery_fee": 1,
-            "is_open": 1,
-            "address": 1
-        }
+        # Only open restaurants; q matches word prefixes of name / cuisine
+        # (Turkish-folded, search_grams index) instead of an unindexed $regex
+        query = restaurant_search.build_query(q)
         
-        # Fetch restaurants
-        restaurants = await db.businesses.find(query, projection).to_list(length=None)
-        
-        print(f"🔍 Found {len(restaurants)} open restaurants in DB")
-        
-        # Calculate distance if coords provided
         if lat is not None and lng is not None:
+            # Closest first within 6km - $geoNear stops after skip + limit
+            restaurants = await db.businesses.aggregate(
+                restaurant_search.nearby_pipeline(lat, lng, query, skip, limit)
+            ).to_list(length=limit)
             for resto in restaurants:
-                resto_lat = resto.get("latitude", 0)
-                resto_lng = resto.get("longitude", 0)
-                
-                if resto_lat and resto_lng:
-                    distance = haversine(lng, lat, resto_lng, resto_lat)
-                    resto["distance_m"] = int(distance)
-                else:
-                    resto["distance_m"] = 999999
-            
-            # Sort by distance
-            restaurants.sort(key=lambda x: x.get("distance_m", 999999))
-            
-            # Filter by max distance (6km)
-            restaurants = [r for r in restaurants if r.get("distance_m", 999999) <= 6000]
+                resto["distance_m"] = int(resto["distance_m"])
         else:
-            # No coords - sort by rating
-            restaurants.sort(key=lambda x: x.get("average_rating", 0), reverse=True)
-        
-        # Pagination
-        total = len(restaurants)
-        restaurants = restaurants[skip:skip+limit]
+            # No coords - sort by rating (open_rating / search_grams_open_rating index)
+            restaurants = await db.businesses.find(
+                query, restaurant_search.STABLE_PROJECTION
+            ).sort(restaurant_search.RATING_SORT).skip(skip).limit(limit).to_list(length=limit)
         
         # Format response
         result = []
@@ -109,7 +61,7 @@ async def get_restaurants_stable(
                 "distance_m": resto.get("distance_m")
             })
         
-        print(f"✅ Returning {len(result)} restaurants (total: {total})")
+        print(f"✅ Returning {len(result)} restaurants (skip: {skip})")
         
         return result
         
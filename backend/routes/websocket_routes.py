@@ -9,6 +9,8 @@ import os
 import json
 from websocket_manager import websocket_manager
 import logging
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from config.db import get_db
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +47,7 @@ async def get_user_from_token(token: str = Query(..., description="JWT token for
             return test_users[user_email]
         
         # Try database lookup
-        from server import db
+        db = get_db()
         user = await db.users.find_one({"email": user_email})
         
         if not user:
@@ -66,7 +68,8 @@ async def get_user_from_token(token: str = Query(..., description="JWT token for
 async def websocket_order_tracking(
     websocket: WebSocket, 
     order_id: str,
-    token: str = Query(..., description="JWT token for authentication")
+    token: str = Query(..., description="JWT token for authentication"),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """
     WebSocket endpoint for order tracking
@@ -80,7 +83,6 @@ async def websocket_order_tracking(
         user_info = await get_user_from_token(token)
         
         # Verify order access permission
-        from server import db
         order = await db.orders.find_one({"_id": order_id})
         
         if not order:
@@ -225,5 +227,9 @@ async def websocket_courier_tracking(
 
 @router.get("/stats")
 async def get_websocket_stats():
-    """Get WebSocket connection statistics"""
-    return websocket_manager.get_connection_stats()
\ No newline at end of file
+    """Get WebSocket connection and event bus statistics"""
+    from realtime.event_bus import event_bus
+    return {
+        **websocket_manager.get_connection_stats(),
+        "event_bus": event_bus.get_metrics()
+    }
\ No newline at end of file
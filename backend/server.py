@@ -3,10 +3,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
-import certifi
 import ssl
 from pathlib import Path
 
@@ -36,7 +36,6 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
-import redis
 import asyncio
 import time
 
@@ -168,99 +167,46 @@ if SENTRY_AVAILABLE:
 else:
     print("ℹ️  Sentry SDK not available - running without error monitoring")
 
-# MongoDB connection with error handling - Real Database Only
+# MongoDB connection - Real Database Only
+# One client per worker (config/db.py: pool sizing, per-workload read preference / write concern)
 mongo_url = os.getenv('MONGO_URL')
-client = None  # Global client for auth system
 
-if mongo_url:
-    try:
-        print("🔗 Connecting to MongoDB Atlas...")
-        print(f"📍 CA File: {certifi.where()}")
-        
-        # Check if this is Atlas or local MongoDB
-        is_atlas = 'mongodb+srv://' in mongo_url or 'mongodb.net' in mongo_url
-        
-        if is_atlas:
-            # Motor client with proper Atlas SSL settings
-            client = AsyncIOMotorClient(
-                mongo_url,
-                tls=True,
-                tlsCAFile=certifi.where(),
-                tlsAllowInvalidHostnames=True,
-                tlsAllowInvalidCertificates=True,
-                serverSelectionTimeoutMS=10000,
-                socketTimeoutMS=30000,
-                connectTimeoutMS=30000,
-                retryWrites=True,
-                w='majority'
-            )
-            print("🌍 Configured for MongoDB Atlas")
-        else:
-            # Local MongoDB client (no SSL)
-            client = AsyncIOMotorClient(
-                mongo_url,
-                serverSelectionTimeoutMS=5000
-            )
-            print("🏠 Configured for local MongoDB")
-        
-        # Extract database name from URL or use default
-        if '/' in mongo_url and mongo_url.split('/')[-1]:
-            db_name = mongo_url.split('/')[-1].split('?')[0]  # Handle query params
-        else:
-            db_name = 'kuryecini'
-            
-        db = client[db_name]
-        print(f"✅ MongoDB client created for Atlas: {db_name}")
-        print(f"📍 Database URL: {mongo_url[:50]}...[HIDDEN]")
-        
-        # Initialize cookie auth system
-        set_db_client(client)
-        set_addresses_db_client(db)
-        set_city_catalog_db_client(db)
-        set_ai_settings_db_client(db)
-        set_ai_assistant_db_client(db)
-        print("🍪 Cookie auth system initialized")
-    except Exception as e:
-        print(f"❌ MongoDB connection error: {e}")
-        print("🔍 Trying fallback connection method...")
-        
-        try:
-            # Fallback: Simple connection without SSL
-            client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
-                
-            if '/' in mongo_url and mongo_url.split('/')[-1]:
-                db_name = mongo_url.split('/')[-1].split('?')[0]
-            else:
-                db_name = 'kuryecini'
-                
-            db = client[db_name]
-            print(f"✅ Fallback MongoDB connection successful: {db_name}")
-            
-            # Initialize cookie auth system
-            set_db_client(client)
-            set_addresses_db_client(db)
-            set_city_catalog_db_client(db)
-            set_ai_settings_db_client(db)
-            set_ai_assistant_db_client(db)
-            print("🍪 Cookie auth system initialized")
-            
-        except Exception as e2:
-            print(f"❌ Fallback connection also failed: {e2}")
-            db = None
-            raise RuntimeError("Database connection required - no mock data allowed")
-else:
+if not mongo_url:
     print("❌ No MONGO_URL provided - Real database required!")
     raise RuntimeError("MONGO_URL environment variable required")
 
-# Redis connection for courier location caching
-redis_client = None
-try:
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-    redis_client.ping()  # Test connection
-    print("Redis connected successfully")
-except Exception as e:
-    print(f"Redis connection error: {e}")
-    redis_client = None
+from config.db import (
+    client, db, get_db, get_hot_db, get_reports_db, get_discovery_db, get_pool_stats, close_client
+)
+
+is_atlas = 'mongodb+srv://' in mongo_url or 'mongodb.net' in mongo_url
+print("🌍 Configured for MongoDB Atlas" if is_atlas else "🏠 Configured for local MongoDB")
+print(f"✅ MongoDB client created: {db.name}")
+print(f"📍 Database URL: {mongo_url[:50]}...[HIDDEN]")
+
+# Modules that still take the client/db by injection share the same one
+set_db_client(client)
+set_addresses_db_client(db)
+set_city_catalog_db_client(db)
+set_ai_settings_db_client(db)
+set_ai_assistant_db_client(db)
+print("🍪 Cookie auth system initialized")
+
+# Shared async Redis pool (courier location cache etc.) - NullCache fallback
+from config.cache import get_async_redis, get_cache_stats, init_async_cache, close_async_cache
+from services.courier_locations import (
+    build_history_doc, build_location_payload, cache_latest_locations, ensure_location_history_indexes,
+    get_last_stored_location, get_latest_location, location_history_buffer
+)
+from services import admin_reports, business_stats
+from services import menu_cache, menu_catalog, nearby_discovery, pricing, principals, user_summaries
+from realtime.courier_orders import courier_order_index
+from services.principals import load_principal
+from utils import geo
+from utils.http_cache import precompressed_response
+from services.user_summaries import UserSummaryLoader, display_name
+from services.business_locations import ensure_business_geo_indexes, ensure_pickup_location_indexes, geo_point
+from services.restaurant_search import ensure_restaurant_search_indexes, restaurant_search_indexer
 
 # Create uploads directory
 UPLOAD_DIR = Path("/app/backend/uploads")
@@ -385,32 +331,19 @@ async def health_check_legacy():
     summary="All Menu Items",
     description="Get all menu items from approved businesses in standardized format."
 )
-async def get_menus():
+async def get_menus(request: Request, city: Optional[str] = None):
     """
     **Legacy Menu Endpoint**
     
     Returns all menu items from approved businesses in a standardized format.
     Use `/api/menus/public` for enhanced restaurant structure.
+    Served from the precomputed catalog snapshot (optionally per `city`) with an ETag.
     """
     try:
-        # Get all products from all businesses
-        businesses = await db.users.find({"kyc_status": "approved"}).to_list(None)
-        all_menu_items = []
-        
-        for business in businesses:
-            # Get products for this business
-            products = await db.products.find({"business_id": business["id"]}).to_list(None)
-            for product in products:
-                menu_item = {
-                    "id": product.get("id", str(product.get("_id", ""))),
-                    "title": product.get("name", ""),
-                    "price": float(product.get("price", 0)),
-                    "imageUrl": product.get("image_url", ""),
-                    "category": product.get("category", "uncategorized")
-                }
-                all_menu_items.append(menu_item)
-        
-        return all_menu_items
+        entry = await menu_catalog.get_snapshot(db, menu_catalog.LEGACY, city)
+        return precompressed_response(
+            request, entry["etag"], entry["body"], lambda: menu_catalog.plain_body(entry), "public, no-cache"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -420,7 +353,7 @@ async def get_menus():
     summary="Public Restaurant Menus", 
     description="Get public menus from active and approved restaurants with full business information."
 )
-async def get_public_menus():
+async def get_public_menus(request: Request, city: Optional[str] = None):
     """
     **Public Restaurant Menus**
     
@@ -463,63 +396,15 @@ async def get_public_menus():
     - Only `is_active: true` businesses  
     - Only `is_available: true` products
     - Restaurants without available products are excluded
+    
+    Served from the precomputed catalog snapshot (optionally per `city`) with an ETag;
+    clients sending `If-None-Match` get `304 Not Modified` while it is unchanged.
     """
     try:
-        # Get only approved and active businesses
-        businesses = await db.users.find({
-            "kyc_status": "approved",
-            "is_active": True
-        }).to_list(None)
-        
-        if not businesses:
-            return {
-                "restaurants": [],
-                "message": "Şu an aktif restoran bulunmamaktadır.",
-                "count": 0
-            }
-        
-        restaurants_with_menus = []
-        
-        for business in businesses:
-            # Get active products for this business
-            products = await db.products.find({
-                "business_id": business["id"],
-                "is_available": True
-            }).to_list(None)
-            
-            if products:  # Only include restaurants with available products
-                restaurant_data = {
-                    "id": business.get("id"),
-                    "name": business.get("business_name", ""),
-                    "description": business.get("description", ""),
-                    "address": business.get("address", ""),
-                    "city": business.get("city", ""),
-                    "rating": business.get("rating", 5.0),
-                    "delivery_time": business.get("delivery_time", "30-45 dk"),
-                    "min_order": business.get("min_order_amount", 50.0),
-                    "menu": []
-                }
-                
-                for product in products:
-                    menu_item = {
-                        "id": product.get("id", str(product.get("_id", ""))),
-                        "name": product.get("name", ""),
-                        "description": product.get("description", ""),
-                        "price": float(product.get("price", 0)),
-                        "image_url": product.get("image_url", ""),
-                        "category": product.get("category", "Ana Yemek"),
-                        "preparation_time": product.get("preparation_time_minutes", 15)
-                    }
-                    restaurant_data["menu"].append(menu_item)
-                
-                restaurants_with_menus.append(restaurant_data)
-        
-        return {
-            "restaurants": restaurants_with_menus,
-            "count": len(restaurants_with_menus),
-            "message": f"{len(restaurants_with_menus)} aktif restoran bulundu." if restaurants_with_menus else "Aktif restoran bulunamadı."
-        }
-        
+        entry = await menu_catalog.get_snapshot(db, menu_catalog.PUBLIC, city)
+        return precompressed_response(
+            request, entry["etag"], entry["body"], lambda: menu_catalog.plain_body(entry), "public, no-cache"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Menü yüklenirken hata: {str(e)}")
 
@@ -548,12 +433,11 @@ async def api_health_check():
         
         # Test Redis if available
         redis_status = "not_configured"
-        if redis_client:
-            try:
-                redis_client.ping()
+        try:
+            if await get_async_redis().ping():
                 redis_status = "connected"
-            except Exception:
-                redis_status = "disconnected"
+        except Exception:
+            redis_status = "disconnected"
         
         return {
             "status": "healthy",
@@ -561,10 +445,17 @@ async def api_health_check():
             "database": {
                 "mongodb": "connected",
                 "collections": ["businesses", "menu_items", "orders", "courier_locations", "earnings", "settings"],
-                "settings_initialized": bool(settings)
+                "settings_initialized": bool(settings),
+                "courier_location_buffer": location_history_buffer.get_stats(),
+                "pool": get_pool_stats()
             },
             "cache": {
-                "redis": redis_status
+                "redis": redis_status,
+                "stats": get_cache_stats(),
+                "user_summaries": user_summaries.get_stats(),
+                "principals": principals.get_stats(),
+                "menus": menu_cache.get_stats(),
+                "nearby": nearby_discovery.get_stats()
             },
             "environment": {
                 "nearby_radius_m": int(os.getenv('NEARBY_RADIUS_M', 5000)),
@@ -684,6 +575,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor of GET /nearby/businesses, readable by browser clients
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Pydantic Models
@@ -955,7 +848,7 @@ def verify_refresh_token(token: str):
     except jwt.PyJWTError:
         return None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1015,7 +908,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if email in test_users:
         return test_users[email]
     
-    user = await db.users.find_one({"email": email})
+    user = await load_principal(db, email, request)
     if user is None:
         raise credentials_exception
     
@@ -1360,6 +1253,7 @@ async def register_business(business_data: BusinessRegister):
         "district": business_data.district,  # Required for location-based filtering
         "lat": lat,  # GPS latitude
         "lng": lng,  # GPS longitude
+        "location": geo_point(lat, lng),  # GeoJSON for $geoNear discovery
         "business_category": business_data.business_category,
         "description": business_data.description,
         "is_active": True,
@@ -1621,6 +1515,7 @@ async def update_business_status(status_data: dict, current_user: dict = Depends
         )
         
         if result.modified_count > 0:
+            principals.invalidate_user(business_id)
             return {
                 "success": True,
                 "status": is_open,
@@ -1631,57 +1526,6 @@ async def update_business_status(status_data: dict, current_user: dict = Depends
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Status update failed: {str(e)}")
 
-@api_router.get("/business/stats")
-async def get_business_stats(current_user: dict = Depends(get_approved_business_user)):
-    """Get business statistics and analytics"""
-    if current_user.get("role") != "business":
-        raise HTTPException(status_code=403, detail="Business access required")
-    
-    try:
-        # Get business statistics from database
-        business_id = current_user.get("user_id")
-        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Get today's orders for this business
-        today_orders = await db.orders.find({
-            "business_id": business_id,
-            "created_at": {"$gte": today.isoformat()}
-        }).to_list(length=None)
-        
-        # Calculate statistics
-        total_orders = len(today_orders)
-        total_revenue = sum(order.get("total_amount", 0) for order in today_orders)
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-        completed_orders = len([o for o in today_orders if o.get("status") == "delivered"])
-        completion_rate = (completed_orders / total_orders * 100) if total_orders > 0 else 100
-        
-        return {
-            "today": {
-                "orders": total_orders,
-                "revenue": total_revenue,
-                "avgOrderValue": avg_order_value,
-                "completionRate": completion_rate
-            },
-            "week": {
-                "orders": 187,
-                "revenue": 9876.25,
-                "growth": 12.5
-            },
-            "month": {
-                "orders": 756,
-                "revenue": 42315.75,
-                "growth": 18.7
-            },
-            "topProducts": [
-                {"name": "Chicken Burger", "sales": 245, "revenue": 11025.00},
-                {"name": "Margarita Pizza", "sales": 189, "revenue": 12285.00},
-                {"name": "Adana Kebap", "sales": 156, "revenue": 8580.00}
-            ],
-            "customerSatisfaction": 4.6
-        }
-    except Exception:
-        raise HTTPException(status_code=500, detail="Stats retrieval failed")
-
 @api_router.patch("/business/orders/{order_id}/status")
 async def update_business_order_status(
     order_id: str,
@@ -1740,6 +1584,8 @@ async def update_business_order_status(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Order not found or no changes made")
         
+        business_stats.schedule_sync(db, {**order, **update_data})
+        
         return {
             "message": f"Order status updated to {new_status}",
             "order_id": order_id,
@@ -1770,6 +1616,10 @@ async def get_available_orders_for_courier(current_user: dict = Depends(get_cour
         
         orders = await orders_cursor.to_list(length=None)
         
+        # Customer details for all orders in one batched lookup
+        users = UserSummaryLoader(db)
+        await users.load_for_orders(orders)
+        
         # Format orders for courier dashboard
         formatted_orders = []
         for order in orders:
@@ -1777,8 +1627,7 @@ async def get_available_orders_for_courier(current_user: dict = Depends(get_cour
             business = await db.businesses.find_one({"id": order.get("business_id")}) or \
                       await db.users.find_one({"id": order.get("business_id")})
             
-            # Get customer details
-            customer = await db.users.find_one({"id": order.get("customer_id")})
+            customer = users.get(order.get("customer_id"))
             
             formatted_order = {
                 "id": str(order.get("_id", order.get("id", ""))),
@@ -1853,6 +1702,8 @@ async def pickup_order(
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Order not found or already picked up")
+        # Location pings now fan out to this order's tracking channel
+        await courier_order_index.order_changed({**order, **update_data})
         
         return {
             "message": "Order picked up successfully",
@@ -1877,46 +1728,21 @@ async def update_courier_location(
         courier_id = current_user["id"]
         timestamp = location_data.ts or int(time.time() * 1000)
         
-        # Store current location in Redis for real-time access
-        if redis_client:
-            location_cache = {
-                "lat": location_data.lat,
-                "lng": location_data.lng,
-                "heading": location_data.heading or "",
-                "speed": location_data.speed or "",
-                "accuracy": location_data.accuracy or "",
-                "ts": timestamp
-            }
-            
-            # Store in Redis with 10-minute expiry
-            redis_key = f"courier:loc:{courier_id}"
-            redis_client.hset(redis_key, mapping=location_cache)
-            redis_client.expire(redis_key, 600)  # 10 minutes
-        
-        # Store in MongoDB for historical tracking (keep last 100 points)
-        location_record = {
-            "courier_id": courier_id,
-            "lat": location_data.lat,
-            "lng": location_data.lng,
-            "heading": location_data.heading,
-            "speed": location_data.speed,
-            "accuracy": location_data.accuracy,
-            "ts": timestamp,
-            "created_at": datetime.now(timezone.utc)
-        }
+        payload = build_location_payload(
+            courier_id,
+            location_data.lat,
+            location_data.lng,
+            heading=location_data.heading,
+            speed=location_data.speed,
+            accuracy=location_data.accuracy,
+            timestamp=datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+        )
         
-        await db.courier_locations.insert_one(location_record)
+        # Store current location in cache for real-time access (10-minute expiry)
+        await cache_latest_locations([payload])
         
-        # Keep only last 100 locations per courier
-        locations_count = await db.courier_locations.count_documents({"courier_id": courier_id})
-        if locations_count > 100:
-            # Remove oldest records beyond 100
-            old_locations = await db.courier_locations.find(
-                {"courier_id": courier_id}
-            ).sort("created_at", 1).limit(locations_count - 100).to_list(None)
-            
-            old_ids = [loc["_id"] for loc in old_locations]
-            await db.courier_locations.delete_many({"_id": {"$in": old_ids}})
+        # Store in MongoDB for historical tracking (write-behind, old points expire via TTL index)
+        await location_history_buffer.add(db, [build_history_doc(payload)])
         
         # Broadcast location update via WebSocket (if implemented)
         # broadcaster.publish(channel=f"courier:{courier_id}", message={"type": "location", "data": location_data.dict()})
@@ -1950,29 +1776,23 @@ async def get_courier_location(
             if not active_order:
                 raise HTTPException(status_code=403, detail="No active order with this courier")
         
-        # Get location from Redis first (real-time)
+        # Get location from cache first (real-time)
         location_data = None
-        if redis_client:
-            redis_key = f"courier:loc:{courier_id}"
-            cached_location = redis_client.hgetall(redis_key)
-            
-            if cached_location:
-                location_data = {
-                    "lat": float(cached_location.get("lat", 0)),
-                    "lng": float(cached_location.get("lng", 0)),
-                    "heading": float(cached_location["heading"]) if cached_location.get("heading") else None,
-                    "speed": float(cached_location["speed"]) if cached_location.get("speed") else None,
-                    "accuracy": float(cached_location["accuracy"]) if cached_location.get("accuracy") else None,
-                    "ts": int(cached_location.get("ts", 0)),
-                    "source": "realtime"
-                }
+        cached_location = await get_latest_location(courier_id)
+        if cached_location:
+            location_data = {
+                "lat": cached_location["lat"],
+                "lng": cached_location["lng"],
+                "heading": cached_location.get("heading"),
+                "speed": cached_location.get("speed"),
+                "accuracy": cached_location.get("accuracy"),
+                "ts": cached_location.get("ts", 0),
+                "source": "realtime"
+            }
         
         # Fall back to MongoDB if no Redis data
         if not location_data:
-            last_location = await db.courier_locations.find_one(
-                {"courier_id": courier_id},
-                sort=[("created_at", -1)]
-            )
+            last_location = await get_last_stored_location(db, courier_id)
             
             if last_location:
                 location_data = {
@@ -2032,29 +1852,23 @@ async def get_order_courier_location(
         
         # Get courier location
         location_data = None
-        if redis_client:
-            redis_key = f"courier:loc:{courier_id}"
-            cached_location = redis_client.hgetall(redis_key)
-            
-            if cached_location:
-                location_data = {
-                    "courier_id": courier_id,
-                    "lat": float(cached_location.get("lat", 0)),
-                    "lng": float(cached_location.get("lng", 0)),
-                    "heading": float(cached_location["heading"]) if cached_location.get("heading") else None,
-                    "speed": float(cached_location["speed"]) if cached_location.get("speed") else None,
-                    "accuracy": float(cached_location["accuracy"]) if cached_location.get("accuracy") else None,
-                    "ts": int(cached_location.get("ts", 0)),
-                    "last_updated": datetime.fromtimestamp(int(cached_location.get("ts", 0)) / 1000, tz=timezone.utc).isoformat(),
-                    "source": "realtime"
-                }
+        cached_location = await get_latest_location(courier_id)
+        if cached_location:
+            location_data = {
+                "courier_id": courier_id,
+                "lat": cached_location["lat"],
+                "lng": cached_location["lng"],
+                "heading": cached_location.get("heading"),
+                "speed": cached_location.get("speed"),
+                "accuracy": cached_location.get("accuracy"),
+                "ts": cached_location.get("ts", 0),
+                "last_updated": cached_location.get("timestamp"),
+                "source": "realtime"
+            }
         
         # Fall back to MongoDB
         if not location_data:
-            last_location = await db.courier_locations.find_one(
-                {"courier_id": courier_id},
-                sort=[("created_at", -1)]
-            )
+            last_location = await get_last_stored_location(db, courier_id)
             
             if last_location:
                 location_data = {
@@ -2065,7 +1879,7 @@ async def get_order_courier_location(
                     "speed": last_location.get("speed"),
                     "accuracy": last_location.get("accuracy"),
                     "ts": last_location.get("ts"),
-                    "last_updated": last_location["created_at"].isoformat(),
+                    "last_updated": last_location["timestamp"].isoformat(),
                     "source": "historical"
                 }
         
@@ -2102,6 +1916,7 @@ async def create_product(product_data: ProductCreate, current_user: dict = Depen
     }
     
     await db.products.insert_one(product_doc)
+    await menu_cache.menu_changed(db, current_user["id"])
     
     # Convert datetime to string
     product_doc["created_at"] = product_doc["created_at"].isoformat()
@@ -2186,6 +2001,7 @@ async def update_product(product_id: str, product_data: ProductCreate, current_u
         {"id": product_id},
         {"$set": update_data}
     )
+    await menu_cache.menu_changed(db, current_user["id"])
     
     return {"success": True, "message": "Product updated successfully"}
 
@@ -2201,6 +2017,7 @@ async def delete_product(product_id: str, current_user: dict = Depends(get_busin
         )
     
     await db.products.delete_one({"id": product_id})
+    await menu_cache.menu_changed(db, current_user["id"])
     
     return {"success": True, "message": "Product deleted successfully"}
 
@@ -2285,62 +2102,21 @@ async def create_order(
                 detail="Teslimat adresi gerekli"
             )
         
-        # 5. Create items snapshot with current prices
-        items_snapshot = []
-        subtotal = 0.0
-        
-        for item_data in items:
-            product_id = item_data.get('product_id') or item_data.get('id')
-            quantity = int(item_data.get('quantity', 1))
-            
-            # Get product from database
-            product = await db.products.find_one({"id": product_id}) or \
-                     await db.products.find_one({"_id": product_id})
-            
-            if not product:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Ürün bulunamadı: {product_id}"
-                )
-            
-            if not product.get('is_available', True):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Ürün mevcut değil: {product.get('name', product_id)}"
-                )
-            
-            item_price = float(product.get('price', 0))
-            item_subtotal = item_price * quantity
-            subtotal += item_subtotal
-            
-            items_snapshot.append({
-                "id": product.get('id', str(product.get('_id'))),
-                "name": product.get('name') or product.get('title', 'Ürün'),
-                "price": item_price,
-                "quantity": quantity,
-                "notes": item_data.get('notes'),
-                "subtotal": item_subtotal
-            })
-        
-        # 6. Calculate totals
-        delivery_fee = float(restaurant.get('delivery_fee', 0))
-        discount = 0.0  # TODO: Apply coupons if any
+        # 5-6. Price the basket (products resolved in one query) and check minimum order
+        try:
+            quote = await pricing.price_cart(db, restaurant, items)
+            pricing.check_minimum(quote)
+        except pricing.PricingError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
         
+        items_snapshot = quote["items"]
         totals = {
-            "sub": subtotal,
-            "delivery": delivery_fee,
-            "discount": discount,
-            "grand": subtotal + delivery_fee - discount
+            "sub": quote["subtotal"],
+            "delivery": quote["delivery_fee"],
+            "discount": quote["discount"],  # TODO: Apply coupons if any
+            "grand": quote["grand"]
         }
         
-        # Check minimum order
-        min_order = float(restaurant.get('min_order_amount', 0))
-        if subtotal < min_order:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Minimum sipariş tutarı: {min_order} TL (Sepet: {subtotal} TL)"
-            )
-        
         # 7. Generate unique order code
         from utils.order_code import generate_unique_order_code
         order_code = await generate_unique_order_code(db)
@@ -2387,8 +2163,19 @@ async def create_order(
             "updated_at": now
         }
         
-        # 9. Insert order
-        result = await db.orders.insert_one(order_doc)
+        # 9. Insert order (a duplicate code can only be one issued before the counter - draw the next)
+        for _ in range(3):
+            try:
+                result = await db.orders.insert_one(order_doc)
+                break
+            except DuplicateKeyError as e:
+                if "order_code" not in str(e):
+                    raise
+                order_code = await generate_unique_order_code(db)
+                order_doc["order_code"] = order_code
+                order_doc.pop("_id", None)
+        else:
+            raise HTTPException(status_code=500, detail="Sipariş kaydedilemedi")
         
         if not result.acknowledged:
             raise HTTPException(
@@ -2396,6 +2183,8 @@ async def create_order(
                 detail="Sipariş kaydedilemedi"
             )
         
+        business_stats.schedule_sync(db, dict(order_doc))
+        
         logger.info(f"✅ Order created: {order_code} ({order_id}) | Restaurant: {restaurant.get('business_name')} | Business ID: {restaurant_id} | Customer: {order_doc['customer_name']} | Total: {totals['grand']} TL")
         
         # 10. Publish real-time event
@@ -2669,6 +2458,7 @@ async def accept_order(order_id: str, current_user: dict = Depends(get_current_u
         {"id": order_id},
         {"$set": update_data}
     )
+    await courier_order_index.order_changed({**order, **update_data})
     
     return {
         "success": True, 
@@ -2719,6 +2509,8 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_admin_user)
             # Delete using ObjectId
             result = await db.users.delete_one({"_id": object_id})
             if result.deleted_count > 0:
+                principals.invalidate_user(user_id, email=user.get("email"))
+                await menu_cache.menu_changed(db, user.get("id"))
                 return {"message": "User deleted successfully", "user_id": user_id, "format": "ObjectId"}
     except:
         pass
@@ -2729,6 +2521,8 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_admin_user)
         # Delete using id field
         result = await db.users.delete_one({"id": user_id})
         if result.deleted_count > 0:
+            principals.invalidate_user(user_id, email=user.get("email"))
+            await menu_cache.menu_changed(db, user_id)
             return {"message": "User deleted successfully", "user_id": user_id, "format": "UUID"}
     
     # If not found by either method
@@ -2829,24 +2623,24 @@ async def update_product_admin(
         
         update_data["updated_at"] = datetime.now(timezone.utc)
         
-        # Update product
+        # Update product (the previous document tells whose menu changed)
         from bson import ObjectId
         try:
-            result = await db.products.update_one(
+            product = await db.products.find_one_and_update(
                 {"_id": ObjectId(product_id)},
-                {"$set": update_data}
+                {"$set": update_data},
+                projection={"business_id": 1}
             )
         except:
-            result = await db.products.update_one(
+            product = await db.products.find_one_and_update(
                 {"id": product_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                projection={"business_id": 1}
             )
         
-        if result.matched_count == 0:
+        if product is None:
             raise HTTPException(status_code=404, detail="Product not found")
-        
-        if result.modified_count == 0:
-            raise HTTPException(status_code=400, detail="No changes made")
+        await menu_cache.menu_changed(db, product.get("business_id"))
         
         return {
             "message": "Product updated successfully",
@@ -2867,12 +2661,15 @@ async def delete_product_admin(product_id: str, current_user: dict = Depends(get
         
         # Delete product
         try:
-            result = await db.products.delete_one({"_id": ObjectId(product_id)})
+            product = await db.products.find_one_and_delete(
+                {"_id": ObjectId(product_id)}, projection={"business_id": 1}
+            )
         except:
-            result = await db.products.delete_one({"id": product_id})
+            product = await db.products.find_one_and_delete({"id": product_id}, projection={"business_id": 1})
         
-        if result.deleted_count == 0:
+        if product is None:
             raise HTTPException(status_code=404, detail="Product not found")
+        await menu_cache.menu_changed(db, product.get("business_id"))
         
         return {
             "message": "Product deleted successfully",
@@ -2936,8 +2733,20 @@ async def get_all_orders(current_user: dict = Depends(get_admin_user)):
     """Get all orders (Admin only)"""
     orders = await db.orders.find({}).to_list(length=None)
     
+    # Customer/business names for orders that don't carry them
+    users = UserSummaryLoader(db)
+    await users.load_for_orders(
+        [o for o in orders if not o.get("customer_name") or not o.get("business_name")],
+        "customer_id", "business_id"
+    )
+    
     # Convert datetime and ObjectId
     for order in orders:
+        if not order.get("customer_name"):
+            order["customer_name"] = display_name(users.get(order.get("customer_id")))
+        if not order.get("business_name"):
+            business = users.get(order.get("business_id"))
+            order["business_name"] = business.get("business_name", "") if business else ""
         order["id"] = str(order["_id"])
         del order["_id"]
         # Handle datetime conversion safely
@@ -3056,6 +2865,8 @@ async def update_order_status_admin(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Order not found or no changes made")
         
+        business_stats.schedule_sync(db, {**order, **update_data})
+        
         return {"message": f"Order status updated to {new_status}", "order_id": order_id, "new_status": new_status}
     
     except HTTPException:
@@ -3227,7 +3038,7 @@ async def track_order(order_id: str, current_user: dict = Depends(get_customer_u
         raise HTTPException(status_code=500, detail=f"Error tracking order: {str(e)}")
 
 @api_router.get("/admin/orders/stats")
-async def get_order_statistics(current_user: dict = Depends(get_admin_user)):
+async def get_order_statistics(current_user: dict = Depends(get_admin_user), db: AsyncIOMotorDatabase = Depends(get_reports_db)):
     """Get order statistics for admin dashboard"""
     try:
         # Get various order counts
@@ -3331,6 +3142,7 @@ async def upload_kyc_documents(
             {"id": courier_id},
             {"$set": update_data}
         )
+        principals.invalidate_user(courier_id)
     
     return {
         "message": "KYC belgeleri başarıyla yüklendi",
@@ -3400,6 +3212,7 @@ async def update_courier_kyc_status(
         {"id": courier_id},
         {"$set": update_data}
     )
+    principals.invalidate_user(courier_id)
     
     return {"success": True, "message": f"KYC status updated to {kyc_status}"}
 
@@ -3571,6 +3384,7 @@ async def update_courier_status_admin(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Courier not found")
+        principals.invalidate_user(courier_id)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="No changes made")
@@ -3602,6 +3416,7 @@ async def delete_courier_admin(courier_id: str, current_user: dict = Depends(get
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Courier not found")
+        principals.invalidate_user(courier_id)
         
         return {
             "message": "Courier deleted successfully",
@@ -4077,7 +3892,7 @@ async def get_promotion_statistics(current_user: dict = Depends(get_admin_user))
 
 # Admin Reports Management Endpoints
 @api_router.get("/admin/reports/dashboard")
-async def get_dashboard_reports(current_user: dict = Depends(get_admin_user)):
+async def get_dashboard_reports(current_user: dict = Depends(get_admin_user), db: AsyncIOMotorDatabase = Depends(get_reports_db)):
     """Get comprehensive dashboard reports (Admin only)"""
     try:
         # Time ranges
@@ -4086,38 +3901,21 @@ async def get_dashboard_reports(current_user: dict = Depends(get_admin_user)):
         week_start = today_start - timedelta(days=7)
         month_start = today_start - timedelta(days=30)
         
-        # Order statistics
-        total_orders = await db.orders.count_documents({})
-        today_orders = await db.orders.count_documents({"created_at": {"$gte": today_start}})
-        week_orders = await db.orders.count_documents({"created_at": {"$gte": week_start}})
-        
-        # Revenue statistics
-        revenue_pipeline = [
-            {"$match": {"status": {"$in": ["delivered", "completed"]}}},
-            {"$group": {
-                "_id": None,
-                "total_revenue": {"$sum": "$total_amount"},
-                "avg_order_value": {"$avg": "$total_amount"}
-            }}
-        ]
-        revenue_data = {"total_revenue": 0, "avg_order_value": 0}
-        async for result in db.orders.aggregate(revenue_pipeline):
-            revenue_data = {
-                "total_revenue": result.get("total_revenue", 0),
-                "avg_order_value": round(result.get("avg_order_value", 0), 2)
-            }
+        # Order and revenue statistics from materialized daily facts
+        all_time = await admin_reports.load_all_time(db)
+        week_days = await admin_reports.load_days(db, week_start, now)
+        today_key = admin_reports.day_key(today_start)
         
-        # Weekly revenue
-        weekly_revenue_pipeline = [
-            {"$match": {
-                "created_at": {"$gte": week_start},
-                "status": {"$in": ["delivered", "completed"]}
-            }},
-            {"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}
-        ]
-        weekly_revenue = 0
-        async for result in db.orders.aggregate(weekly_revenue_pipeline):
-            weekly_revenue = result.get("total", 0)
+        total_orders = all_time.get("orders", 0)
+        today_orders = admin_reports.total([d for d in week_days if d["_id"] == today_key], "orders")
+        week_orders = admin_reports.total(week_days, "orders")
+        
+        revenue_orders = all_time.get("revenue_orders", 0)
+        revenue_data = {
+            "total_revenue": all_time.get("revenue", 0),
+            "avg_order_value": round(all_time.get("revenue", 0) / revenue_orders, 2) if revenue_orders else 0
+        }
+        weekly_revenue = admin_reports.total(week_days, "revenue")
         
         # User statistics
         total_customers = await db.users.count_documents({"role": "customer"})
@@ -4129,29 +3927,14 @@ async def get_dashboard_reports(current_user: dict = Depends(get_admin_user)):
         active_couriers = await db.users.count_documents({"role": "courier", "is_active": True, "kyc_status": "approved"})
         
         # Order status distribution
-        status_pipeline = [
-            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-        ]
-        order_status_counts = {}
-        async for result in db.orders.aggregate(status_pipeline):
-            order_status_counts[result["_id"]] = result["count"]
+        order_status_counts = admin_reports.named_counts(all_time, "status")
         
         # Top cities by orders
-        city_pipeline = [
-            {"$lookup": {
-                "from": "users",
-                "localField": "customer_id",
-                "foreignField": "id",
-                "as": "customer"
-            }},
-            {"$unwind": "$customer"},
-            {"$group": {"_id": "$customer.city", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
-        ]
-        city_counts = {}
-        async for result in db.orders.aggregate(city_pipeline):
-            city_counts[result["_id"] or "Unknown"] = result["count"]
+        city_counts = dict(sorted(
+            admin_reports.named_counts(all_time, "cities").items(),
+            key=lambda item: item[1],
+            reverse=True
+        )[:10])
         
         return {
             "orders": {
@@ -4183,7 +3966,8 @@ async def get_dashboard_reports(current_user: dict = Depends(get_admin_user)):
 async def get_financial_reports(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_reports_db)
 ):
     """Get financial reports (Admin only)"""
     try:
@@ -4198,47 +3982,24 @@ async def get_financial_reports(
         else:
             end = datetime.now(timezone.utc)
         
-        # Revenue by date
-        daily_revenue_pipeline = [
-            {"$match": {
-                "created_at": {"$gte": start, "$lte": end},
-                "status": {"$in": ["delivered", "completed"]}
-            }},
-            {"$group": {
-                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                "revenue": {"$sum": "$total_amount"},
-                "orders": {"$sum": 1}
-            }},
-            {"$sort": {"_id": 1}}
+        # Revenue by date from materialized daily facts
+        days = await admin_reports.load_days(db, start, end)
+        daily_revenue = [
+            {"date": day["_id"], "revenue": day.get("revenue", 0), "orders": day.get("revenue_orders", 0)}
+            for day in days
+            if day.get("revenue_orders", 0)
         ]
-        daily_revenue = []
-        async for result in db.orders.aggregate(daily_revenue_pipeline):
-            daily_revenue.append({
-                "date": result["_id"],
-                "revenue": result["revenue"],
-                "orders": result["orders"]
-            })
         
         # Commission breakdown
-        commission_pipeline = [
-            {"$match": {
-                "created_at": {"$gte": start, "$lte": end},
-                "status": {"$in": ["delivered", "completed"]}
-            }},
-            {"$group": {
-                "_id": None,
-                "total_orders": {"$sum": 1},
-                "total_revenue": {"$sum": "$total_amount"},
-                "total_commission": {"$sum": "$commission_amount"}
-            }}
-        ]
         commission_data = {}
-        async for result in db.orders.aggregate(commission_pipeline):
+        if daily_revenue:
+            total_revenue = admin_reports.total(days, "revenue")
+            total_commission = admin_reports.total(days, "commission")
             commission_data = {
-                "total_orders": result.get("total_orders", 0),
-                "total_revenue": result.get("total_revenue", 0),
-                "total_commission": result.get("total_commission", 0),
-                "commission_rate": round((result.get("total_commission", 0) / result.get("total_revenue", 1)) * 100, 2) if result.get("total_revenue", 0) > 0 else 0
+                "total_orders": admin_reports.total(days, "revenue_orders"),
+                "total_revenue": total_revenue,
+                "total_commission": total_commission,
+                "commission_rate": round((total_commission / total_revenue) * 100, 2) if total_revenue > 0 else 0
             }
         
         return {
@@ -4261,7 +4022,8 @@ async def get_order_reports(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     status: Optional[str] = None,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_reports_db)
 ):
     """Get order reports with filters (Admin only)"""
     try:
@@ -4352,33 +4114,30 @@ async def get_order_reports(
                 }
         
         # Fetch orders
-        orders_cursor = db.orders.find(match_query).sort("created_at", -1).limit(100)
+        order_docs = await db.orders.find(match_query).sort("created_at", -1).to_list(length=100)
         orders = []
         
-        # Create user lookup dict for efficiency
+        # Businesses, customers and couriers for the page in one $in query
+        user_ids = {
+            order.get(field)
+            for order in order_docs
+            for field in ("business_id", "customer_id", "courier_id")
+            if order.get(field)
+        }
         user_cache = {}
-        
-        async for order in orders_cursor:
-            # Get business info
+        if user_ids:
+            async for user in db.users.find(
+                {"id": {"$in": list(user_ids)}},
+                {"_id": 0, "id": 1, "business_name": 1, "first_name": 1, "last_name": 1, "email": 1, "phone": 1}
+            ):
+                user_cache[user["id"]] = user
+        
+        for order in order_docs:
             business_id = order.get("business_id")
-            if business_id and business_id not in user_cache:
-                business = await db.users.find_one({"id": business_id})
-                user_cache[business_id] = business
             business_info = user_cache.get(business_id, {})
-            
-            # Get customer info
             customer_id = order.get("customer_id")
-            if customer_id and customer_id not in user_cache:
-                customer = await db.users.find_one({"id": customer_id})
-                user_cache[customer_id] = customer
             customer_info = user_cache.get(customer_id, {})
-            
-            # Get courier info
             courier_id = order.get("courier_id")
-            courier_info = {}
-            if courier_id and courier_id not in user_cache:
-                courier = await db.users.find_one({"id": courier_id})
-                user_cache[courier_id] = courier
             courier_info = user_cache.get(courier_id, {})
             
             orders.append({
@@ -4435,7 +4194,8 @@ async def get_order_reports(
 @api_router.get("/admin/reports/user")
 async def get_user_report(
     customer_name: str,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_reports_db)
 ):
     """Get user (customer) report with analytics (Admin only)"""
     try:
@@ -4526,18 +4286,20 @@ async def get_courier_order_history(
         courier_id = current_user.get("id")
         
         # Get all orders for this courier
-        orders_cursor = db.orders.find({
+        orders = await db.orders.find({
             "courier_id": courier_id
-        }).sort("created_at", -1).limit(100)
+        }).sort("created_at", -1).to_list(length=100)
+        
+        # Business and customer info for all orders in one batched lookup
+        users = UserSummaryLoader(db)
+        await users.load_for_orders(orders, "business_id", "customer_id")
         
         orders_list = []
         total_earnings = 0
         
-        async for order in orders_cursor:
-            # Get business info
-            business = await db.users.find_one({"id": order.get("business_id")})
-            # Get customer info
-            customer = await db.users.find_one({"id": order.get("customer_id")})
+        for order in orders:
+            business = users.get(order.get("business_id"))
+            customer = users.get(order.get("customer_id"))
             
             delivery_fee = order.get("delivery_fee", 0)
             courier_earning = delivery_fee * 0.8  # 80% goes to courier
@@ -4577,7 +4339,8 @@ async def get_courier_earnings_report(
     period: str = "daily",  # daily, weekly, monthly
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_current_courier_user)
+    current_user: dict = Depends(get_current_courier_user),
+    db: AsyncIOMotorDatabase = Depends(get_reports_db)
 ):
     """Get courier earnings report"""
     try:
@@ -4641,7 +4404,8 @@ async def get_courier_earnings_report(
 async def get_category_analytics(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_admin_user)
+    current_user: dict = Depends(get_admin_user),
+    db: AsyncIOMotorDatabase = Depends(get_reports_db)
 ):
     """Get category sales analytics (Admin only)"""
     try:
@@ -4656,36 +4420,20 @@ async def get_category_analytics(
         else:
             end = datetime.now(timezone.utc)
         
-        # Category sales from order items
-        category_pipeline = [
-            {"$match": {
-                "created_at": {"$gte": start, "$lte": end},
-                "status": {"$in": ["delivered", "completed"]}
-            }},
-            {"$unwind": "$items"},
-            {"$group": {
-                "_id": "$items.category",
-                "total_quantity": {"$sum": "$items.quantity"},
-                "total_revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}},
-                "order_count": {"$sum": 1}
-            }},
-            {"$sort": {"total_revenue": -1}}
+        # Category sales from materialized daily facts
+        days = await admin_reports.load_days(db, start, end)
+        categories = [
+            {
+                "category": entry["name"],
+                "quantity": entry["quantity"],
+                "revenue": entry["revenue"],
+                "order_count": entry["order_count"]
+            }
+            for entry in admin_reports.merge_categories(days).values()
+            if entry["order_count"]
         ]
-        
-        categories = []
-        total_revenue = 0
-        
-        async for result in db.orders.aggregate(category_pipeline):
-            category = result["_id"] or "Diğer"
-            revenue = result["total_revenue"]
-            total_revenue += revenue
-            
-            categories.append({
-                "category": category,
-                "quantity": result["total_quantity"],
-                "revenue": revenue,
-                "order_count": result["order_count"]
-            })
+        categories.sort(key=lambda c: c["revenue"], reverse=True)
+        total_revenue = sum(c["revenue"] for c in categories)
         
         # Calculate percentages
         for category in categories:
@@ -4717,7 +4465,8 @@ async def discover_nearby_businesses(
     lat: float,
     lng: float,
     radius_km: int = 50,
-    current_user: dict = Depends(get_current_customer_user)
+    current_user: dict = Depends(get_current_customer_user),
+    db: AsyncIOMotorDatabase = Depends(get_discovery_db)
 ):
     """Discover businesses within radius based on GPS location"""
     try:
@@ -4739,25 +4488,16 @@ async def discover_nearby_businesses(
                 }
             }
         }).limit(50)
+        businesses = await businesses_cursor.to_list(length=50)
+        
+        # Distances for all businesses in one vectorized pass
+        locations = [business.get("location", {}).get("coordinates", [0, 0]) for business in businesses]
+        distances_km = geo.haversine_m(
+            lat, lng, [loc[1] for loc in locations], [loc[0] for loc in locations]
+        ) / 1000
         
         businesses_list = []
-        async for business in businesses_cursor:
-            # Calculate distance
-            business_loc = business.get("location", {}).get("coordinates", [0, 0])
-            
-            # Simple distance calculation (Haversine would be better in production)
-            from math import radians, cos, sin, asin, sqrt
-            def haversine(lon1, lat1, lon2, lat2):
-                lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-                dlon = lon2 - lon1
-                dlat = lat2 - lat1
-                a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-                c = 2 * asin(sqrt(a))
-                km = 6371 * c
-                return km
-            
-            distance = haversine(lng, lat, business_loc[0], business_loc[1])
-            
+        for business, business_loc, distance in zip(businesses, locations, distances_km):
             businesses_list.append({
                 "id": business.get("id"),
                 "name": business.get("business_name"),
@@ -4765,7 +4505,7 @@ async def discover_nearby_businesses(
                 "city": business.get("city"),
                 "cuisine_type": business.get("cuisine_type", ""),
                 "rating": business.get("rating", 4.5),
-                "distance_km": round(distance, 2),
+                "distance_km": round(float(distance), 2),
                 "image_url": business.get("business_image_url"),
                 "location": {
                     "lat": business_loc[1],
@@ -4878,7 +4618,8 @@ async def get_public_businesses(
     city: Optional[str] = None,
     lat: Optional[float] = None,
     lng: Optional[float] = None,
-    radius_km: Optional[float] = 50  # Default 50km radius
+    radius_km: Optional[float] = 50,  # Default 50km radius
+    db: AsyncIOMotorDatabase = Depends(get_discovery_db)
 ):
     """Get all active businesses for customers with city and location filtering"""
     from utils.city_normalize import normalize_city_name
@@ -4982,6 +4723,8 @@ async def approve_user(user_id: str, current_user: dict = Depends(get_admin_user
                 {"$set": {"kyc_status": "approved"}}
             )
             if result.modified_count > 0:
+                principals.invalidate_user(user_id)
+                await menu_cache.menu_changed(db, user_id)
                 return {"success": True, "message": f"User {user_id} approved successfully", "format": "ObjectId"}
         except:
             pass
@@ -4993,6 +4736,8 @@ async def approve_user(user_id: str, current_user: dict = Depends(get_admin_user
         )
         
         if result.modified_count > 0:
+            principals.invalidate_user(user_id)
+            await menu_cache.menu_changed(db, user_id)
             return {"success": True, "message": f"User {user_id} approved successfully", "format": "UUID"}
         
         # If not found by either method
@@ -5043,6 +4788,8 @@ async def reject_user(user_id: str, request: dict, current_user: dict = Depends(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        principals.invalidate_user(user_id)
+        await menu_cache.menu_changed(db, user_id)
             
         return {"success": True, "message": f"User {user_id} rejected successfully"}
         
@@ -5055,7 +4802,7 @@ async def reject_user(user_id: str, request: dict, current_user: dict = Depends(
 
 # Restaurant Endpoints
 @api_router.get("/restaurants")
-async def get_restaurants(city: Optional[str] = None):
+async def get_restaurants(city: Optional[str] = None, db: AsyncIOMotorDatabase = Depends(get_discovery_db)):
     """Get restaurants by city"""
     from utils.city_normalize import normalize_city_name
     
@@ -5103,7 +4850,8 @@ async def get_restaurants(city: Optional[str] = None):
 async def get_nearby_restaurants(
     lat: float,
     lng: float,
-    radius: Optional[int] = 50000
+    radius: Optional[int] = 50000,
+    db: AsyncIOMotorDatabase = Depends(get_discovery_db)
 ):
     """Get nearby restaurants using geospatial query"""
     try:
@@ -5386,7 +5134,7 @@ async def set_default_address(
 # Include the API router in the main app
 # Restaurant Discovery Endpoints (New Customer App)
 @api_router.get("/restaurants/discover")
-async def discover_restaurants():
+async def discover_restaurants(db: AsyncIOMotorDatabase = Depends(get_discovery_db)):
     """Get featured/sponsored restaurants for discovery page"""
     try:
         # Get featured/popular businesses
@@ -5417,7 +5165,7 @@ async def discover_restaurants():
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/restaurants/near")
-async def get_nearby_restaurants(lat: float, lng: float, radius: int = 50000):
+async def get_nearby_restaurants(lat: float, lng: float, radius: int = 50000, db: AsyncIOMotorDatabase = Depends(get_discovery_db)):
     """Get restaurants within specified radius (default 50km)"""
     try:
         # Use 2dsphere index for geolocation queries
@@ -5435,16 +5183,14 @@ async def get_nearby_restaurants(lat: float, lng: float, radius: int = 50000):
             }
         }).to_list(None)
         
+        # Distances for display in one vectorized pass (businesses without
+        # coordinates are placed at the origin, i.e. distance 0)
+        coords = [business.get("location", {}).get("coordinates") or [lng, lat] for business in businesses]
+        distances_km = geo.haversine_m(lat, lng, [c[1] for c in coords], [c[0] for c in coords]) / 1000
+        
         restaurants = []
-        for business in businesses:
-            # Calculate distance for display
+        for business, distance in zip(businesses, distances_km):
             business_location = business.get("location", {})
-            if "coordinates" in business_location:
-                business_lng, business_lat = business_location["coordinates"]
-                distance = calculate_distance(lat, lng, business_lat, business_lng)
-            else:
-                distance = 0
-            
             restaurant = {
                 "id": business.get("id", str(business.get("_id", ""))),
                 "business_name": business.get("business_name", ""),
@@ -5456,7 +5202,7 @@ async def get_nearby_restaurants(lat: float, lng: float, radius: int = 50000):
                 "rating": business.get("rating", 4.5),
                 "delivery_time": "25-35 dk",
                 "min_order": 50.0,
-                "distance": round(distance, 1),
+                "distance": round(float(distance), 1),
                 "location": business_location
             }
             restaurants.append(restaurant)
@@ -5470,21 +5216,6 @@ async def get_nearby_restaurants(lat: float, lng: float, radius: int = 50000):
 
 # Duplicate endpoint removed - using enhanced version below
 
-def calculate_distance(lat1, lng1, lat2, lng2):
-    """Calculate distance between two coordinates using Haversine formula"""
-    from math import radians, cos, sin, asin, sqrt
-    
-    # Convert decimal degrees to radians
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-    
-    # Haversine formula
-    dlng = lng2 - lng1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Radius of earth in kilometers
-    return c * r
-
 # Profile & Customer App Endpoints
 @api_router.get("/profile/coupons")
 async def get_user_coupons(current_user: dict = Depends(get_current_user)):
@@ -5795,6 +5526,7 @@ async def change_password(
                 {"id": user_id},
                 {"$set": {"password": new_password_hash, "updated_at": datetime.now(timezone.utc).isoformat()}}
             )
+            principals.invalidate_user(user_id)
         
         return {"success": True, "message": "Password changed successfully"}
         
@@ -5836,6 +5568,7 @@ async def update_notification_settings(
             {"id": user_id},
             {"$set": {"notification_settings": notification_settings}}
         )
+        principals.invalidate_user(user_id)
         
         return {"success": True, "settings": notification_settings}
         
@@ -6027,6 +5760,8 @@ async def update_business_status_admin(
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Business not found")
+        principals.invalidate_user(business_id)
+        await menu_cache.menu_changed(db, business_id)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="No changes made")
@@ -6062,6 +5797,7 @@ async def delete_business_admin(business_id: str, current_user: dict = Depends(g
             await db.products.delete_many({"business_id": business_id})
             result = await db.businesses.delete_one({"id": business_id})
         
+        await menu_cache.menu_changed(db, business_id)
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Business not found")
         
@@ -6311,7 +6047,8 @@ async def get_businesses(
     lng: float = None, 
     radius: int = 5000,
     city: str = None,
-    district: str = None
+    district: str = None,
+    db: AsyncIOMotorDatabase = Depends(get_discovery_db)
 ):
     """Get list of active businesses (public endpoint for customers) - with city/district filtering"""
     try:
@@ -6386,7 +6123,7 @@ async def get_businesses(
         raise HTTPException(status_code=500, detail=f"Error fetching businesses: {str(e)}")
 
 @api_router.get("/businesses/{business_id}/products")
-async def get_business_products(business_id: str):
+async def get_business_products(business_id: str, db: AsyncIOMotorDatabase = Depends(get_discovery_db)):
     """Get products for a specific business (public endpoint for customers)"""
     try:
         print(f"🍽️ Getting products for business_id: {business_id}")
@@ -6725,15 +6462,18 @@ async def get_business_incoming_orders(current_user: dict = Depends(get_approved
             "status": {"$in": ["created", "pending", "placed"]}
         }).sort("created_at", -1).to_list(length=50)
         
+        # Customer details for all orders in one batched lookup
+        users = UserSummaryLoader(db)
+        await users.load_for_orders(orders)
+        
         formatted_orders = []
         for order in orders:
-            # Get customer details (use 'id' field, not '_id')
-            customer = await db.users.find_one({"id": order.get("customer_id")})
+            customer = users.get(order.get("customer_id"))
             customer_name = "Unknown Customer"
             customer_phone = ""
             
             if customer:
-                customer_name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip()
+                customer_name = display_name(customer)
                 customer_phone = customer.get("phone", "")
             
             # Parse delivery address properly
@@ -6798,14 +6538,17 @@ async def get_business_active_orders(current_user: dict = Depends(get_approved_b
             "status": {"$in": ["confirmed", "preparing", "ready"]}
         }).sort("created_at", -1).to_list(length=50)
         
+        # Customer details for all orders in one batched lookup
+        users = UserSummaryLoader(db)
+        await users.load_for_orders(orders)
+        
         formatted_orders = []
         for order in orders:
-            # Get customer details (use 'id' field, not '_id')
-            customer = await db.users.find_one({"id": order.get("customer_id")})
+            customer = users.get(order.get("customer_id"))
             customer_name = "Unknown Customer"
             
             if customer:
-                customer_name = f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip()
+                customer_name = display_name(customer)
             
             # Calculate preparation time elapsed
             preparation_time = 0
@@ -6871,77 +6614,30 @@ async def get_business_statistics(current_user: dict = Depends(get_approved_busi
         business_id = current_user["id"]
         now = datetime.now(timezone.utc)
         
-        # Today's stats
+        # All windows come from the hourly rollups (<= 31 * 24 small docs)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_orders = await db.orders.find({
-            "business_id": business_id,
-            "created_at": {"$gte": today_start},
-            "status": {"$in": ["delivered", "confirmed", "preparing", "ready"]}
-        }).to_list(length=None)
-        
-        today_revenue = sum(float(order.get("total_amount", 0)) for order in today_orders)
-        today_count = len(today_orders)
-        today_avg = today_revenue / today_count if today_count > 0 else 0
-        
-        # Week's stats
         week_start = now - timedelta(days=7)
-        week_orders = await db.orders.find({
-            "business_id": business_id,
-            "created_at": {"$gte": week_start},
-            "status": {"$in": ["delivered", "confirmed", "preparing", "ready"]}
-        }).to_list(length=None)
-        
-        week_revenue = sum(float(order.get("total_amount", 0)) for order in week_orders)
-        week_count = len(week_orders)
-        
-        # Month's stats
         month_start = now - timedelta(days=30)
-        month_orders = await db.orders.find({
-            "business_id": business_id,
-            "created_at": {"$gte": month_start},
-            "status": {"$in": ["delivered", "confirmed", "preparing", "ready"]}
-        }).to_list(length=None)
+        buckets = await business_stats.load_buckets(db, business_id, month_start)
         
-        month_revenue = sum(float(order.get("total_amount", 0)) for order in month_orders)
-        month_count = len(month_orders)
+        today = business_stats.sum_buckets(buckets, today_start)
+        today_revenue = today["revenue"]
+        today_count = today["orders"]
+        today_avg = today_revenue / today_count if today_count > 0 else 0
         
-        # Top products from recent orders
-        product_stats = {}
-        for order in month_orders:
-            for item in order.get("items", []):
-                product_name = item.get("name", "Unknown")
-                quantity = int(item.get("quantity", 1))
-                price = float(item.get("price", 0))
-                
-                if product_name not in product_stats:
-                    product_stats[product_name] = {"sales": 0, "revenue": 0}
-                
-                product_stats[product_name]["sales"] += quantity
-                product_stats[product_name]["revenue"] += price * quantity
+        week = business_stats.sum_buckets(buckets, week_start)
+        week_revenue = week["revenue"]
+        week_count = week["orders"]
         
-        top_products = sorted(
-            [{"name": name, **stats} for name, stats in product_stats.items()],
-            key=lambda x: x["revenue"],
-            reverse=True
-        )[:5]
-        
-        # Peak hours analysis
-        hour_stats = {}
-        for order in week_orders:
-            created_at = order.get("created_at")
-            if hasattr(created_at, 'hour'):
-                hour = created_at.hour
-                hour_range = f"{hour:02d}:00-{hour+1:02d}:00"
-                hour_stats[hour_range] = hour_stats.get(hour_range, 0) + 1
-        
-        peak_hours = sorted(
-            [{"hour": hour, "orders": count} for hour, count in hour_stats.items()],
-            key=lambda x: x["orders"],
-            reverse=True
-        )[:3]
+        month = business_stats.sum_buckets(buckets, month_start)
+        month_revenue = month["revenue"]
+        month_count = month["orders"]
+        
+        top_products = business_stats.top_products(buckets)
+        peak_hours = business_stats.peak_hours(buckets, week_start)
         
         # Completion rate (delivered vs total)
-        delivered_count = len([o for o in today_orders if o.get("status") == "delivered"])
+        delivered_count = today["delivered"]
         completion_rate = (delivered_count / today_count * 100) if today_count > 0 else 0
         
         return {
@@ -7077,11 +6773,9 @@ async def get_business_menu_items(current_user: dict = Depends(get_approved_busi
         raise HTTPException(status_code=500, detail=f"Failed to get menu: {str(e)}")
 
 @api_router.get("/business/public-menu/{business_id}/products")
-async def get_public_business_menu(business_id: str):
-    """Public endpoint to get menu items for a specific business (for customers)"""
-    try:
-        print(f"🔍 Getting public menu for business: {business_id}")
-        
+async def get_public_business_menu(request: Request, business_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
+    """Public endpoint to get menu items for a specific business (for customers, cached per menu version)"""
+    async def build():
         # Get all available menu items for this business
         products = await db.products.find({
             "business_id": business_id,
@@ -7106,16 +6800,18 @@ async def get_public_business_menu(business_id: str):
             })
         
         return menu_items
-        
+    
+    try:
+        return await menu_cache.cached_menu_response(request, db, business_id, "public-menu", build)
     except Exception as e:
         print(f"❌ Error getting public menu: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get menu: {str(e)}")
 
 
 @api_router.get("/business/public/{business_id}/menu")
-async def get_public_business_menu_alt(business_id: str):
+async def get_public_business_menu_alt(request: Request, business_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     """Alternative public endpoint (for frontend compatibility)"""
-    return await get_public_business_menu(business_id)
+    return await get_public_business_menu(request, business_id, db)
 
 @api_router.post("/business/menu")
 async def create_business_menu_item(
@@ -7153,6 +6849,7 @@ async def create_business_menu_item(
         # Insert into database
         try:
             result = await db.products.insert_one(menu_item)
+            await menu_cache.menu_changed(db, business_id)
             print(f"✅ Insert successful! Inserted ID: {result.inserted_id}")
             print(f"   Acknowledged: {result.acknowledged}")
         except Exception as insert_error:
@@ -7211,6 +6908,7 @@ async def update_business_menu_item(
             {"id": item_id},
             {"$set": update_data}
         )
+        await menu_cache.menu_changed(db, business_id)
         
         return {"message": "Menu item updated successfully"}
         
@@ -7236,6 +6934,7 @@ async def delete_business_menu_item(
         
         # Delete
         await db.products.delete_one({"id": item_id})
+        await menu_cache.menu_changed(db, business_id)
         
         return {"message": "Menu item deleted successfully"}
         
@@ -7319,6 +7018,8 @@ async def update_business_profile(
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Business not found or no changes made")
+        principals.invalidate_user(business_id)
+        await menu_cache.menu_changed(db, business_id)
         
         # Return updated profile
         updated_business = await db.users.find_one({"id": business_id})
@@ -7389,6 +7090,7 @@ async def process_payment(
                     }
                 }
             )
+            business_stats.schedule_sync(db, order_id)
         
         return {
             "success": True,
@@ -8521,6 +8223,7 @@ async def update_business_gps_coordinates(current_user: dict = Depends(get_admin
                         "$set": {
                             "lat": coordinates["lat"],
                             "lng": coordinates["lng"],
+                            "location": geo_point(coordinates["lat"], coordinates["lng"]),
                             "city_normalized": city_normalized,
                             "updated_at": datetime.now(timezone.utc)
                         }
@@ -8528,6 +8231,7 @@ async def update_business_gps_coordinates(current_user: dict = Depends(get_admin
                 )
                 
                 if update_result.modified_count > 0:
+                    principals.invalidate_user(business_id)
                     results.append({
                         "business_id": business_id,
                         "business_name": business_name,
@@ -8647,6 +8351,97 @@ api_router.include_router(map_router, tags=["map"])
 
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def startup_cache():
+    """Verify the pooled async Redis client (falls back to NullCache)"""
+    await init_async_cache()
+
+@app.on_event("startup")
+async def startup_event_bus():
+    """Start event bus transport (EVENT_BUS_BACKEND=redis fans out across workers)"""
+    from realtime.event_bus import start_event_bus
+    await start_event_bus()
+
+@app.on_event("shutdown")
+async def shutdown_event_bus():
+    from realtime.event_bus import stop_event_bus
+    await stop_event_bus()
+
+@app.on_event("startup")
+async def startup_courier_locations():
+    """Ensure courier location history indexes and start the write-behind buffer"""
+    await ensure_location_history_indexes(db)
+    # GPS history is high-volume and loss-tolerant - light write concern
+    location_history_buffer.start(get_hot_db())
+
+@app.on_event("shutdown")
+async def shutdown_courier_locations():
+    await location_history_buffer.stop()
+
+@app.on_event("startup")
+async def startup_business_geo_indexes():
+    """Backfill business / order pickup GeoJSON locations and ensure 2dsphere indexes for $geoNear"""
+    await ensure_business_geo_indexes(db)
+    await ensure_pickup_location_indexes(db)
+    await ensure_restaurant_search_indexes(db)
+    restaurant_search_indexer.start(db)
+
+@app.on_event("shutdown")
+async def shutdown_restaurant_search():
+    await restaurant_search_indexer.stop()
+
+@app.on_event("startup")
+async def startup_courier_order_index():
+    """Rebuild courier -> active orders index used by location fan-out"""
+    from realtime.event_bus import event_bus
+    await courier_order_index.attach(event_bus)
+    try:
+        count = await courier_order_index.rebuild(db)
+        print(f"✅ Courier order index rebuilt: {count} active orders")
+    except Exception as e:
+        print(f"⚠️ Courier order index rebuild failed (will retry): {e}")
+    courier_order_index.start(db)
+
+@app.on_event("shutdown")
+async def shutdown_courier_order_index():
+    await courier_order_index.detach()
+    await courier_order_index.stop()
+
+@app.on_event("startup")
+async def startup_menu_catalog():
+    """Build the public menu catalog snapshots (if missing) and keep them rebuilt"""
+    menu_catalog.menu_catalog_rebuilder.start(db)
+
+@app.on_event("shutdown")
+async def shutdown_menu_catalog():
+    await menu_catalog.menu_catalog_rebuilder.stop()
+
+@app.on_event("startup")
+async def startup_order_codes():
+    from utils.order_code import ensure_order_code_indexes
+    await ensure_order_code_indexes(db)
+
+@app.on_event("startup")
+async def startup_business_stats():
+    """Ensure rollup indexes and start the business stats backfill/reconcile loop"""
+    await business_stats.ensure_business_stats_indexes(db)
+    # Admin report facts are rebuilt (if missing) before the reconciler adds to them
+    await admin_reports.ensure_admin_facts(db)
+    business_stats.business_stats_reconciler.start(db)
+
+@app.on_event("shutdown")
+async def shutdown_business_stats():
+    await business_stats.business_stats_reconciler.stop()
+
+@app.on_event("shutdown")
+async def shutdown_cache():
+    await close_async_cache()
+
+@app.on_event("shutdown")
+async def shutdown_database():
+    """Close the shared MongoDB client (registered last - writers above flush first)"""
+    close_client()
+
 # WebSocket endpoint for real-time order notifications
 @app.websocket("/api/ws/orders")
 async def websocket_orders_endpoint(
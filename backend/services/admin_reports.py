@@ -0,0 +1,287 @@
+"""
+Materialized admin analytics (/admin/reports/*)
+One fact document per UTC day (plus an "all" document for lifetime totals)
+with order counts by status, revenue/commission for completed orders, orders
+by city and category sales. Kept current by business_stats.sync_order (same
+stats_status claim, so each transition is applied once) and rebuilt from
+orders when the collection is empty. The rebuild holds a lock document so
+instances starting together don't both rebuild (and double count), and
+order deltas wait for the lock to be released: the rebuild counts a claimed
+transition whose delta isn't applied yet under its previous status, and the
+delta lands on the rebuilt totals afterwards.
+"""
+import asyncio
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+FACTS = "admin_daily_facts"
+ALL_TIME = "all"
+REBUILD_LOCK = "rebuild_lock"
+# A lock older than this belongs to an instance that died mid-rebuild
+REBUILD_LOCK_TTL = timedelta(minutes=30)
+# Deltas that checked the lock just before it was taken land before the rebuild reads orders
+REBUILD_SETTLE_S = 2.0
+REBUILD_POLL_S = 0.5
+
+# Statuses whose total_amount counts as platform revenue
+REVENUE_STATUSES = {"delivered", "completed"}
+
+_SAFE_KEY = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def day_key(value) -> Optional[str]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _field_key(name: str) -> str:
+    # Map keys must not contain '.' or start with '$'
+    return name if _SAFE_KEY.match(name) else hashlib.sha1(name.encode("utf-8")).hexdigest()[:12]
+
+
+def order_city(order: Dict) -> Optional[str]:
+    """City recorded on the order itself (customer city is looked up otherwise)"""
+    address = order.get("delivery_address")
+    if isinstance(address, dict) and address.get("city"):
+        return address["city"]
+    return order.get("city")
+
+
+def order_facts(order: Dict, status: Optional[str]) -> Dict[str, float]:
+    """Counter values an order adds to its day while in `status`"""
+    if status is None:
+        return {}
+    inc: Dict[str, float] = {"orders": 1, f"status.{_field_key(status)}.count": 1}
+    if status in REVENUE_STATUSES:
+        inc["revenue"] = float(order.get("total_amount", 0) or 0)
+        inc["revenue_orders"] = 1
+        inc["commission"] = float(order.get("commission_amount", 0) or 0)
+        for item in order.get("items", []) or []:
+            key = f"categories.{_field_key(item.get('category') or 'Diğer')}"
+            quantity = item.get("quantity", 0) or 0
+            inc[f"{key}.quantity"] = inc.get(f"{key}.quantity", 0) + quantity
+            inc[f"{key}.revenue"] = inc.get(f"{key}.revenue", 0) + (item.get("price", 0) or 0) * quantity
+            inc[f"{key}.order_count"] = inc.get(f"{key}.order_count", 0) + 1
+    return inc
+
+
+def _names(order: Dict, status: Optional[str], city: Optional[str]) -> Dict[str, str]:
+    names = {}
+    if status:
+        names[f"status.{_field_key(status)}.name"] = status
+    if city:
+        names[f"cities.{_field_key(city)}.name"] = city
+    for item in order.get("items", []) or []:
+        category = item.get("category") or "Diğer"
+        names[f"categories.{_field_key(category)}.name"] = category
+    return names
+
+
+def facts_delta(order: Dict, old_status: Optional[str], new_status: Optional[str],
+                city: Optional[str] = None) -> Dict[str, float]:
+    """Change in facts when an order moves between statuses (city only on first count)"""
+    old = order_facts(order, old_status)
+    new = order_facts(order, new_status)
+    delta = {}
+    for field in set(old) | set(new):
+        value = new.get(field, 0) - old.get(field, 0)
+        if value:
+            delta[field] = value
+    if old_status is None and city:
+        delta[f"cities.{_field_key(city)}.count"] = 1
+    return delta
+
+
+async def apply_order_delta(db, order: Dict, old_status: Optional[str], new_status: Optional[str]):
+    """Apply an order's status change to its day document and the all-time document"""
+    day = day_key(order.get("created_at"))
+    if day is None:
+        return
+    city = None
+    if old_status is None:
+        city = order_city(order)
+        if not city and order.get("customer_id"):
+            customer = await db.users.find_one({"id": order["customer_id"]}, {"city": 1})
+            city = (customer or {}).get("city")
+        city = city or "Unknown"
+    inc = facts_delta(order, old_status, new_status, city)
+    if not inc:
+        return
+    await _wait_for_rebuild(db)
+    update = {"$inc": inc, "$set": _names(order, new_status, city)}
+    for doc_id in (day, ALL_TIME):
+        await db[FACTS].update_one({"_id": doc_id}, update, upsert=True)
+
+
+async def rebuild_facts(db) -> int:
+    """Recompute all facts from orders already counted by the rollups (one pass)"""
+    days: Dict[str, Dict] = {}
+    pending_city: List[Dict] = []
+    count = 0
+
+    def add(doc_id: str, inc: Dict[str, float], names: Dict[str, str]):
+        doc = days.setdefault(doc_id, {"inc": {}, "names": {}})
+        for field, value in inc.items():
+            doc["inc"][field] = doc["inc"].get(field, 0) + value
+        doc["names"].update(names)
+
+    async for order in db.orders.find(
+        {"stats_status": {"$exists": True, "$ne": None}},
+        {"_id": 1, "customer_id": 1, "stats_status": 1, "stats_pending": 1, "created_at": 1, "total_amount": 1,
+         "commission_amount": 1, "items": 1, "delivery_address.city": 1, "city": 1}
+    ):
+        day = day_key(order.get("created_at"))
+        status = counted_status(order)
+        if day is None or status is None:
+            continue
+        count += 1
+        if order_city(order):
+            city = order_city(order)
+        else:
+            pending_city.append(order)
+            city = None
+        inc = facts_delta(order, None, status, city)
+        names = _names(order, status, city)
+        add(day, inc, names)
+        add(ALL_TIME, inc, names)
+
+    # Customer cities in one $in per 1000 customers
+    customer_ids = list({o["customer_id"] for o in pending_city if o.get("customer_id")})
+    cities: Dict[str, str] = {}
+    for i in range(0, len(customer_ids), 1000):
+        async for user in db.users.find({"id": {"$in": customer_ids[i:i + 1000]}}, {"id": 1, "city": 1}):
+            if user.get("city"):
+                cities[user["id"]] = user["city"]
+    for order in pending_city:
+        city = cities.get(order.get("customer_id")) or "Unknown"
+        field = f"cities.{_field_key(city)}"
+        for doc_id in (day_key(order["created_at"]), ALL_TIME):
+            add(doc_id, {f"{field}.count": 1}, {f"{field}.name": city})
+
+    # The all-time document marks the facts as built, even with no orders yet
+    days.setdefault(ALL_TIME, {"inc": {}, "names": {}})["names"]["rebuilt_at"] = datetime.now(timezone.utc)
+
+    await db[FACTS].delete_many({"_id": {"$ne": REBUILD_LOCK}})
+    for doc_id, doc in days.items():
+        update = {"$set": doc["names"]} if doc["names"] else {}
+        if doc["inc"]:
+            update["$inc"] = doc["inc"]
+        await db[FACTS].update_one({"_id": doc_id}, update, upsert=True)
+    return count
+
+
+def counted_status(order: Dict) -> Optional[str]:
+    """Status an order's facts currently reflect (a claimed delta may not be applied yet)"""
+    pending = order.get("stats_pending")
+    if pending and not pending.get("admin"):
+        return pending.get("from")
+    return order.get("stats_status")
+
+
+def _lock_expired(lock: Dict) -> bool:
+    expires_at = lock.get("expires_at")
+    if not isinstance(expires_at, datetime):
+        return True
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at < datetime.now(timezone.utc)
+
+
+async def rebuild_running(db) -> bool:
+    lock = await db[FACTS].find_one({"_id": REBUILD_LOCK}, {"expires_at": 1})
+    return lock is not None and not _lock_expired(lock)
+
+
+async def _wait_for_rebuild(db):
+    """Hold a delta back while a rebuild runs (it is applied on top of the rebuilt totals)"""
+    while await rebuild_running(db):
+        await asyncio.sleep(REBUILD_POLL_S)
+
+
+async def _acquire_rebuild_lock(db) -> bool:
+    """Insert the rebuild lock (unique _id); only one instance gets it"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db[FACTS].insert_one({"_id": REBUILD_LOCK, "expires_at": now + REBUILD_LOCK_TTL})
+        return True
+    except DuplicateKeyError:
+        # Take over a stale lock left by a crashed instance
+        taken = await db[FACTS].update_one(
+            {"_id": REBUILD_LOCK, "expires_at": {"$lt": now}},
+            {"$set": {"expires_at": now + REBUILD_LOCK_TTL}}
+        )
+        return bool(taken.modified_count)
+
+
+async def ensure_admin_facts(db):
+    """Rebuild facts once if the store is empty (first deploy / manual reset)"""
+    try:
+        if await db[FACTS].find_one({"_id": ALL_TIME}) is not None:
+            return
+        if not await _acquire_rebuild_lock(db):
+            print("ℹ️ Admin report facts are being rebuilt by another instance")
+            return
+        try:
+            await asyncio.sleep(REBUILD_SETTLE_S)
+            # Another instance may have finished between the check and the lock
+            if await db[FACTS].find_one({"_id": ALL_TIME}) is None:
+                count = await rebuild_facts(db)
+                print(f"✅ Admin report facts rebuilt from {count} orders")
+        finally:
+            await db[FACTS].delete_one({"_id": REBUILD_LOCK})
+    except Exception as e:
+        print(f"⚠️ Admin report facts rebuild failed: {e}")
+
+
+def day_range(start: datetime, end: datetime) -> List[str]:
+    """Day keys covering [start, end] (inclusive, UTC)"""
+    first = datetime.strptime(day_key(start), "%Y-%m-%d")
+    last = datetime.strptime(day_key(end), "%Y-%m-%d")
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((last - first).days + 1)]
+
+
+async def load_days(db, start: datetime, end: datetime) -> List[Dict]:
+    """Fact documents for the days in [start, end], oldest first"""
+    days = day_range(start, end)
+    return await db[FACTS].find(
+        {"_id": {"$gte": days[0], "$lte": days[-1]}}
+    ).sort("_id", 1).to_list(length=None)
+
+
+async def load_all_time(db) -> Dict:
+    return await db[FACTS].find_one({"_id": ALL_TIME}) or {}
+
+
+def total(docs: Iterable[Dict], field: str) -> float:
+    return sum(doc.get(field, 0) for doc in docs)
+
+
+def named_counts(doc: Dict, group: str) -> Dict[str, float]:
+    """{name: count} for a status/city map"""
+    return {
+        entry.get("name", key): entry.get("count", 0)
+        for key, entry in (doc.get(group) or {}).items()
+        if entry.get("count", 0)
+    }
+
+
+def merge_categories(docs: Iterable[Dict]) -> Dict[str, Dict]:
+    merged: Dict[str, Dict] = {}
+    for doc in docs:
+        for key, entry in (doc.get("categories") or {}).items():
+            target = merged.setdefault(key, {"name": entry.get("name", key), "quantity": 0, "revenue": 0, "order_count": 0})
+            for field in ("quantity", "revenue", "order_count"):
+                target[field] += entry.get(field, 0)
+    return merged
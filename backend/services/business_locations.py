@@ -0,0 +1,130 @@
+"""
+Business locations for geospatial discovery
+Business users carry lat/lng; $geoNear needs a GeoJSON point under a 2dsphere
+index, so the point is kept in users.location alongside lat/lng. Orders waiting
+for a courier carry a copy of their business's point (pickup_location).
+"""
+from typing import Dict, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from services import principals
+
+
+def geo_point(lat: Optional[float], lng: Optional[float]) -> Optional[Dict]:
+    """GeoJSON point for lat/lng (None if either is missing)"""
+    if lat is None or lng is None:
+        return None
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+
+async def backfill_business_locations(db) -> int:
+    """Derive users.location from lat/lng for businesses that lack it (single update)"""
+    missing = {
+        "role": "business",
+        "location.coordinates": {"$exists": False},
+        "lat": {"$type": "number"},
+        "lng": {"$type": "number"}
+    }
+    business_ids = [
+        user["id"] async for user in db.users.find(missing, {"_id": 0, "id": 1}) if user.get("id")
+    ]
+    result = await db.users.update_many(
+        missing,
+        [{"$set": {"location": {"type": "Point", "coordinates": ["$lng", "$lat"]}}}]
+    )
+    for business_id in business_ids:
+        principals.invalidate_user(business_id)
+    return result.modified_count
+
+
+async def ensure_business_geo_indexes(db):
+    """2dsphere index for $geoNear on businesses + ready-order and menu-preview lookup indexes"""
+    try:
+        count = await backfill_business_locations(db)
+        if count:
+            print(f"✅ Backfilled GeoJSON location for {count} businesses")
+        await db.users.create_index([("location", "2dsphere")], name="location_2dsphere")
+        await db.orders.create_index(
+            [("business_id", ASCENDING), ("status", ASCENDING)],
+            name="business_status"
+        )
+        # Nearby discovery $lookup of each business's available menu items
+        await db.menu_items.create_index(
+            [("business_id", ASCENDING), ("is_available", ASCENDING)],
+            name="business_available"
+        )
+    except Exception as e:
+        print(f"⚠️ Business geo index setup failed: {e}")
+
+
+async def _find_business(db, business_id: str) -> Optional[Dict]:
+    business = await db.businesses.find_one({"_id": business_id})
+    if business:
+        return business
+    return await db.users.find_one({"id": business_id, "role": "business"})
+
+
+def _business_point(business: Dict) -> Optional[Dict]:
+    location = business.get("location") or {}
+    if location.get("coordinates"):
+        lng, lat = location["coordinates"][:2]
+        return geo_point(lat, lng)
+    return geo_point(business.get("lat"), business.get("lng"))
+
+
+async def build_pickup_fields(db, business_id: str) -> Dict:
+    """
+    Denormalized pickup info stored on an order when it enters courier_pending
+    so the courier feed can $geoNear on orders without per-order business reads
+    """
+    business = await _find_business(db, business_id) if business_id else None
+    if not business:
+        return {}
+    point = _business_point(business)
+    if point is None:
+        return {}
+    return {
+        "pickup_location": point,
+        "pickup_business_name": business.get("name") or business.get("business_name") or "Unknown Business",
+        "pickup_address": business.get("address") or "Address not available"
+    }
+
+
+async def pickup_area(db, business_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """Business city and pickup {lat, lng} for area-scoped ready-order updates"""
+    business = await _find_business(db, business_id) if business_id else None
+    if not business:
+        return None, None
+    point = _business_point(business)
+    location = {"lat": point["coordinates"][1], "lng": point["coordinates"][0]} if point else None
+    return business.get("city"), location
+
+
+async def backfill_pickup_locations(db) -> int:
+    """Add pickup fields to courier_pending orders created before denormalization"""
+    count = 0
+    orders = db.orders.find(
+        {"status": "courier_pending", "pickup_location": {"$exists": False}},
+        {"_id": 1, "business_id": 1}
+    )
+    async for order in orders:
+        fields = await build_pickup_fields(db, order.get("business_id"))
+        if fields:
+            await db.orders.update_one({"_id": order["_id"]}, {"$set": fields})
+            count += 1
+    return count
+
+
+async def ensure_pickup_location_indexes(db):
+    """2dsphere index backing the courier available-orders $geoNear feed"""
+    try:
+        await db.orders.create_index(
+            [("status", ASCENDING), ("pickup_location", "2dsphere")],
+            name="status_pickup_location"
+        )
+        count = await backfill_pickup_locations(db)
+        if count:
+            print(f"✅ Backfilled pickup location for {count} courier_pending orders")
+    except Exception as e:
+        print(f"⚠️ Pickup location index setup failed: {e}")
@@ -0,0 +1,344 @@
+"""
+Per-business hourly stats rollups
+Business panels (/business/stats, /business/dashboard/summary) read small
+hourly buckets instead of re-scanning the order history on every refresh.
+
+Each order remembers the status it was last counted under (stats_status).
+sync_order() moves its contribution from that status to the current one with
+a single $inc on the order's creation-hour bucket; the CAS on stats_status
+makes repeated / concurrent syncs of the same transition count once. Status
+writers call it after their update, and a reconcile loop picks up transitions
+made by paths that don't (legacy endpoints, other services). The same claim
+also feeds the admin daily facts (services/admin_reports).
+
+The claim also sets a stats_pending marker that is cleared once the deltas
+are written; a sync that dies in between leaves it behind and the reconciler
+resumes the remaining steps instead of losing the transition.
+"""
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Union
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from services import admin_reports
+
+# Statuses counted by /business/stats (orders, revenue, top products, peak hours)
+STATS_STATUSES = {"delivered", "confirmed", "preparing", "ready"}
+# Statuses counted as today's orders on the dashboard summary
+DASHBOARD_STATUSES = {"pending", "preparing", "ready", "confirmed", "delivered"}
+# Statuses whose totals.grand counts as dashboard revenue
+REVENUE_STATUSES = set(os.getenv("CONFIRM_STATUSES", "confirmed,delivered").split(","))
+
+HOURLY = "business_stats_hourly"
+CUSTOMERS = "business_customers"
+TOTALS = "business_stats_totals"
+
+# A claimed transition still pending after this long is resumed by the reconciler
+PENDING_GRACE = timedelta(minutes=5)
+
+# Order fields a contribution depends on (business rollups + admin facts)
+_SYNC_PROJECTION = {
+    "_id": 1, "business_id": 1, "customer_id": 1, "status": 1, "stats_status": 1, "stats_pending": 1,
+    "created_at": 1, "total_amount": 1, "totals.grand": 1, "items": 1,
+    "commission_amount": 1, "delivery_address.city": 1, "city": 1
+}
+
+
+def hour_start(value) -> Optional[datetime]:
+    """UTC hour bucket for a datetime (or ISO string)"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _item_key(name: str) -> str:
+    # Field-name safe key ('.' / '$' are not allowed in Mongo paths)
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:12]
+
+
+def order_contribution(order: Dict, status: Optional[str]) -> Dict[str, float]:
+    """Counter values an order adds to its hour bucket while in `status`"""
+    inc: Dict[str, float] = {}
+    if status in STATS_STATUSES:
+        inc["orders"] = 1
+        inc["revenue"] = float(order.get("total_amount", 0) or 0)
+        if status == "delivered":
+            inc["delivered"] = 1
+        for item in order.get("items", []) or []:
+            key = _item_key(item.get("name", "Unknown"))
+            quantity = int(item.get("quantity", 1))
+            price = float(item.get("price", 0))
+            inc[f"items.{key}.sales"] = inc.get(f"items.{key}.sales", 0) + quantity
+            inc[f"items.{key}.revenue"] = inc.get(f"items.{key}.revenue", 0) + price * quantity
+    if status in DASHBOARD_STATUSES:
+        inc["dashboard_orders"] = 1
+    if status in REVENUE_STATUSES:
+        inc["confirmed_revenue"] = float((order.get("totals") or {}).get("grand", 0) or 0)
+    return inc
+
+
+def contribution_delta(order: Dict, old_status: Optional[str], new_status: Optional[str]) -> Dict[str, float]:
+    old = order_contribution(order, old_status)
+    new = order_contribution(order, new_status)
+    delta = {}
+    for field in set(old) | set(new):
+        value = new.get(field, 0) - old.get(field, 0)
+        if value:
+            delta[field] = value
+    return delta
+
+
+async def _register_customer(db, business_id: str, customer_id: str, hour: datetime) -> bool:
+    """Count a customer once per business; True if this was their first order"""
+    try:
+        result = await db[CUSTOMERS].update_one(
+            {"business_id": business_id, "customer_id": customer_id},
+            {"$setOnInsert": {"first_order_hour": hour}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False  # concurrent first orders - the other one counted it
+    if result.upserted_id is None:
+        return False
+    await db[TOTALS].update_one({"_id": business_id}, {"$inc": {"customers": 1}}, upsert=True)
+    return True
+
+
+async def sync_order(db, order: Optional[Dict]) -> bool:
+    """Apply the order's pending status change to its rollups (idempotent)"""
+    if not order:
+        return False
+    status = order.get("status")
+    accounted = order.get("stats_status")
+    if accounted == status or order.get("stats_pending"):
+        return False  # nothing to do / previous transition not finished yet
+    if hour_start(order.get("created_at")) is None:
+        return False
+
+    # Claim the transition; a concurrent sync of the same change loses the CAS
+    pending = {"from": accounted, "to": status, "at": datetime.now(timezone.utc)}
+    claimed = await db.orders.update_one(
+        {"_id": order["_id"], "status": status, "stats_status": accounted, "stats_pending": {"$exists": False}},
+        {"$set": {"stats_status": status, "stats_pending": pending}}
+    )
+    if not claimed.modified_count:
+        return False
+    await _apply_transition(db, order, pending)
+    return True
+
+
+async def resume_pending(db, order: Dict) -> bool:
+    """Finish a claimed transition whose sync died before clearing stats_pending"""
+    pending = order.get("stats_pending")
+    if not pending:
+        return False
+    # Re-claim by timestamp so only one reconciler resumes it
+    resumed = await db.orders.update_one(
+        {"_id": order["_id"], "stats_pending.at": pending["at"]},
+        {"$set": {"stats_pending.at": datetime.now(timezone.utc)}}
+    )
+    if not resumed.modified_count:
+        return False
+    await _apply_transition(db, order, pending)
+    return True
+
+
+async def _apply_transition(db, order: Dict, pending: Dict):
+    """Write the remaining deltas of a claimed transition, then clear the marker"""
+    old_status, new_status = pending["from"], pending["to"]
+    if not pending.get("admin"):
+        await admin_reports.apply_order_delta(db, order, old_status, new_status)
+        await db.orders.update_one({"_id": order["_id"]}, {"$set": {"stats_pending.admin": True}})
+
+    # Orders without a business still count in the admin facts above
+    business_id = order.get("business_id")
+    if business_id:
+        await _apply_business_delta(db, order, business_id, old_status, new_status)
+    await db.orders.update_one({"_id": order["_id"]}, {"$unset": {"stats_pending": ""}})
+
+
+async def _apply_business_delta(db, order: Dict, business_id: str, old_status: Optional[str], new_status: Optional[str]):
+    hour = hour_start(order.get("created_at"))
+    inc = contribution_delta(order, old_status, new_status)
+    if old_status is None and order.get("customer_id"):
+        if await _register_customer(db, business_id, order["customer_id"], hour):
+            inc["new_customers"] = 1
+    if not inc:
+        return
+
+    update = {"$inc": inc}
+    names = {
+        f"items.{_item_key(item.get('name', 'Unknown'))}.name": item.get("name", "Unknown")
+        for item in order.get("items", []) or []
+    }
+    if names and any(field.startswith("items.") for field in inc):
+        update["$set"] = names
+    await db[HOURLY].update_one({"business_id": business_id, "hour": hour}, update, upsert=True)
+
+
+async def sync_order_by_id(db, order_id: str) -> bool:
+    """sync_order for writers that only hold the id (matches 'id' or '_id')"""
+    order = await db.orders.find_one({"$or": [{"id": order_id}, {"_id": order_id}]}, _SYNC_PROJECTION)
+    return await sync_order(db, order)
+
+
+def schedule_sync(db, order: Union[str, Dict]):
+    """
+    Fire-and-forget sync after a status write (the reconcile loop is the safety net)
+    Pass the updated order document when the writer has it, else its id.
+    """
+    async def _run():
+        try:
+            if isinstance(order, dict):
+                await sync_order(db, order)
+            else:
+                await sync_order_by_id(db, order)
+        except Exception as e:
+            order_id = order.get("_id") if isinstance(order, dict) else order
+            print(f"⚠️ Business stats sync failed for order {order_id}: {e}")
+    asyncio.create_task(_run())
+
+
+async def load_buckets(db, business_id: str, since: datetime) -> List[Dict]:
+    """Hour buckets for a business from `since` (at most 24 per day)"""
+    return await db[HOURLY].find(
+        {"business_id": business_id, "hour": {"$gte": hour_start(since)}},
+        {"_id": 0, "business_id": 0}
+    ).to_list(length=None)
+
+
+def sum_buckets(
+    buckets: List[Dict],
+    since: datetime,
+    until: Optional[datetime] = None,
+    fields=("orders", "revenue", "delivered")
+) -> Dict[str, float]:
+    """Sum counters of buckets in [since, until)"""
+    since = hour_start(since)
+    totals = {field: 0 for field in fields}
+    for bucket in buckets:
+        hour = hour_start(bucket["hour"])
+        if hour >= since and (until is None or hour < until):
+            for field in fields:
+                totals[field] += bucket.get(field, 0)
+    return totals
+
+
+def top_products(buckets: List[Dict], limit: int = 5) -> List[Dict]:
+    products: Dict[str, Dict] = {}
+    for bucket in buckets:
+        for key, item in (bucket.get("items") or {}).items():
+            entry = products.setdefault(key, {"name": item.get("name", "Unknown"), "sales": 0, "revenue": 0})
+            entry["sales"] += item.get("sales", 0)
+            entry["revenue"] += item.get("revenue", 0)
+    ranked = [p for p in products.values() if p["sales"] > 0]
+    return sorted(ranked, key=lambda x: x["revenue"], reverse=True)[:limit]
+
+
+def peak_hours(buckets: List[Dict], since: datetime, limit: int = 3) -> List[Dict]:
+    since = hour_start(since)
+    hour_stats: Dict[str, int] = {}
+    for bucket in buckets:
+        hour = hour_start(bucket["hour"])
+        if hour >= since and bucket.get("orders", 0) > 0:
+            hour_range = f"{hour.hour:02d}:00-{hour.hour + 1:02d}:00"
+            hour_stats[hour_range] = hour_stats.get(hour_range, 0) + bucket["orders"]
+    return sorted(
+        [{"hour": hour, "orders": count} for hour, count in hour_stats.items()],
+        key=lambda x: x["orders"],
+        reverse=True
+    )[:limit]
+
+
+async def get_total_customers(db, business_id: str) -> int:
+    totals = await db[TOTALS].find_one({"_id": business_id})
+    return int(totals.get("customers", 0)) if totals else 0
+
+
+async def ensure_business_stats_indexes(db):
+    try:
+        await db[HOURLY].create_index(
+            [("business_id", ASCENDING), ("hour", ASCENDING)], unique=True, name="business_hour"
+        )
+        await db[CUSTOMERS].create_index(
+            [("business_id", ASCENDING), ("customer_id", ASCENDING)], unique=True, name="business_customer"
+        )
+        await db.orders.create_index([("stats_status", ASCENDING)], name="stats_status")
+        await db.orders.create_index([("stats_pending.at", ASCENDING)], name="stats_pending", sparse=True)
+    except Exception as e:
+        print(f"⚠️ Business stats index setup failed: {e}")
+
+
+class BusinessStatsReconciler:
+    """Periodically syncs recent orders whose status moved without a sync call"""
+
+    def __init__(self, interval_s: float = 60.0, lookback: timedelta = timedelta(hours=48)):
+        self.interval_s = interval_s
+        self.lookback = lookback
+        self._task: Optional[asyncio.Task] = None
+
+    async def reconcile(self, db, since: Optional[datetime] = None) -> int:
+        """Sync orders whose stats_status lags their status (all history if since is None)"""
+        synced = 0
+        # Transitions claimed by a sync that never finished (syncs held back by an
+        # admin facts rebuild are still running - leave those to their owner)
+        if not await admin_reports.rebuild_running(db):
+            stuck = {"stats_pending.at": {"$lt": datetime.now(timezone.utc) - PENDING_GRACE}}
+            async for order in db.orders.find(stuck, _SYNC_PROJECTION):
+                if await resume_pending(db, order):
+                    synced += 1
+
+        if since is None:
+            query = {"stats_status": {"$exists": False}}
+        else:
+            query = {
+                "created_at": {"$gte": since},
+                "$expr": {"$ne": [{"$ifNull": ["$stats_status", None]}, "$status"]}
+            }
+        async for order in db.orders.find(query, _SYNC_PROJECTION):
+            if await sync_order(db, order):
+                synced += 1
+        return synced
+
+    def start(self, db):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db):
+        # First pass backfills orders never counted (initial deploy / old data)
+        try:
+            count = await self.reconcile(db)
+            if count:
+                print(f"✅ Business stats rollups backfilled from {count} orders")
+        except Exception as e:
+            print(f"⚠️ Business stats backfill failed: {e}")
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await self.reconcile(db, datetime.now(timezone.utc) - self.lookback)
+            except Exception as e:
+                print(f"⚠️ Business stats reconcile failed: {e}")
+
+
+# Global reconciler instance
+business_stats_reconciler = BusinessStatsReconciler()
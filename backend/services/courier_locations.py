@@ -0,0 +1,261 @@
+"""
+Courier location store
+Latest position per courier lives in the shared async cache (courier:loc:{id}),
+history lives in MongoDB courier_locations (written behind in batches).
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from config.cache import get_async_redis
+from config.settings import settings
+
+LOCATION_CACHE_TTL_S = 600  # 10 minutes
+
+
+def location_cache_key(courier_id: str) -> str:
+    return f"courier:loc:{courier_id}"
+
+
+def build_location_payload(
+    courier_id: str,
+    lat: float,
+    lng: float,
+    heading: Optional[float] = None,
+    speed: Optional[float] = None,
+    accuracy: Optional[float] = None,
+    timestamp: Optional[datetime] = None
+) -> Dict:
+    """Canonical latest-location payload (shared by all readers/writers)"""
+    timestamp = timestamp or datetime.now(timezone.utc)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return {
+        "courier_id": courier_id,
+        "lat": lat,
+        "lng": lng,
+        "heading": heading,
+        "speed": speed,
+        "accuracy": accuracy,
+        "timestamp": timestamp.isoformat(),
+        "ts": int(timestamp.timestamp() * 1000)
+    }
+
+
+async def cache_latest_locations(payloads: List[Dict]) -> bool:
+    """
+    Write latest locations for one or more couriers in a single pipelined round trip
+    Returns False when the cache is disabled or the write failed
+    """
+    if not payloads:
+        return False
+    try:
+        async with get_async_redis().pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                pipe.set(
+                    location_cache_key(payload["courier_id"]),
+                    json.dumps(payload),
+                    ex=LOCATION_CACHE_TTL_S
+                )
+            results = await pipe.execute()
+        return bool(results) and all(results)
+    except Exception as e:
+        print(f"⚠️ Courier location cache write failed: {e}")
+        return False
+
+
+async def get_latest_location(courier_id: str) -> Optional[Dict]:
+    """Read the cached latest location, None on miss or cache failure"""
+    try:
+        cached = await get_async_redis().get(location_cache_key(courier_id))
+        if not cached:
+            return None
+        payload = json.loads(cached)
+        return payload if isinstance(payload, dict) else None
+    except Exception as e:
+        print(f"⚠️ Courier location cache read failed: {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# History (MongoDB courier_locations)
+# One document per GPS point, expired by a TTL index on created_at instead of
+# count/find/delete_many on every ping. Reads use {courier_id, timestamp}.
+# ---------------------------------------------------------------------------
+
+def build_history_doc(payload: Dict) -> Dict:
+    """History document for a canonical location payload"""
+    return {
+        "_id": str(uuid.uuid4()),
+        "courier_id": payload["courier_id"],
+        "location": {
+            "type": "Point",
+            "coordinates": [payload["lng"], payload["lat"]]  # GeoJSON format [lng, lat]
+        },
+        "lat": payload["lat"],
+        "lng": payload["lng"],
+        "heading": payload.get("heading"),
+        "speed": payload.get("speed"),
+        "accuracy": payload.get("accuracy"),
+        "timestamp": datetime.fromisoformat(payload["timestamp"]),
+        "ts": payload["ts"],
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+async def ensure_location_history_indexes(db):
+    """Create history indexes (TTL on created_at, courier_id + timestamp for reads)"""
+    try:
+        await db.courier_locations.create_index(
+            [("courier_id", ASCENDING), ("timestamp", DESCENDING)],
+            name="courier_timestamp"
+        )
+        try:
+            await db.courier_locations.create_index(
+                [("created_at", ASCENDING)],
+                name="created_at_ttl",
+                expireAfterSeconds=settings.COURIER_LOCATION_HISTORY_TTL_S
+            )
+        except OperationFailure as e:
+            if e.code not in (85, 86):  # IndexOptionsConflict / IndexKeySpecsConflict
+                raise
+            # TTL changed - update in place instead of rebuilding
+            await db.command({
+                "collMod": "courier_locations",
+                "index": {
+                    "name": "created_at_ttl",
+                    "expireAfterSeconds": settings.COURIER_LOCATION_HISTORY_TTL_S
+                }
+            })
+    except Exception as e:
+        print(f"⚠️ Courier location index setup failed: {e}")
+
+
+async def store_location_history(db, docs: List[Dict]):
+    """Append history points - one write regardless of batch size"""
+    if not docs:
+        return
+    if len(docs) == 1:
+        await db.courier_locations.insert_one(docs[0])
+    else:
+        await db.courier_locations.insert_many(docs, ordered=False)
+
+
+async def get_location_history(db, courier_id: str, limit: int) -> List[Dict]:
+    """Most recent `limit` points for a courier (single indexed read)"""
+    return await db.courier_locations.find(
+        {"courier_id": courier_id}
+    ).sort("timestamp", DESCENDING).limit(limit).to_list(length=limit)
+
+
+async def get_last_stored_location(db, courier_id: str) -> Optional[Dict]:
+    """Latest persisted point for a courier (cache-miss fallback)"""
+    return await db.courier_locations.find_one(
+        {"courier_id": courier_id},
+        sort=[("timestamp", DESCENDING)]
+    )
+
+
+class LocationHistoryBuffer:
+    """
+    Write-behind buffer for history points
+    Coalesces points from all couriers and flushes them with one insert_many
+    once `max_batch` points are pending or every `flush_interval_s`.
+    Until start() is called, add() writes through.
+    """
+    
+    def __init__(self, flush_interval_s: float, max_batch: int, max_pending: int):
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._pending: List[Dict] = []
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"buffered": 0, "flushed": 0, "flushes": 0, "failures": 0, "dropped": 0}
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self, db):
+        if self.running:
+            return
+        self._db = db
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Courier location write-behind started (batch {self.max_batch}, every {self.flush_interval_s}s)")
+    
+    async def stop(self):
+        """Stop the flush loop and write out whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    async def add(self, db, docs: List[Dict]):
+        if not docs:
+            return
+        if not self.running:
+            await store_location_history(db, docs)
+            return
+        self._pending.extend(docs)
+        self.stats["buffered"] += len(docs)
+        self._trim()
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+    
+    async def flush(self):
+        if self._db is None:
+            return
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:len(batch)]
+                try:
+                    await store_location_history(self._db, batch)
+                except BulkWriteError as e:
+                    # Unordered insert - everything except the failed documents was written
+                    print(f"⚠️ Courier location flush partially failed: {len(e.details.get('writeErrors', []))} points")
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    print(f"⚠️ Courier location flush failed, will retry: {e}")
+                    self._pending[:0] = batch
+                    self._trim()
+                    return
+                self.stats["flushed"] += len(batch)
+                self.stats["flushes"] += 1
+    
+    def _trim(self):
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.stats["dropped"] += overflow
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    def get_stats(self) -> Dict:
+        return {**self.stats, "pending": len(self._pending), "running": self.running}
+
+
+location_history_buffer = LocationHistoryBuffer(
+    settings.COURIER_LOCATION_FLUSH_INTERVAL_S,
+    settings.COURIER_LOCATION_FLUSH_BATCH,
+    settings.COURIER_LOCATION_BUFFER_MAX
+)
@@ -0,0 +1,97 @@
+"""
+Per-business menu response cache
+Each business has a menu version (menu_versions) that menu writers bump via
+menu_changed(). Public menu endpoints serialize their response once per
+(business, endpoint variant, version) and serve the bytes with a strong ETag,
+Responses live in the shared async cache (per-worker L1 + Redis) with
+single-flight builds, so a menu costs one build per version across workers
+instead of one query per request. Menus are built from the primary: a lagging
+secondary could otherwise pin an old menu under the new version.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+
+from config.cache import LocalCache, async_cache_get_or_load
+from config.settings import settings
+from services import menu_catalog
+from utils.http_cache import etag_body_response, json_bytes, make_etag
+
+VERSIONS = "menu_versions"
+
+_versions = LocalCache(10000, settings.MENU_VERSION_CACHE_TTL_S)
+
+_stats = {"requests": 0, "builds": 0}
+
+
+async def get_version(db, business_id: str) -> int:
+    found, version = _versions.get(business_id)
+    if found:
+        return version
+    doc = await db[VERSIONS].find_one({"_id": business_id}, {"version": 1})
+    version = int(doc.get("version", 0)) if doc else 0
+    _versions.set(business_id, version)
+    return version
+
+
+async def bump_version(db, business_id: str) -> Optional[int]:
+    """Invalidate every cached menu response of a business (all workers)"""
+    try:
+        doc = await db[VERSIONS].find_one_and_update(
+            {"_id": business_id},
+            {"$inc": {"version": 1}},
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        # Cached menus then expire after MENU_CACHE_TTL_S at the latest
+        print(f"⚠️ Menu version bump failed for {business_id}: {e}")
+        _versions.delete(business_id)
+        return None
+    _versions.set(business_id, doc["version"])
+    return doc["version"]
+
+
+async def menu_changed(db, business_id: Optional[str]):
+    """
+    Call after a business's menu or public listing changes (menu CRUD,
+    approval, status, profile, deletion): bumps the menu version and
+    refreshes the catalog snapshots
+    """
+    if not business_id:
+        return
+    await bump_version(db, business_id)
+    menu_catalog.schedule_refresh(db, business_id)
+
+
+async def cached_menu_response(
+    request: Request,
+    db,
+    business_id: str,
+    variant: str,
+    build: Callable[[], Awaitable[Any]],
+    cache_control: str = "public, no-cache"
+) -> Response:
+    """
+    Serve build()'s result for the business's current menu version
+    build() runs once per version; exceptions it raises are not cached.
+    """
+    version = await get_version(db, business_id)
+
+    async def load():
+        _stats["builds"] += 1
+        body = json_bytes(await build())
+        # Cache values are JSON: the body is kept as text
+        return {"etag": make_etag(body), "body": body.decode("utf-8")}
+
+    _stats["requests"] += 1
+    entry = await async_cache_get_or_load(
+        f"menu:{business_id}:{variant}:{version}", load, settings.MENU_CACHE_TTL_S
+    )
+    return etag_body_response(request, entry["etag"], entry["body"].encode("utf-8"), cache_control)
+
+
+def get_stats() -> Dict:
+    return dict(_stats)
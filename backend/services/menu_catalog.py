@@ -0,0 +1,314 @@
+"""
+Public menu catalog snapshots (/menus, /menus/public)
+Every approved business has a fragment in menu_catalog_restaurants holding
+its entries for both endpoints. A snapshot assembles the fragments of one
+city (or of all cities) into the finished response body, gzips it once and
+stores it with a strong ETag in menu_catalog_snapshots; serving it costs a
+worker at most one ETag lookup every MENU_CATALOG_CACHE_TTL_S.
+
+Menu and business writers call schedule_refresh(). Refreshes are debounced,
+recompute only the touched fragments and rebuild only their cities' and the
+global snapshots. A periodic full rebuild picks up writes made elsewhere.
+"""
+import asyncio
+import gzip
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo import ReturnDocument
+
+from config.settings import settings
+from utils.city_normalize import normalize_city_name
+from utils.http_cache import make_etag
+
+RESTAURANTS = "menu_catalog_restaurants"
+SNAPSHOTS = "menu_catalog_snapshots"
+
+LEGACY = "legacy"  # /menus - flat item list of approved businesses
+PUBLIC = "public"  # /menus/public - active restaurants with available products
+ALL_CITIES = "*"
+
+BUSINESS_PROJECTION = {
+    "_id": 0, "id": 1, "is_active": 1, "business_name": 1, "description": 1, "address": 1,
+    "city": 1, "rating": 1, "delivery_time": 1, "min_order_amount": 1
+}
+PRODUCT_PROJECTION = {
+    "_id": 1, "id": 1, "business_id": 1, "name": 1, "description": 1, "price": 1,
+    "image_url": 1, "category": 1, "is_available": 1, "preparation_time_minutes": 1
+}
+
+
+def city_key(city: Optional[str]) -> Optional[str]:
+    return (normalize_city_name(city) or None) if city else None
+
+
+def snapshot_key(kind: str, city: Optional[str] = None) -> str:
+    return f"{kind}:{city or ALL_CITIES}"
+
+
+def build_fragment(business: Dict, products: List[Dict]) -> Dict:
+    """A business's entries for both catalog endpoints"""
+    legacy = [
+        {
+            "id": product.get("id", str(product.get("_id", ""))),
+            "title": product.get("name", ""),
+            "price": float(product.get("price", 0)),
+            "imageUrl": product.get("image_url", ""),
+            "category": product.get("category", "uncategorized")
+        }
+        for product in products
+    ]
+    available = [product for product in products if product.get("is_available") is True]
+    public = None
+    # Only active restaurants with available products are listed
+    if business.get("is_active") is True and available:
+        public = {
+            "id": business.get("id"),
+            "name": business.get("business_name", ""),
+            "description": business.get("description", ""),
+            "address": business.get("address", ""),
+            "city": business.get("city", ""),
+            "rating": business.get("rating", 5.0),
+            "delivery_time": business.get("delivery_time", "30-45 dk"),
+            "min_order": business.get("min_order_amount", 50.0),
+            "menu": [
+                {
+                    "id": product.get("id", str(product.get("_id", ""))),
+                    "name": product.get("name", ""),
+                    "description": product.get("description", ""),
+                    "price": float(product.get("price", 0)),
+                    "image_url": product.get("image_url", ""),
+                    "category": product.get("category", "Ana Yemek"),
+                    "preparation_time": product.get("preparation_time_minutes", 15)
+                }
+                for product in available
+            ]
+        }
+    return {
+        "_id": business["id"],
+        "city": city_key(business.get("city")),
+        LEGACY: legacy,
+        PUBLIC: public,
+        "updated_at": datetime.now(timezone.utc)
+    }
+
+
+def build_payload(kind: str, fragments: Iterable[Dict]):
+    """Response body of an endpoint from its fragments"""
+    if kind == LEGACY:
+        return [item for fragment in fragments for item in fragment.get(LEGACY) or []]
+    restaurants = [fragment[PUBLIC] for fragment in fragments if fragment.get(PUBLIC)]
+    return {
+        "restaurants": restaurants,
+        "count": len(restaurants),
+        "message": f"{len(restaurants)} aktif restoran bulundu." if restaurants else "Aktif restoran bulunamadı."
+    }
+
+
+def encode(payload) -> Dict:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    return {"etag": make_etag(body), "body": gzip.compress(body), "plain": body}
+
+
+# Per-worker copies of snapshots: key -> {etag, body (gzip), plain, checked_at}
+_entries: Dict[str, Dict] = {}
+
+
+async def rebuild_snapshot(db, kind: str, city: Optional[str] = None) -> Dict:
+    """Assemble and store one snapshot (an older concurrent build never overwrites a newer one)"""
+    key = snapshot_key(kind, city)
+    counter = await db[SNAPSHOTS].find_one_and_update(
+        {"_id": key},
+        {"$inc": {"generation": 1}},
+        projection={"generation": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    generation = counter["generation"]
+    query = {} if city in (None, ALL_CITIES) else {"city": city}
+    fragments = await db[RESTAURANTS].find(query, {kind: 1}).sort("_id", 1).to_list(length=None)
+    entry = encode(build_payload(kind, fragments))
+    await db[SNAPSHOTS].update_one(
+        {"_id": key, "built_generation": {"$not": {"$gt": generation}}},
+        {"$set": {
+            "built_generation": generation,
+            "etag": entry["etag"],
+            "body": entry["body"],
+            "size": len(entry["body"]),
+            "built_at": datetime.now(timezone.utc)
+        }}
+    )
+    entry["checked_at"] = time.monotonic()
+    _entries[key] = entry
+    return entry
+
+
+async def _rebuild_snapshots(db, cities: Set[Optional[str]]):
+    for city in {city for city in cities if city} | {ALL_CITIES}:
+        for kind in (LEGACY, PUBLIC):
+            await rebuild_snapshot(db, kind, city)
+
+
+async def _update_fragments(db, business_ids: List[str]) -> Set[Optional[str]]:
+    """Recompute fragments; returns the cities whose snapshots changed (empty if none did)"""
+    businesses = {
+        business["id"]: business
+        async for business in db.users.find(
+            {"id": {"$in": business_ids}, "role": "business", "kyc_status": "approved"},
+            BUSINESS_PROJECTION
+        )
+    }
+    products = defaultdict(list)
+    if businesses:
+        async for product in db.products.find({"business_id": {"$in": list(businesses)}}, PRODUCT_PROJECTION):
+            products[product["business_id"]].append(product)
+
+    cities: Set[Optional[str]] = set()
+    changed = False
+    for business_id in business_ids:
+        if business_id in businesses:
+            fragment = build_fragment(businesses[business_id], products[business_id])
+            old = await db[RESTAURANTS].find_one_and_replace(
+                {"_id": business_id}, fragment, projection={"city": 1}, upsert=True
+            )
+            cities.add(fragment["city"])
+            changed = True
+        else:
+            old = await db[RESTAURANTS].find_one_and_delete({"_id": business_id}, projection={"city": 1})
+        if old:
+            cities.add(old.get("city"))
+            changed = True
+    return cities if changed else set()
+
+
+async def refresh_restaurants(db, business_ids: Iterable[str]) -> bool:
+    """Rebuild the fragments of these businesses and the snapshots they appear in"""
+    business_ids = list({business_id for business_id in business_ids if business_id})
+    if not business_ids:
+        return False
+    cities = await _update_fragments(db, business_ids)
+    if not cities:
+        return False  # none of them is (or was) in the catalog
+    await _rebuild_snapshots(db, cities)
+    return True
+
+
+async def rebuild_all(db, batch_size: int = 500) -> int:
+    """Recompute every fragment and snapshot; returns the number of businesses"""
+    business_ids = [
+        business["id"]
+        async for business in db.users.find(
+            {"role": "business", "kyc_status": "approved", "id": {"$exists": True}}, {"_id": 0, "id": 1}
+        )
+    ]
+    stale = [fragment["_id"] async for fragment in db[RESTAURANTS].find({"_id": {"$nin": business_ids}}, {"_id": 1})]
+    cities: Set[Optional[str]] = set()
+    ids = business_ids + stale
+    for i in range(0, len(ids), batch_size):
+        cities |= await _update_fragments(db, ids[i:i + batch_size])
+    # Cities that lost all their restaurants get an empty snapshot
+    async for snapshot in db[SNAPSHOTS].find({}, {"_id": 1}):
+        cities.add(snapshot["_id"].split(":", 1)[1])
+    await _rebuild_snapshots(db, cities)
+    return len(business_ids)
+
+
+async def get_snapshot(db, kind: str, city: Optional[str] = None) -> Dict:
+    """Current snapshot entry {etag, body (gzip)} - served from the worker's copy while fresh"""
+    city = city_key(city) or ALL_CITIES
+    key = snapshot_key(kind, city)
+    entry = _entries.get(key)
+    now = time.monotonic()
+    if entry and now - entry["checked_at"] < settings.MENU_CATALOG_CACHE_TTL_S:
+        return entry
+
+    stored = await db[SNAPSHOTS].find_one({"_id": key, "etag": {"$exists": True}}, {"etag": 1})
+    if stored is None:
+        if city == ALL_CITIES:
+            return await rebuild_snapshot(db, kind, ALL_CITIES)
+        # No restaurants in this city - not kept, so unknown city names don't pile up
+        return encode(build_payload(kind, []))
+    if entry and entry["etag"] == stored["etag"]:
+        entry["checked_at"] = now
+        return entry
+
+    doc = await db[SNAPSHOTS].find_one({"_id": key}, {"etag": 1, "body": 1})
+    entry = {"etag": doc["etag"], "body": doc["body"], "plain": None, "checked_at": now}
+    _entries[key] = entry
+    return entry
+
+
+def plain_body(entry: Dict) -> bytes:
+    """Uncompressed body (decompressed once per snapshot version)"""
+    if entry.get("plain") is None:
+        entry["plain"] = gzip.decompress(entry["body"])
+    return entry["plain"]
+
+
+_pending: Set[str] = set()
+_flush_task: Optional[asyncio.Task] = None
+
+
+def schedule_refresh(db, business_id: Optional[str]):
+    """Fire-and-forget refresh after a menu/business write (bursts are coalesced)"""
+    global _flush_task
+    if not business_id:
+        return
+    _pending.add(business_id)
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush(db))
+
+
+async def _flush(db):
+    # Keep going while writes arrive during a refresh - schedule_refresh() doesn't
+    # start a new task while this one runs, so those ids are ours to pick up
+    while _pending:
+        await asyncio.sleep(settings.MENU_CATALOG_REFRESH_DELAY_S)
+        business_ids = list(_pending)
+        _pending.clear()
+        try:
+            await refresh_restaurants(db, business_ids)
+        except Exception as e:
+            print(f"⚠️ Menu catalog refresh failed for {business_ids}: {e}")
+
+
+class MenuCatalogRebuilder:
+    """Builds the catalog on first start and rebuilds it periodically"""
+
+    def __init__(self, interval_s: Optional[float] = None):
+        self.interval_s = interval_s or settings.MENU_CATALOG_REBUILD_INTERVAL_S
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db):
+        try:
+            if await db[SNAPSHOTS].find_one({"_id": snapshot_key(PUBLIC), "etag": {"$exists": True}}) is None:
+                count = await rebuild_all(db)
+                print(f"✅ Menu catalog built for {count} businesses")
+        except Exception as e:
+            print(f"⚠️ Menu catalog build failed: {e}")
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                await rebuild_all(db)
+            except Exception as e:
+                print(f"⚠️ Menu catalog rebuild failed: {e}")
+
+
+# Global rebuilder instance
+menu_catalog_rebuilder = MenuCatalogRebuilder()
@@ -0,0 +1,186 @@
+"""
+Nearby business discovery for the customer home screen
+One $geoNear pass over the users.location 2dsphere index returns active
+businesses by distance, each with a $lookup preview of its first available
+menu items. Pages continue from an opaque cursor (last distance + id).
+
+Pages are cached (shared async cache: per-worker L1 + Redis, single-flight)
+by geohash cell of the customer location: the query runs from the cell
+centre, so everyone in a cell shares the same pages, and distances are
+recomputed for the caller's exact position when served.
+"""
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Tuple
+
+from config.cache import async_cache_get_or_load
+from config.settings import settings
+from utils import geohash
+
+PREVIEW_SIZE = 5
+
+_stats = {"requests": 0, "queries": 0}
+
+
+class InvalidCursor(ValueError):
+    """Cursor is malformed or belongs to another search (cell / radius)"""
+
+
+def search_cell(lat: float, lng: float) -> Tuple[str, float, float]:
+    """(geohash cell, centre lat, centre lng) the search runs from"""
+    cell = geohash.encode(lat, lng, settings.NEARBY_GEOHASH_PRECISION)
+    min_lat, min_lng, max_lat, max_lng = geohash.bounds(cell)
+    return cell, (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def encode_cursor(cell: str, radius_m: int, distance: float, business_id: str) -> str:
+    raw = json.dumps({"c": cell, "r": radius_m, "d": distance, "id": business_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, cell: str, radius_m: int) -> Tuple[float, str]:
+    """(last distance, last business id) of the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        distance, business_id = float(data["d"]), str(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if data.get("c") != cell or data.get("r") != radius_m:
+        raise InvalidCursor("Cursor does not match this location / radius")
+    return distance, business_id
+
+
+def build_pipeline(
+    lat: float,
+    lng: float,
+    radius_m: int,
+    limit: Optional[int],
+    after: Optional[Tuple[float, str]] = None
+) -> List[Dict]:
+    """
+    $geoNear page of `limit` businesses (+1 to detect a next page) after the
+    cursor position; limit=None returns every business in range
+    """
+    geo_near = {
+        "near": {"type": "Point", "coordinates": [lng, lat]},
+        "key": "location",
+        "distanceField": "distance",
+        "maxDistance": radius_m,
+        "spherical": True,
+        "query": {"role": "business", "is_active": True}
+    }
+    pipeline: List[Dict] = [{"$geoNear": geo_near}]
+    if after is not None:
+        last_distance, last_id = after
+        geo_near["minDistance"] = last_distance
+        # Businesses at exactly the cursor distance continue in id order
+        pipeline.append({"$match": {"$expr": {"$or": [
+            {"$gt": ["$distance", last_distance]},
+            {"$gt": ["$id", last_id]}
+        ]}}})
+    pipeline.append({"$sort": {"distance": 1, "id": 1}})
+    if limit is not None:
+        pipeline.append({"$limit": limit + 1})
+    pipeline += [
+        {"$lookup": {
+            "from": "menu_items",
+            "let": {"business_id": "$id"},
+            "pipeline": [
+                {"$match": {
+                    "is_available": True,
+                    "$expr": {"$eq": ["$business_id", "$$business_id"]}
+                }},
+                {"$limit": PREVIEW_SIZE},
+                {"$project": {"_id": 1, "title": 1, "price": 1, "category": 1}}
+            ],
+            "as": "menu_preview"
+        }},
+        {"$project": {
+            "_id": 1,
+            "id": 1,
+            "business_name": 1,
+            "name": 1,
+            "full_address": 1,
+            "address": 1,
+            "location": 1,
+            "is_active": 1,
+            "distance": 1,
+            "menu_preview": 1
+        }}
+    ]
+    return pipeline
+
+
+def _business_entry(business: Dict) -> Dict:
+    coords = business["location"]["coordinates"]  # [lng, lat]
+    return {
+        "id": business.get("id", str(business["_id"])),
+        "name": business.get("business_name", business.get("name", "Unknown Business")),
+        "address": business.get("full_address", business.get("address", "")),
+        "search_distance": business["distance"],
+        "location": {"lat": coords[1], "lng": coords[0]},
+        "menu_items": [
+            {
+                "id": str(item["_id"]),
+                "title": item.get("title", ""),
+                "price": float(item.get("price", 0)),
+                "category": item.get("category", "Ana Yemek")
+            }
+            for item in business.get("menu_preview", [])
+        ],
+        "is_active": business.get("is_active", True)
+    }
+
+
+async def find_page(
+    db,
+    lat: float,
+    lng: float,
+    radius_m: int,
+    limit: Optional[int],
+    cursor: Optional[str] = None
+) -> Dict:
+    """
+    {businesses, next_cursor} for a customer location (limit=None: all in range)
+    Raises InvalidCursor for a cursor from another search.
+    """
+    cell, cell_lat, cell_lng = search_cell(lat, lng)
+    after = decode_cursor(cursor, cell, radius_m) if cursor else None
+    _stats["requests"] += 1
+    return await async_cache_get_or_load(
+        f"nearby:{cell}:{radius_m}:{limit}:{cursor or ''}",
+        lambda: _query_page(db, cell, cell_lat, cell_lng, radius_m, limit, after),
+        settings.NEARBY_CACHE_TTL_S
+    )
+
+
+async def _query_page(
+    db,
+    cell: str,
+    cell_lat: float,
+    cell_lng: float,
+    radius_m: int,
+    limit: Optional[int],
+    after: Optional[Tuple[float, str]]
+) -> Dict:
+    _stats["queries"] += 1
+    rows = await db.users.aggregate(build_pipeline(cell_lat, cell_lng, radius_m, limit, after)).to_list(
+        length=None if limit is None else limit + 1
+    )
+    businesses = []
+    for business in rows[:limit]:
+        try:
+            businesses.append(_business_entry(business))
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"⚠️ Error processing business {business.get('id', 'Unknown')}: {e}")
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(cell, radius_m, last["distance"], last.get("id", str(last["_id"])))
+    return {"businesses": businesses, "next_cursor": next_cursor}
+
+
+def get_stats() -> Dict:
+    return dict(_stats)
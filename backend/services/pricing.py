@@ -0,0 +1,183 @@
+"""
+Cart pricing engine
+Checkout, coupon application and cart preview price a basket the same way:
+every product is resolved with one $in query (by 'id' or '_id'), checked for
+availability and business ownership, and the item snapshot, subtotal,
+delivery fee and minimum-order check are computed in a single pass.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from models_package.coupons import CouponScope, CouponType
+
+# Fields a price quote reads from a product document
+PRODUCT_PROJECTION = {
+    "_id": 1, "id": 1, "name": 1, "title": 1, "price": 1,
+    "is_available": 1, "business_id": 1, "category": 1
+}
+
+
+class PricingError(Exception):
+    """Basket can't be priced; routes turn it into an HTTPException"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _item_field(item, field: str, default=None):
+    # Cart lines arrive as dicts (raw JSON / saved carts) or pydantic models
+    if isinstance(item, dict):
+        return item.get(field, default)
+    return getattr(item, field, default)
+
+
+def _product_id(item) -> Optional[str]:
+    return _item_field(item, "product_id") or _item_field(item, "id")
+
+
+async def load_products(db, product_ids: Iterable[str], collection: str = "products") -> Dict[str, Dict]:
+    """{requested id: product} in one query (products are keyed by 'id' or '_id')"""
+    ids = list({product_id for product_id in product_ids if product_id})
+    if not ids:
+        return {}
+    products = {}
+    async for product in db[collection].find(
+        {"$or": [{"id": {"$in": ids}}, {"_id": {"$in": ids}}]}, PRODUCT_PROJECTION
+    ):
+        for key in (product.get("id"), product.get("_id")):
+            if key in ids:
+                products.setdefault(key, product)
+    return products
+
+
+async def price_cart(
+    db,
+    business: Dict,
+    items: Iterable,
+    collection: str = "products",
+    default_delivery_fee: float = 0.0,
+    strict: bool = False
+) -> Dict:
+    """
+    Price a basket for `business` (a business user / businesses document)
+    Returns items (order snapshot lines), subtotal, delivery_fee, discount,
+    grand, min_order and below_minimum. Raises PricingError for empty baskets,
+    bad quantities, and missing, unavailable or foreign products.
+    strict=True also rejects products without a matching business_id or an
+    explicit is_available: True (legacy products may lack both fields).
+    """
+    items = list(items or [])
+    if not items:
+        raise PricingError(400, "Sepet boş olamaz")
+
+    business_id = business.get("id") or business.get("_id")
+    products = await load_products(db, (_product_id(item) for item in items), collection)
+
+    lines: List[Dict] = []
+    subtotal = 0.0
+    for item in items:
+        product_id = _product_id(item)
+        try:
+            quantity = int(_item_field(item, "quantity", 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            raise PricingError(400, f"Geçersiz adet: {product_id}")
+
+        product = products.get(product_id)
+        if not product:
+            raise PricingError(404, f"Ürün bulunamadı: {product_id}")
+        name = product.get("name") or product.get("title", "Ürün")
+        if (strict or product.get("business_id")) and product.get("business_id") != business_id:
+            raise PricingError(400, f"Ürün bu restorana ait değil: {name}")
+        if not product.get("is_available", not strict):
+            raise PricingError(400, f"Ürün mevcut değil: {product.get('name', product_id)}")
+
+        price = float(product.get("price", 0))
+        line_total = price * quantity
+        subtotal += line_total
+        lines.append({
+            "id": product.get("id", str(product.get("_id"))),
+            "name": name,
+            "price": price,
+            "quantity": quantity,
+            "notes": _item_field(item, "notes"),
+            "category": product.get("category"),
+            "subtotal": line_total
+        })
+
+    delivery_fee = float(business.get("delivery_fee", default_delivery_fee) or 0)
+    min_order = float(business.get("min_order_amount", 0) or 0)
+    return {
+        "items": lines,
+        "subtotal": subtotal,
+        "delivery_fee": delivery_fee,
+        "discount": 0.0,
+        "grand": subtotal + delivery_fee,
+        "min_order": min_order,
+        "below_minimum": subtotal < min_order
+    }
+
+
+async def price_saved_cart(db, customer_id: str) -> Dict:
+    """price_cart for a customer's saved cart (customer_carts) and its restaurant"""
+    cart = await db.customer_carts.find_one({"customer_id": customer_id})
+    items = (cart or {}).get("items") or []
+    if not items:
+        raise PricingError(400, "Sepet boş olamaz")
+    business_id = (cart.get("restaurant") or {}).get("id") or items[0].get("business_id")
+    business = await db.users.find_one(
+        {"id": business_id, "role": "business"},
+        {"_id": 0, "id": 1, "business_name": 1, "delivery_fee": 1, "min_order_amount": 1}
+    )
+    if not business:
+        raise PricingError(404, "Restoran bulunamadı veya aktif değil")
+    quote = await price_cart(db, business, items)
+    quote["business_id"] = business_id
+    return quote
+
+
+def check_minimum(quote: Dict):
+    if quote["below_minimum"]:
+        raise PricingError(
+            400, f"Minimum sipariş tutarı: {quote['min_order']} TL (Sepet: {quote['subtotal']} TL)"
+        )
+
+
+def apply_coupon(quote: Dict, coupon: Dict) -> Dict:
+    """
+    Quote with a coupon's discount (scope=item: per unit, scope=cart: on subtotal)
+    Adds unit_discount / final_unit_price / line_total to each line.
+    """
+    min_basket = coupon.get("min_basket")
+    if min_basket and quote["subtotal"] < min_basket:
+        raise PricingError(400, f"Minimum sepet tutarı ₺{min_basket:.2f} olmalıdır.")
+
+    percent = coupon.get("type") == CouponType.PERCENT.value
+    item_scope = coupon.get("scope") == CouponScope.ITEM.value
+    value = coupon.get("value", 0)
+    discount = 0.0
+    lines = []
+    for line in quote["items"]:
+        unit_discount = 0.0
+        if item_scope:
+            unit_discount = line["price"] * (value / 100) if percent else min(value, line["price"])
+            discount += unit_discount * line["quantity"]
+        final_unit_price = max(0, line["price"] - unit_discount)
+        lines.append({
+            **line,
+            "unit_price": line["price"],
+            "unit_discount": unit_discount,
+            "final_unit_price": final_unit_price,
+            "line_total": final_unit_price * line["quantity"]
+        })
+    if not item_scope:
+        discount = quote["subtotal"] * (value / 100) if percent else min(value, quote["subtotal"])
+
+    return {
+        **quote,
+        "items": lines,
+        "discount": discount,
+        "grand": max(0, quote["subtotal"] - discount) + quote["delivery_fee"]
+    }
@@ -0,0 +1,74 @@
+"""
+Authenticated principal cache
+Auth dependencies resolve the token subject (email) to a user document on
+every request. The document is memoized on request.state (so nested or
+repeated dependencies share it) and kept in a short-TTL per-worker cache.
+Writers that change what auth depends on (role, KYC, profile, password,
+deletion) call invalidate_user(); other workers catch up within the TTL.
+"""
+from typing import Dict, Optional
+
+from config.cache import LocalCache
+from config.settings import settings
+from services import user_summaries
+
+principal_cache = LocalCache(settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES, settings.AUTH_PRINCIPAL_CACHE_TTL_S)
+
+# user id / str(_id) -> token subject, so writers holding only an id can invalidate
+# (two keys per cached user; least recently used ids are evicted first)
+_subject_by_id = LocalCache(2 * settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES, settings.AUTH_PRINCIPAL_CACHE_TTL_S)
+
+_stats = {"hits": 0, "misses": 0, "request_hits": 0, "invalidations": 0}
+
+
+def _remember(user: Dict):
+    email = user.get("email")
+    if not email:
+        return
+    for key in (user.get("id"), user.get("_id")):
+        if key:
+            _subject_by_id.set(str(key), email)
+
+
+async def load_principal(db, email: str, request=None) -> Optional[Dict]:
+    """
+    User document for a token subject (None if no such user)
+    Returns a shallow copy - callers may add/remove top-level keys.
+    """
+    state = getattr(request, "state", None)
+    memo = getattr(state, "principal", None) if state is not None else None
+    if memo is not None and memo[0] == email:
+        _stats["request_hits"] += 1
+        return dict(memo[1])
+
+    found, user = principal_cache.get(email)
+    if found:
+        _stats["hits"] += 1
+    else:
+        _stats["misses"] += 1
+        user = await db.users.find_one({"email": email})
+        if user is None:
+            return None
+        principal_cache.set(email, user)
+        _remember(user)
+
+    if state is not None:
+        state.principal = (email, user)
+    return dict(user)
+
+
+def invalidate_user(user_id: Optional[str] = None, email: Optional[str] = None):
+    """Drop cached views of a user (principal + listing summary) after a write"""
+    _stats["invalidations"] += 1
+    if user_id:
+        user_id = str(user_id)
+        if not email:
+            email = _subject_by_id.get(user_id)[1]
+        _subject_by_id.delete(user_id)
+        user_summaries.invalidate(user_id)
+    if email:
+        principal_cache.delete(email)
+
+
+def get_stats() -> Dict:
+    return {**_stats, "cached": len(principal_cache)}
@@ -0,0 +1,180 @@
+"""
+Index-backed search for the stable restaurant fallback (GET /restaurants)
+Legacy businesses documents carry latitude/longitude and name/cuisine. Each
+document gets a GeoJSON location (for $geoNear) and search_grams, the
+Turkish-folded edge n-grams of name and cuisine (see utils.text_search).
+search_source records the text the grams came from, so documents whose name
+or cuisine changed are re-indexed; location is re-set whenever its
+coordinates no longer match latitude/longitude. The collection is written outside this
+app (seeding, admin tooling), so a periodic pass picks up new and changed
+documents. The collection's single text index is already taken by
+setup_indexes.py.
+"""
+import asyncio
+import re
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from config.settings import settings
+from utils.text_search import MIN_GRAM, edge_grams, query_grams, words
+
+MAX_DISTANCE_M = 6000
+# Rating order without coordinates; _id keeps skip/limit pages stable
+RATING_SORT = [("average_rating", DESCENDING), ("_id", ASCENDING)]
+
+STABLE_PROJECTION = {
+    "_id": 1,
+    "name": 1,
+    "logo": 1,
+    "cuisine": 1,
+    "latitude": 1,
+    "longitude": 1,
+    "estimated_delivery_time": 1,
+    "average_rating": 1,
+    "min_order_amount": 1,
+    "delivery_fee": 1,
+    "is_open": 1,
+    "address": 1
+}
+
+_COORDINATES_EXPR = ["$longitude", "$latitude"]
+
+_SOURCE_EXPR = {"$concat": [
+    {"$toString": {"$ifNull": ["$name", ""]}}, "|", {"$toString": {"$ifNull": ["$cuisine", ""]}}
+]}
+
+
+def search_source(business: Dict) -> str:
+    return f"{business.get('name') or ''}|{business.get('cuisine') or ''}"
+
+
+def search_fields(business: Dict) -> Dict:
+    """search_grams / search_source for a businesses document"""
+    return {
+        "search_grams": edge_grams([business.get("name") or "", business.get("cuisine") or ""]),
+        "search_source": search_source(business)
+    }
+
+
+def build_query(q: Optional[str] = None) -> Dict:
+    """Open restaurants, narrowed to those containing every word of q (as a prefix)"""
+    query: Dict = {"is_open": True}
+    if not q or not q.strip():
+        return query
+    terms = words(q)
+    if not terms:
+        # Punctuation only - nothing can match
+        query["search_grams"] = {"$in": []}
+        return query
+    conditions: List[Dict] = []
+    grams = query_grams(q)
+    if grams:
+        conditions.append({"search_grams": {"$all": grams}})
+    # Words shorter than a gram match as an anchored (index-bounded) prefix
+    for term in dict.fromkeys(t for t in terms if len(t) < MIN_GRAM):
+        conditions.append({"search_grams": {"$regex": f"^{re.escape(term)}"}})
+    if len(conditions) == 1:
+        query.update(conditions[0])
+    else:
+        query["$and"] = conditions
+    return query
+
+
+def nearby_pipeline(lat: float, lng: float, query: Dict, skip: int, limit: int) -> List[Dict]:
+    """Open restaurants within MAX_DISTANCE_M, closest first, one page"""
+    return [
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": [lng, lat]},
+            "key": "location",
+            "distanceField": "distance_m",
+            "maxDistance": MAX_DISTANCE_M,
+            "spherical": True,
+            "query": query
+        }},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {**STABLE_PROJECTION, "distance_m": 1}}
+    ]
+
+
+async def backfill_restaurant_search(db, batch_size: int = 500) -> int:
+    """Add location / search fields to businesses missing them or out of date"""
+    await db.businesses.update_many(
+        {
+            "latitude": {"$type": "number"},
+            "longitude": {"$type": "number"},
+            "$expr": {"$ne": [{"$ifNull": ["$location.coordinates", None]}, _COORDINATES_EXPR]}
+        },
+        [{"$set": {"location": {"type": "Point", "coordinates": _COORDINATES_EXPR}}}]
+    )
+    stale = db.businesses.find(
+        {"$expr": {"$ne": [{"$ifNull": ["$search_source", None]}, _SOURCE_EXPR]}},
+        {"_id": 1, "name": 1, "cuisine": 1}
+    )
+    updated = 0
+    batch = []
+    async for business in stale:
+        batch.append(UpdateOne({"_id": business["_id"]}, {"$set": search_fields(business)}))
+        if len(batch) >= batch_size:
+            await db.businesses.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db.businesses.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+
+async def ensure_restaurant_search_indexes(db):
+    """Backfill search fields and create the indexes GET /restaurants pages through"""
+    try:
+        count = await backfill_restaurant_search(db)
+        if count:
+            print(f"✅ Indexed search terms for {count} restaurants")
+        await db.businesses.create_index([("location", "2dsphere")])
+        await db.businesses.create_index(
+            [("is_open", ASCENDING), ("average_rating", DESCENDING), ("_id", ASCENDING)],
+            name="open_rating"
+        )
+        await db.businesses.create_index(
+            [("search_grams", ASCENDING), ("is_open", ASCENDING), ("average_rating", DESCENDING), ("_id", ASCENDING)],
+            name="search_grams_open_rating"
+        )
+    except Exception as e:
+        print(f"⚠️ Restaurant search index setup failed: {e}")
+
+
+class RestaurantSearchIndexer:
+    """Periodically re-runs the backfill for businesses added or changed since"""
+
+    def __init__(self, interval_s: Optional[float] = None):
+        self.interval_s = interval_s or settings.RESTAURANT_SEARCH_REINDEX_INTERVAL_S
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db):
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                count = await backfill_restaurant_search(db)
+                if count:
+                    print(f"✅ Indexed search terms for {count} restaurants")
+            except Exception as e:
+                print(f"⚠️ Restaurant search reindex failed: {e}")
+
+
+# Global indexer instance
+restaurant_search_indexer = RestaurantSearchIndexer()
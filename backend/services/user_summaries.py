@@ -0,0 +1,101 @@
+"""
+Batched user summaries for order listings
+Order feeds show a customer/business name and phone per row. Instead of a
+users.find_one per order, a request builds one UserSummaryLoader, which
+resolves every id it is asked for with a single $in query and keeps the
+small summaries in the shared async cache (per-worker L1 + Redis), read in
+one batch per request.
+"""
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+
+from config.cache import async_cache_delete, async_cache_get_many, async_cache_set, local_cache
+from config.settings import settings
+
+# Fields listings read from a user document
+SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "first_name": 1, "last_name": 1, "phone": 1, "email": 1,
+    "business_name": 1, "business_address": 1, "address": 1, "lat": 1, "lng": 1
+}
+
+# Missing users are cached too, so unknown ids don't hit Mongo on every poll
+_MISSING: Dict = {"missing": True}
+
+_stats = {"hits": 0, "misses": 0, "queries": 0}
+
+# Redis deletes started by invalidate() (kept referenced until done)
+_pending_deletes: Set[asyncio.Task] = set()
+
+
+def cache_key(user_id: str) -> str:
+    return f"user_summary:{user_id}"
+
+
+def display_name(user: Optional[Dict], default: str = "") -> str:
+    if not user:
+        return default
+    return f"{user.get('first_name', '')} {user.get('last_name', '')}".strip() or default
+
+
+def invalidate(user_id: str):
+    """Drop a cached summary (call after profile name/phone changes)"""
+    key = cache_key(user_id)
+    local_cache.delete(key)
+    try:
+        task = asyncio.get_running_loop().create_task(async_cache_delete(key))
+    except RuntimeError:
+        return  # no event loop (scripts) - the Redis copy expires with its TTL
+    _pending_deletes.add(task)
+    task.add_done_callback(_pending_deletes.discard)
+
+
+def get_stats() -> Dict:
+    return dict(_stats)
+
+
+class UserSummaryLoader:
+    """
+    Per-request loader: load_many() fetches all unknown ids in one query,
+    get() then reads from the request's memo (None if the user doesn't exist)
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._memo: Dict[str, Dict] = {}
+
+    async def load_many(self, ids: Iterable[Optional[str]]) -> Dict[str, Dict]:
+        requested = {user_id for user_id in ids if user_id}
+        unknown = list(requested - self._memo.keys())
+        cached = await async_cache_get_many(cache_key(user_id) for user_id in unknown) if unknown else {}
+        missing = []
+        for user_id in unknown:
+            summary = cached.get(cache_key(user_id))
+            if summary is not None:
+                _stats["hits"] += 1
+                self._memo[user_id] = _MISSING if summary == _MISSING else summary
+            else:
+                missing.append(user_id)
+
+        if missing:
+            _stats["misses"] += len(missing)
+            _stats["queries"] += 1
+            fetched = {}
+            async for user in self.db.users.find({"id": {"$in": missing}}, SUMMARY_PROJECTION):
+                fetched[user["id"]] = user
+            for user_id in missing:
+                self._memo[user_id] = fetched.get(user_id, _MISSING)
+            await asyncio.gather(*(
+                async_cache_set(cache_key(user_id), self._memo[user_id], settings.USER_SUMMARY_CACHE_TTL_S)
+                for user_id in missing
+            ))
+
+        return {user_id: self._memo[user_id] for user_id in requested if self._memo[user_id] is not _MISSING}
+
+    async def load_for_orders(self, orders: Iterable[Dict], *fields: str):
+        """Load the users referenced by `fields` (default customer_id) of each order"""
+        fields = fields or ("customer_id",)
+        await self.load_many(order.get(field) for order in orders for field in fields)
+
+    def get(self, user_id: Optional[str]) -> Optional[Dict]:
+        summary = self._memo.get(user_id) if user_id else None
+        return None if summary is None or summary is _MISSING else summary
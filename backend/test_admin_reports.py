@@ -0,0 +1,153 @@
+"""
+Unit tests for materialized admin report facts
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from services import admin_reports, business_stats
+
+
+def _order(db, order_id, status, city=None):
+    order = {
+        "_id": order_id,
+        "business_id": "b1",
+        "customer_id": "c1",
+        "status": status,
+        "created_at": datetime(2024, 5, 1, 19, 42, tzinfo=timezone.utc),
+        "total_amount": 100.0,
+        "commission_amount": 5.0,
+        "items": [{"name": "Adana Kebap", "category": "Kebap", "quantity": 2, "price": 50.0}]
+    }
+    if city:
+        order["delivery_address"] = {"city": city}
+    db.orders.docs.append(order)
+    return order
+
+
+def _sync(db, order, status):
+    order["status"] = status
+    return asyncio.run(business_stats.sync_order(db, dict(order)))
+
+
+def test_facts_delta_moves_status_and_revenue():
+    order = {"total_amount": 80.0, "items": []}
+    delta = admin_reports.facts_delta(order, "pending", "delivered")
+    assert delta == {
+        "status.pending.count": -1,
+        "status.delivered.count": 1,
+        "revenue": 80.0,
+        "revenue_orders": 1
+    }
+    # City is only counted when the order is first seen
+    assert admin_reports.facts_delta(order, None, "pending", "İstanbul")[
+        f"cities.{admin_reports._field_key('İstanbul')}.count"
+    ] == 1
+
+
+def test_sync_keeps_day_and_all_time_facts(fake_db):
+    db = fake_db
+    db.users.docs.append({"id": "c1", "city": "Ankara"})
+    first = _order(db, "o1", "pending", city="İstanbul")
+    second = _order(db, "o2", "pending")
+
+    _sync(db, first, "pending")
+    _sync(db, second, "pending")
+    _sync(db, first, "delivered")
+
+    facts = db[admin_reports.FACTS]
+    day = next(d for d in facts.docs if d["_id"] == "2024-05-01")
+    all_time = next(d for d in facts.docs if d["_id"] == admin_reports.ALL_TIME)
+    for doc in (day, all_time):
+        assert doc["orders"] == 2
+        assert doc["revenue"] == 100.0
+        assert doc["commission"] == 5.0
+        assert admin_reports.named_counts(doc, "status") == {"pending": 1, "delivered": 1}
+        assert admin_reports.named_counts(doc, "cities") == {"İstanbul": 1, "Ankara": 1}
+
+    categories = admin_reports.merge_categories([day])
+    assert list(categories.values()) == [
+        {"name": "Kebap", "quantity": 2, "revenue": 100.0, "order_count": 1}
+    ]
+
+    # Cancelling a delivered order takes its revenue and category sales back out
+    _sync(db, first, "cancelled")
+    assert day["revenue"] == 0
+    assert admin_reports.merge_categories([day])["Kebap"]["order_count"] == 0
+
+
+def test_day_range_is_inclusive():
+    start = datetime(2024, 4, 30, 23, 0, tzinfo=timezone.utc)
+    end = datetime(2024, 5, 2, 1, 0, tzinfo=timezone.utc)
+    assert admin_reports.day_range(start, end) == ["2024-04-30", "2024-05-01", "2024-05-02"]
+
+
+def test_orders_without_business_still_count_in_facts(fake_db):
+    db = fake_db
+    order = _order(db, "o1", "pending", city="İzmir")
+    order.pop("business_id")
+
+    assert _sync(db, order, "delivered")
+    all_time = next(d for d in db[admin_reports.FACTS].docs if d["_id"] == admin_reports.ALL_TIME)
+    assert all_time["orders"] == 1
+    assert all_time["revenue"] == 100.0
+    assert db[business_stats.HOURLY].docs == []
+
+
+def test_concurrent_startups_rebuild_once(monkeypatch, fake_db):
+    db = fake_db
+    rebuilds = []
+
+    async def rebuild(db):
+        rebuilds.append(1)
+        await asyncio.sleep(0.01)
+        await db[admin_reports.FACTS].update_one({"_id": admin_reports.ALL_TIME}, {"$inc": {"orders": 1}}, upsert=True)
+        return 1
+
+    monkeypatch.setattr(admin_reports, "rebuild_facts", rebuild)
+    monkeypatch.setattr(admin_reports, "REBUILD_SETTLE_S", 0)
+
+    async def start_two():
+        await asyncio.gather(admin_reports.ensure_admin_facts(db), admin_reports.ensure_admin_facts(db))
+
+    asyncio.run(start_two())
+    assert len(rebuilds) == 1
+    # The lock is released, and a later start sees the facts and skips
+    assert [d["_id"] for d in db[admin_reports.FACTS].docs] == [admin_reports.ALL_TIME]
+    asyncio.run(admin_reports.ensure_admin_facts(db))
+    assert len(rebuilds) == 1
+
+
+def test_rebuild_without_orders_still_marks_facts_built(monkeypatch, fake_db):
+    monkeypatch.setattr(admin_reports, "REBUILD_SETTLE_S", 0)
+    assert asyncio.run(admin_reports.rebuild_facts(fake_db)) == 0
+    assert asyncio.run(admin_reports.load_all_time(fake_db))["rebuilt_at"]
+
+    rebuilds = []
+    monkeypatch.setattr(admin_reports, "rebuild_facts", rebuilds.append)
+    asyncio.run(admin_reports.ensure_admin_facts(fake_db))
+    assert rebuilds == []
+
+
+def test_delta_claimed_during_rebuild_lands_once_on_rebuilt_totals(monkeypatch, fake_db):
+    monkeypatch.setattr(admin_reports, "REBUILD_POLL_S", 0.001)
+    db = fake_db
+    order = _order(db, "o1", "pending", city="İzmir")
+    _sync(db, order, "pending")
+
+    async def run():
+        assert await admin_reports._acquire_rebuild_lock(db)
+        order["status"] = "delivered"
+        sync = asyncio.create_task(business_stats.sync_order(db, dict(order)))
+        await asyncio.sleep(0.01)  # claimed, delta held back by the lock
+        assert db.orders.docs[0]["stats_status"] == "delivered"
+        await admin_reports.rebuild_facts(db)
+        await db[admin_reports.FACTS].delete_one({"_id": admin_reports.REBUILD_LOCK})
+        assert await sync
+
+    asyncio.run(run())
+    all_time = asyncio.run(admin_reports.load_all_time(db))
+    assert all_time["orders"] == 1
+    assert all_time["revenue"] == 100.0
+    assert admin_reports.named_counts(all_time, "status") == {"delivered": 1}
+    assert admin_reports.named_counts(all_time, "cities") == {"İzmir": 1}
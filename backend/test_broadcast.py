@@ -0,0 +1,82 @@
+"""
+Unit tests for concurrent WebSocket broadcast with slow-consumer eviction
+"""
+
+import asyncio
+import json
+
+from websocket_manager import WebSocketManager
+
+
+class _FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_code = code
+
+
+def test_slow_subscriber_is_evicted_without_delaying_others():
+    async def run():
+        manager = WebSocketManager()
+        fast_a, fast_b, slow = _FakeWebSocket(), _FakeWebSocket(), _FakeWebSocket()
+        ids = {}
+        for name, ws in (("a", fast_a), ("b", fast_b), ("slow", slow)):
+            ids[name] = await manager.connect_order_tracking(ws, "o1", {"id": name, "role": "customer"})
+        # Client stops reading (e.g. phone on a bad network)
+        slow.delay = 10
+
+        from realtime import broadcast
+        original = broadcast._send_timeout
+        broadcast._send_timeout = lambda: 0.05
+        try:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await manager.send_order_status_update("o1", {"type": "status_update", "status": "picked_up"})
+            elapsed = loop.time() - started
+        finally:
+            broadcast._send_timeout = original
+        return manager, ids, elapsed, fast_a, fast_b, slow
+
+    manager, ids, elapsed, fast_a, fast_b, slow = asyncio.run(run())
+    assert elapsed < 1.0
+    assert json.loads(fast_a.sent[-1])["status"] == "picked_up"
+    # Serialized once: every subscriber gets the identical payload
+    assert fast_a.sent[-1] == fast_b.sent[-1]
+    assert ids["slow"] not in manager.active_connections
+    assert manager.order_subscribers["o1"] == {ids["a"], ids["b"]}
+    assert slow.closed_code == 1013
+
+
+def test_ready_order_fanout_is_scoped_to_city_and_cell():
+    from routes.courier_ready_orders import ReadyOrderSubscriptions
+
+    subs = ReadyOrderSubscriptions(precision=5)
+    near, far, city_wide, other_city, no_city = (_FakeWebSocket() for _ in range(5))
+    subs.subscribe(near, "c1", "Niğde", 37.966, 34.679)
+    subs.subscribe(far, "c2", "Nigde", 38.60, 35.20)
+    subs.subscribe(city_wide, "c3", "niğde")
+    subs.subscribe(other_city, "c4", "Ankara", 39.93, 32.85)
+    subs.subscribe(no_city, "c5", "")
+
+    def receivers(*args):
+        return {ws for _, ws in subs.targets(*args)}
+
+    assert receivers("Niğde", 37.967, 34.680) == {near, city_wide, no_city}
+    assert receivers("Niğde") == {near, far, city_wide, no_city}
+    assert receivers(None) == {near, far, city_wide, other_city, no_city}
+
+    subs.move(far, 37.966, 34.679)
+    assert far in receivers("Niğde", 37.967, 34.680)
+    subs.unsubscribe(near)
+    assert near not in receivers("Niğde", 37.967, 34.680)
+    assert subs.get_stats()["connections"] == 4
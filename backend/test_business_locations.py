@@ -0,0 +1,57 @@
+"""
+Unit tests for denormalized business / pickup locations
+"""
+
+import asyncio
+
+from services import business_locations
+from services.business_locations import build_pickup_fields, geo_point
+
+
+def test_geo_point_is_lng_lat():
+    assert geo_point(37.96, 34.67) == {"type": "Point", "coordinates": [34.67, 37.96]}
+    assert geo_point(None, 34.67) is None
+
+
+def test_pickup_fields_from_business_or_user(fake_db):
+    db = fake_db
+    db.businesses.docs = [{"_id": "b1", "name": "Kebapçı", "address": "Merkez",
+                           "location": {"type": "Point", "coordinates": [34.67, 37.96]}}]
+    db.users.docs = [{"id": "b2", "role": "business", "business_name": "Pideci", "lat": 38.0, "lng": 34.7}]
+
+    fields = asyncio.run(build_pickup_fields(db, "b1"))
+    assert fields["pickup_location"]["coordinates"] == [34.67, 37.96]
+    assert fields["pickup_business_name"] == "Kebapçı"
+
+    fields = asyncio.run(build_pickup_fields(db, "b2"))
+    assert fields["pickup_location"]["coordinates"] == [34.7, 38.0]
+    assert fields["pickup_address"] == "Address not available"
+
+    # No location known: the order simply stays out of the geo feed
+    assert asyncio.run(build_pickup_fields(db, "missing")) == {}
+
+
+def test_backfill_invalidates_cached_principals(monkeypatch, fake_db):
+    invalidated = []
+    monkeypatch.setattr(business_locations.principals, "invalidate_user", invalidated.append)
+    db = fake_db
+    db.users.docs = [
+        {"id": "b1", "role": "business", "lat": 38.0, "lng": 34.7},
+        {"id": "b2", "role": "business", "location": geo_point(37.9, 34.6)},
+        {"id": "b3", "role": "business"},
+    ]
+
+    assert asyncio.run(business_locations.backfill_business_locations(db)) == 1
+    assert db.users.docs[0]["location"]["coordinates"] == [34.7, 38.0]
+    assert invalidated == ["b1"]
+
+
+def test_pickup_area_is_business_city_and_lat_lng(fake_db):
+    db = fake_db
+    db.businesses.docs = [{"_id": "b1", "city": "Niğde",
+                           "location": {"type": "Point", "coordinates": [34.67, 37.96]}}]
+    db.users.docs = [{"id": "b2", "role": "business", "city": "Aksaray"}]
+
+    assert asyncio.run(business_locations.pickup_area(db, "b1")) == ("Niğde", {"lat": 37.96, "lng": 34.67})
+    assert asyncio.run(business_locations.pickup_area(db, "b2")) == ("Aksaray", None)
+    assert asyncio.run(business_locations.pickup_area(db, "missing")) == (None, None)
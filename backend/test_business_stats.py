@@ -0,0 +1,109 @@
+"""
+Unit tests for incremental business stats rollups
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services import business_stats
+
+
+def _order(db, order_id, customer_id, status):
+    order = {
+        "_id": order_id,
+        "business_id": "b1",
+        "customer_id": customer_id,
+        "status": status,
+        "created_at": datetime(2024, 5, 1, 19, 42, tzinfo=timezone.utc),
+        "total_amount": 100.0,
+        "totals": {"grand": 110.0},
+        "items": [{"name": "Adana Kebap", "quantity": 2, "price": 50.0}]
+    }
+    db.orders.docs.append(order)
+    return order
+
+
+def _transition(db, order, status):
+    order["status"] = status
+    return asyncio.run(business_stats.sync_order(db, dict(order)))
+
+
+def test_transitions_move_contribution_between_statuses(fake_db):
+    db = fake_db
+    order = _order(db, "o1", "c1", "pending")
+
+    assert asyncio.run(business_stats.sync_order(db, dict(order)))
+    bucket = db[business_stats.HOURLY].docs[0]
+    assert bucket["hour"] == datetime(2024, 5, 1, 19, tzinfo=timezone.utc)
+    assert bucket["dashboard_orders"] == 1
+    assert bucket.get("orders", 0) == 0
+
+    _transition(db, order, "confirmed")
+    assert bucket["orders"] == 1
+    assert bucket["revenue"] == 100.0
+    assert bucket["confirmed_revenue"] == 110.0
+    assert bucket["dashboard_orders"] == 1
+
+    # Re-syncing the same state is a no-op (stats_status already current)
+    assert not asyncio.run(business_stats.sync_order(db, dict(db.orders.docs[0])))
+
+    _transition(db, order, "cancelled")
+    assert bucket["orders"] == 0
+    assert bucket["dashboard_orders"] == 0
+    assert bucket["confirmed_revenue"] == 0
+    assert business_stats.top_products([bucket]) == []
+
+
+def test_stale_sync_loses_cas(fake_db):
+    db = fake_db
+    order = _order(db, "o1", "c1", "confirmed")
+    stale = dict(order)
+    assert asyncio.run(business_stats.sync_order(db, dict(order)))
+    # A second writer holding the same pre-sync snapshot must not count it again
+    assert not asyncio.run(business_stats.sync_order(db, stale))
+    assert db[business_stats.HOURLY].docs[0]["orders"] == 1
+
+
+def test_customers_counted_once_and_windows_summed(fake_db):
+    db = fake_db
+    for order_id, customer in (("o1", "c1"), ("o2", "c1"), ("o3", "c2")):
+        _transition(db, _order(db, order_id, customer, "created"), "delivered")
+
+    assert asyncio.run(business_stats.get_total_customers(db, "b1")) == 2
+
+    buckets = db[business_stats.HOURLY].docs
+    day = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    totals = business_stats.sum_buckets(buckets, day, day + timedelta(days=1))
+    assert totals == {"orders": 3, "revenue": 300.0, "delivered": 3}
+    assert business_stats.top_products(buckets) == [{"name": "Adana Kebap", "sales": 6, "revenue": 300.0}]
+    assert business_stats.peak_hours(buckets, day) == [{"hour": "19:00-20:00", "orders": 3}]
+
+
+def test_failed_sync_is_resumed_from_pending_marker(fake_db):
+    db = fake_db
+    order = _order(db, "o1", "c1", "confirmed")
+    hourly = db[business_stats.HOURLY]
+    hourly.fail_times = 1
+    try:
+        asyncio.run(business_stats.sync_order(db, dict(order)))
+    except ConnectionError:
+        pass
+
+    stored = db.orders.docs[0]
+    assert stored["stats_status"] == "confirmed"
+    assert stored["stats_pending"]["admin"] is True  # admin facts already written
+    # Later syncs wait for the pending transition instead of stacking on it
+    stored["status"] = "delivered"
+    assert not asyncio.run(business_stats.sync_order(db, dict(stored)))
+
+    assert asyncio.run(business_stats.resume_pending(db, dict(stored)))
+    assert "stats_pending" not in stored
+    assert hourly.docs[0]["orders"] == 1
+    assert asyncio.run(business_stats.get_total_customers(db, "b1")) == 1
+    all_time = db["admin_daily_facts"].find_one({"_id": "all"})
+    assert asyncio.run(all_time)["orders"] == 1
+    # A second reconciler holding the old marker loses the re-claim
+    assert not asyncio.run(business_stats.resume_pending(db, {**stored, "stats_pending": {"at": 0}}))
+
+    assert asyncio.run(business_stats.sync_order(db, dict(stored)))
+    assert hourly.docs[0]["delivered"] == 1
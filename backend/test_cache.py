@@ -0,0 +1,111 @@
+"""
+Unit tests for the async cache layer (L1 tier + single-flight)
+Runs against AsyncNullCache - no Redis required
+"""
+
+import asyncio
+import time
+
+from config import cache
+from config.cache import (
+    LocalCache,
+    async_cache_delete,
+    async_cache_get,
+    async_cache_get_many,
+    async_cache_get_or_load,
+    async_cache_set,
+    get_cache_stats,
+)
+
+
+class TestLocalCache:
+    """Test the in-process TTL/LRU tier"""
+
+    def test_lru_eviction(self):
+        l1 = LocalCache(max_entries=2, max_ttl_s=60)
+        l1.set("a", 1)
+        l1.set("b", 2)
+        assert l1.get("a") == (True, 1)  # refresh "a"
+        l1.set("c", 3)
+        assert l1.get("b") == (False, None)
+        assert l1.get("a") == (True, 1)
+        assert l1.evictions == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        l1 = LocalCache(max_entries=10, max_ttl_s=5)
+        now = time.monotonic()
+        monkeypatch.setattr(cache.time, "monotonic", lambda: now)
+        l1.set("k", "v", ttl=60)  # capped at max_ttl_s
+        monkeypatch.setattr(cache.time, "monotonic", lambda: now + 6)
+        assert l1.get("k") == (False, None)
+        assert l1.expirations == 1
+
+
+class TestAsyncCache:
+    """Test the async read/write API and single-flight loading"""
+
+    def setup_method(self):
+        cache.local_cache.clear()
+
+    def test_set_get_delete(self):
+        async def run():
+            await async_cache_set("menu:1", {"items": [1, 2]}, ttl=10)
+            assert await async_cache_get("menu:1") == {"items": [1, 2]}
+            await async_cache_delete("menu:1")
+            assert await async_cache_get("menu:1") is None
+
+        asyncio.run(run())
+
+    def test_single_flight(self):
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        async def run():
+            return await asyncio.gather(*[
+                async_cache_get_or_load("discovery:x", loader, ttl=10) for _ in range(20)
+            ])
+
+        before = get_cache_stats()["coalesced"]
+        results = asyncio.run(run())
+        assert len(calls) == 1
+        assert all(r == {"value": 42} for r in results)
+        assert get_cache_stats()["coalesced"] - before == 19
+
+    def test_loader_error_propagates_to_waiters(self):
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(*[
+                async_cache_get_or_load("broken", loader) for _ in range(3)
+            ], return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, ValueError) for r in results)
+        assert "broken" not in cache._inflight
+
+    def test_get_many_reads_l1_then_one_redis_mget(self, monkeypatch):
+        class _Redis:
+            def __init__(self):
+                self.mgets = []
+
+            async def mget(self, keys):
+                self.mgets.append(list(keys))
+                return ['{"name":"remote"}' if key == "u:2" else None for key in keys]
+
+        redis = _Redis()
+        monkeypatch.setattr(cache, "async_redis", redis)
+
+        async def run():
+            cache.local_cache.set("u:1", {"name": "local"})
+            return await async_cache_get_many(["u:1", "u:2", "u:3", "u:2"])
+
+        assert asyncio.run(run()) == {"u:1": {"name": "local"}, "u:2": {"name": "remote"}}
+        assert redis.mgets == [["u:2", "u:3"]]
+        # The Redis hit is now in L1
+        assert cache.local_cache.get("u:2") == (True, {"name": "remote"})
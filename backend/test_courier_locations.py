@@ -0,0 +1,70 @@
+"""
+Unit tests for the courier location write-behind buffer
+"""
+
+import asyncio
+
+from services.courier_locations import (
+    LocationHistoryBuffer,
+    build_history_doc,
+    build_location_payload,
+)
+
+
+def _docs(n, courier_id="courier-1"):
+    return [build_history_doc(build_location_payload(courier_id, 41.0 + i * 1e-4, 29.0)) for i in range(n)]
+
+
+def test_writes_through_when_not_started(fake_db):
+    db = fake_db
+    buffer = LocationHistoryBuffer(flush_interval_s=60, max_batch=100, max_pending=1000)
+    asyncio.run(buffer.add(db, _docs(2)))
+    assert len(db.courier_locations.docs) == 2
+
+
+def test_coalesces_points_from_all_couriers(fake_db):
+    db = fake_db
+    buffer = LocationHistoryBuffer(flush_interval_s=60, max_batch=100, max_pending=1000)
+
+    async def run():
+        buffer.start(db)
+        for courier in ("a", "b", "c"):
+            await buffer.add(db, _docs(5, courier))
+        assert db.courier_locations.calls["insert_many"] == 0
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert db.courier_locations.calls["insert_many"] == 1
+    assert len(db.courier_locations.docs) == 15
+
+
+def test_size_trigger_flushes_early(fake_db):
+    db = fake_db
+    buffer = LocationHistoryBuffer(flush_interval_s=60, max_batch=10, max_pending=1000)
+
+    async def run():
+        buffer.start(db)
+        await buffer.add(db, _docs(10))
+        await asyncio.sleep(0.01)
+        assert len(db.courier_locations.docs) == 10
+        await buffer.stop()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_retried_and_bounded(fake_db):
+    db = fake_db
+    db.courier_locations.fail_times = 1
+    buffer = LocationHistoryBuffer(flush_interval_s=60, max_batch=100, max_pending=8)
+
+    async def run():
+        buffer.start(db)
+        await buffer.add(db, _docs(10))
+        await buffer.flush()  # fails, points stay pending
+        assert buffer.get_stats()["pending"] == 8
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert buffer.stats["dropped"] == 2
+    assert buffer.stats["failures"] == 1
+    assert len(db.courier_locations.docs) == 8
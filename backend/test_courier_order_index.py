@@ -0,0 +1,59 @@
+"""
+Unit tests for the in-process courier -> active orders index
+"""
+
+import asyncio
+
+from realtime.courier_orders import CourierOrderIndex
+
+
+def test_transitions_assign_and_release():
+    index = CourierOrderIndex()
+    index.apply_order({"_id": "o1", "status": "courier_assigned", "courier_id": "c1"})
+    index.apply_order({"_id": "o2", "status": "assigned", "assigned_courier_id": "c1"})
+    assert index.active_orders("c1") == {"o1", "o2"}
+
+    index.apply_order({"_id": "o1", "status": "delivered", "courier_id": "c1"})
+    assert index.active_orders("c1") == {"o2"}
+
+    # Reassignment moves the order to the new courier
+    index.apply_order({"_id": "o2", "status": "picked_up", "courier_id": "c2"})
+    assert index.active_orders("c1") == set()
+    assert index.active_orders("c2") == {"o2"}
+    assert index.get_stats() == {"couriers": 1, "active_orders": 1}
+
+
+def test_rebuild_replays_transitions_seen_during_load(fake_db):
+    index = CourierOrderIndex()
+    fake_db.orders.docs = [{"_id": "o1", "status": "picked_up", "courier_id": "c1"}]
+
+    # o1 is delivered while the rebuild query is in flight
+    def delivered_meanwhile():
+        index.apply_order({"_id": "o1", "status": "delivered", "courier_id": "c1"})
+
+    fake_db.orders.on_load = delivered_meanwhile
+    count = asyncio.run(index.rebuild(fake_db))
+    assert count == 0
+    assert index.active_orders("c1") == set()
+
+
+def test_transitions_reach_other_workers_over_the_event_bus():
+    from realtime.event_bus import EventBus
+
+    async def run():
+        bus = EventBus()
+        here, there = CourierOrderIndex(), CourierOrderIndex()
+        await here.attach(bus)
+        await there.attach(bus)
+        await here.order_changed({"_id": "o1", "status": "picked_up", "courier_id": "c1", "total": 90})
+        assert here.active_orders("c1") == {"o1"}
+        await asyncio.sleep(0.01)
+        assert there.active_orders("c1") == {"o1"}
+
+        await here.order_changed({"_id": "o1", "status": "delivered", "courier_id": "c1"})
+        await asyncio.sleep(0.01)
+        assert there.active_orders("c1") == set()
+        await there.detach()
+        await bus.stop()
+
+    asyncio.run(run())
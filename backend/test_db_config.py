@@ -0,0 +1,111 @@
+"""
+Unit tests for the shared MongoDB client configuration (no server needed)
+The replica-set test runs only when MONGO_REPLICA_SET_URL points at one,
+e.g. docker compose -f docker-compose.replica.yml up -d and
+MONGO_REPLICA_SET_URL=mongodb://localhost:27018,localhost:27019,localhost:27020/?replicaSet=rs0
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from pymongo import MongoClient, monitoring
+
+from config.db import (
+    PoolMetrics, _database_name, get_database, get_db, get_discovery_db, get_hot_db, get_reports_db,
+    read_preference
+)
+
+
+def test_workload_handles_share_one_client():
+    default = get_database()
+    reports = get_reports_db()
+    hot = get_hot_db()
+    assert default is get_db()
+    assert reports.client is default.client is hot.client
+    assert hot.write_concern.document == {"w": 1}
+
+
+def test_read_preference_names():
+    assert read_preference("secondaryPreferred").mongos_mode == "secondaryPreferred"
+    assert read_preference("primary_preferred").mongos_mode == "primaryPreferred"
+    with pytest.raises(ValueError):
+        read_preference("fastest")
+
+
+def test_max_staleness():
+    assert read_preference("secondaryPreferred", 120).max_staleness == 120
+    assert read_preference("secondaryPreferred", -1).max_staleness == -1
+    # Primary reads are never stale; the bound is dropped
+    assert read_preference("primary", 120).max_staleness == -1
+    with pytest.raises(ValueError):
+        read_preference("nearest", 30)
+
+
+def test_reports_and_discovery_read_from_secondaries():
+    assert get_db().read_preference.mongos_mode == "primary"
+    for handle in (get_reports_db(), get_discovery_db()):
+        assert handle.read_preference.mongos_mode == "secondaryPreferred"
+        assert handle.read_preference.max_staleness >= 90
+
+
+def test_pool_metrics_track_checkouts():
+    metrics = PoolMetrics()
+    event = SimpleNamespace(address=("db1", 27017), reason="timeout")
+    metrics.connection_created(event)
+    metrics.connection_check_out_started(event)
+    metrics.connection_checked_out(event)
+    metrics.connection_check_out_started(event)
+    metrics.connection_check_out_failed(event)
+    metrics.connection_checked_in(event)
+
+    server = metrics.snapshot()["db1:27017"]
+    assert server["open"] == 1
+    assert server["checked_out"] == 0
+    assert server["max_checked_out"] == 1
+    assert server["waiting"] == 0
+    assert server["check_out_failed_timeout"] == 1
+
+
+class _FindListener(monitoring.CommandListener):
+    def __init__(self):
+        self.finds = []
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.finds.append(event.connection_id)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.mark.skipif(not os.getenv("MONGO_REPLICA_SET_URL"), reason="needs a replica set (MONGO_REPLICA_SET_URL)")
+def test_reports_reads_go_to_a_secondary():
+    listener = _FindListener()
+    client = MongoClient(os.environ["MONGO_REPLICA_SET_URL"], event_listeners=[listener])
+    try:
+        database = client.get_database("kuryecini_replica_test")
+        database.admin_daily_facts.insert_one({"_id": "probe"})
+        primary = client.primary
+
+        reports = client.get_database(
+            "kuryecini_replica_test", read_preference=get_reports_db().read_preference
+        )
+        reports.admin_daily_facts.find_one({})
+        database.admin_daily_facts.find_one({})
+
+        assert listener.finds[0] != primary  # reports handle -> secondary
+        assert listener.finds[1] == primary  # default handle -> primary
+    finally:
+        client.drop_database("kuryecini_replica_test")
+        client.close()
+
+
+def test_database_name_comes_from_url_path_only(monkeypatch):
+    # DB_NAME belongs to other modules (config.py, routes/ai_*) and must not redirect server.py
+    monkeypatch.setenv("DB_NAME", "delivertr_database")
+    assert _database_name("mongodb://localhost:27017/kuryecini_prod?retryWrites=true") == "kuryecini_prod"
+    assert _database_name("mongodb://localhost:27017") == "kuryecini"
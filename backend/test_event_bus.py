@@ -0,0 +1,179 @@
+"""
+Unit tests for the event bus transports
+Two EventBus instances stand in for two workers sharing a Redis broker
+"""
+
+import asyncio
+import fnmatch
+
+from realtime.event_bus import COALESCE, EventBus, RedisPubSubTransport
+
+
+class _FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.queue = asyncio.Queue()
+        self.patterns = []
+
+    async def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+        self.broker.pubsubs.append(self)
+        self.broker.subscribes += 1
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.broker.pubsubs.remove(self)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.pubsubs = []
+        self.subscribes = 0
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _FakePubSub(self)
+
+    async def publish(self, channel, message):
+        for pubsub in self.pubsubs:
+            if any(fnmatch.fnmatch(channel, p) for p in pubsub.patterns):
+                await pubsub.queue.put({"type": "pmessage", "channel": channel, "data": message})
+
+
+def test_redis_transport_fans_out_across_processes():
+    async def run():
+        redis = _FakeRedis()
+        worker_a, worker_b = EventBus(), EventBus()
+        await worker_a.start(RedisPubSubTransport(redis, "test:"))
+        await worker_b.start(RedisPubSubTransport(redis, "test:"))
+        await asyncio.sleep(0)
+
+        received_a, received_b = [], []
+
+        async def on_a(data):
+            received_a.append(data)
+
+        async def on_b(data):
+            received_b.append(data)
+
+        await worker_a.subscribe("business:b1", on_a)
+        await worker_b.subscribe("business:b1", on_b)
+
+        await worker_a.publish("business:b1", {"event_type": "order.created", "order_id": "o1"})
+        await asyncio.sleep(0.01)
+
+        await worker_a.stop()
+        await worker_b.stop()
+        return received_a, received_b
+
+    received_a, received_b = asyncio.run(run())
+    # Local delivery happens once (own echo is skipped), remote worker gets it via Redis
+    assert [e["order_id"] for e in received_a] == ["o1"]
+    assert [e["order_id"] for e in received_b] == ["o1"]
+
+
+def test_redis_listener_stays_subscribed_on_idle_channel(monkeypatch):
+    monkeypatch.setattr(RedisPubSubTransport, "poll_timeout_s", 0.01)
+
+    async def run():
+        redis = _FakeRedis()
+        publisher, listener = EventBus(), EventBus()
+        await publisher.start(RedisPubSubTransport(redis, "test:"))
+        await listener.start(RedisPubSubTransport(redis, "test:"))
+        received = []
+
+        async def on_event(data):
+            received.append(data)
+
+        await listener.subscribe("business:b1", on_event)
+        await asyncio.sleep(0.1)  # several idle poll timeouts
+        await publisher.publish("business:b1", {"event_type": "order.created", "order_id": "o2"})
+        await asyncio.sleep(0.03)
+
+        await publisher.stop()
+        await listener.stop()
+        return redis.subscribes, received
+
+    subscribes, received = asyncio.run(run())
+    assert subscribes == 2  # one per worker, no resubscribe after idle timeouts
+    assert [e["order_id"] for e in received] == ["o2"]
+
+
+def test_in_memory_transport_delivers_locally():
+    async def run():
+        bus = EventBus()
+        await bus.start()
+        received = []
+
+        async def on_event(data):
+            received.append(data)
+
+        await bus.subscribe("orders:all", on_event)
+        await bus.publish("orders:all", {"event_type": "order.status_changed"})
+        await asyncio.sleep(0.01)
+        await bus.stop()
+        return received
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_publish_does_not_wait_for_slow_subscriber():
+    async def run():
+        bus = EventBus()
+        release = asyncio.Event()
+        fast = []
+
+        async def slow(data):
+            await release.wait()
+
+        async def on_fast(data):
+            fast.append(data)
+
+        await bus.subscribe("business:b1", slow)
+        await bus.subscribe("business:b1", on_fast)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bus.publish("business:b1", {"event_type": "order.created", "order_id": "o1"})
+        elapsed = loop.time() - started
+        await asyncio.sleep(0.01)
+
+        release.set()
+        await bus.stop()
+        return elapsed, fast
+
+    elapsed, fast = asyncio.run(run())
+    assert elapsed < 0.05
+    assert len(fast) == 1
+
+
+def test_bounded_queue_policies():
+    async def run():
+        bus = EventBus()
+        blocked = asyncio.Event()
+
+        async def stuck(data):
+            await blocked.wait()
+
+        await bus.subscribe("orders:all", stuck, max_queue=2)
+        await bus.subscribe("business:b1", stuck, max_queue=2, policy=COALESCE)
+        await asyncio.sleep(0)
+
+        for i in range(5):
+            await bus.publish("orders:all", {"event_type": "order.created", "order_id": f"o{i}"})
+        for status in ("confirmed", "ready", "courier_pending"):
+            await bus.publish("business:b1", {"event_type": "order.status_changed", "order_id": "o1", "new_status": status})
+        metrics = bus.get_metrics()
+        await bus.stop()
+        return metrics
+
+    metrics = asyncio.run(run())
+    # orders:all: publish never yields, so 5 events into a queue of 2 drop the 3 oldest
+    assert metrics["dropped"] == 3
+    # business:b1: later status changes replaced the queued one
+    assert metrics["coalesced"] == 2
+    assert metrics["queue_depth"] == 3
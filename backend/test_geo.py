@@ -0,0 +1,66 @@
+"""
+Unit tests for the vectorized geo kernels
+"""
+
+import math
+
+import numpy as np
+
+from utils import geo
+
+
+def _scalar_haversine(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * geo.EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _points(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(40.8, 41.2, n), rng.uniform(28.6, 29.4, n)  # around İstanbul
+
+
+def test_haversine_matches_scalar_formula_and_broadcasts():
+    lats, lngs = _points(1000)
+    distances = geo.haversine_m(41.0, 29.0, lats, lngs)
+    assert distances.shape == (1000,)
+    expected = [_scalar_haversine(41.0, 29.0, lat, lng) for lat, lng in zip(lats[:50], lngs[:50])]
+    np.testing.assert_allclose(distances[:50], expected, rtol=1e-9)
+
+    # Kadıköy -> Beşiktaş across the Bosphorus is about 6 km
+    assert 5500 < float(geo.haversine_m(40.9903, 29.0290, 41.0422, 29.0067)) < 6500
+    assert float(geo.haversine_m(41.0, 29.0, 41.0, 29.0)) == 0.0
+
+
+def test_bearing():
+    np.testing.assert_allclose(
+        geo.bearing_deg(0, 0, [1, 0, -1, 0], [0, 1, 0, -1]), [0, 90, 180, 270], atol=1e-9
+    )
+
+
+def test_bounding_box_contains_radius_and_wraps_antimeridian():
+    lats, lngs = _points(2000)
+    box = geo.bounding_box(41.0, 29.0, 5000)
+    within = geo.haversine_m(41.0, 29.0, lats, lngs) <= 5000
+    assert within.any()
+    assert not (within & ~geo.in_bounding_box(lats, lngs, box)).any()
+
+    box = geo.bounding_box(0.0, 179.99, 5000)
+    assert geo.in_bounding_box([0.0, 0.0], [-179.99, 170.0], box).tolist() == [True, False]
+
+
+def test_k_nearest():
+    lats, lngs = _points(5000)
+    distances = geo.haversine_m(41.0, 29.0, lats, lngs)
+
+    indices, nearest = geo.k_nearest(41.0, 29.0, lats, lngs, 10)
+    assert indices.tolist() == np.argsort(distances, kind="stable")[:10].tolist()
+    assert (np.diff(nearest) >= 0).all()
+
+    indices, nearest = geo.k_nearest(41.0, 29.0, lats, lngs, 10_000, max_distance_m=3000)
+    assert set(indices.tolist()) == set(np.flatnonzero(distances <= 3000).tolist())
+    assert (nearest <= 3000).all()
+
+    empty, _ = geo.k_nearest(41.0, 29.0, [], [], 5)
+    assert empty.size == 0
@@ -0,0 +1,34 @@
+"""
+Unit tests for ETag revalidation helpers
+"""
+
+from starlette.requests import Request
+
+from utils.http_cache import etag_json_response, etag_matches
+
+
+def _request(if_none_match=None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_etag_round_trip_returns_304():
+    first = etag_json_response(_request(), {"clusters": [], "zoom": 12})
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    second = etag_json_response(_request(etag), {"clusters": [], "zoom": 12})
+    assert second.status_code == 304
+    assert second.body == b""
+
+    changed = etag_json_response(_request(etag), {"clusters": [], "zoom": 13})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_weak_and_list_matching():
+    assert etag_matches(_request('W/"abc", "def"'), '"abc"')
+    assert etag_matches(_request("*"), '"abc"')
+    assert not etag_matches(_request('"abd"'), '"abc"')
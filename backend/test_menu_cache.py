@@ -0,0 +1,81 @@
+"""
+Unit tests for the per-business menu response cache
+"""
+
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from config import cache
+from services import menu_cache, menu_catalog
+
+
+def _request(**headers):
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/business/public/b1/menu", "headers": raw})
+
+
+def setup_function():
+    cache.local_cache.clear()
+    menu_cache._versions.clear()
+
+
+def test_build_runs_once_per_version_and_bump_changes_etag(monkeypatch, fake_db):
+    monkeypatch.setattr(menu_catalog, "schedule_refresh", lambda db, business_id: None)
+    db = fake_db
+    menu = [{"id": "p1", "name": "Döner", "price": 90.0}]
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return list(menu)
+
+    async def serve(**headers):
+        return await menu_cache.cached_menu_response(_request(**headers), db, "b1", "public", build)
+
+    first = asyncio.run(serve())
+    second = asyncio.run(serve())
+    assert len(builds) == 1
+    assert json.loads(first.body) == menu
+    assert first.headers["etag"] == second.headers["etag"]
+    assert db[menu_cache.VERSIONS].calls["find_one"] == 1  # version is cached briefly too
+
+    revalidated = asyncio.run(serve(if_none_match=first.headers["etag"]))
+    assert revalidated.status_code == 304
+    assert len(builds) == 1
+
+    menu.append({"id": "p2", "name": "Ayran", "price": 20.0})
+    asyncio.run(menu_cache.menu_changed(db, "b1"))
+    changed = asyncio.run(serve(if_none_match=first.headers["etag"]))
+    assert changed.status_code == 200
+    assert len(builds) == 2
+    assert changed.headers["etag"] != first.headers["etag"]
+    assert len(json.loads(changed.body)) == 2
+
+
+def test_variants_are_cached_separately_and_errors_are_not_cached(fake_db):
+    db = fake_db
+    builds_before = menu_cache.get_stats()["builds"]
+    calls = {"n": 0}
+
+    async def failing():
+        calls["n"] += 1
+        raise RuntimeError("db down")
+
+    async def serve(variant, build):
+        return await menu_cache.cached_menu_response(_request(), db, "b1", variant, build)
+
+    for _ in range(2):
+        try:
+            asyncio.run(serve("products", failing))
+        except RuntimeError:
+            pass
+    assert calls["n"] == 2
+
+    async def public():
+        return {"variant": "public"}
+
+    assert json.loads(asyncio.run(serve("public", public)).body) == {"variant": "public"}
+    assert json.loads(asyncio.run(serve("public", public)).body) == {"variant": "public"}
+    assert menu_cache.get_stats()["builds"] - builds_before == 3  # two failures, one cached build
@@ -0,0 +1,123 @@
+"""
+Unit tests for public menu catalog snapshots
+"""
+
+import asyncio
+import gzip
+import json
+
+from starlette.requests import Request
+
+from services import menu_catalog
+from utils.http_cache import precompressed_response
+
+
+def _business(business_id, city, **fields):
+    return {"id": business_id, "role": "business", "kyc_status": "approved", "is_active": True,
+            "business_name": business_id.upper(), "city": city, **fields}
+
+
+def _seed(db):
+    db.users.docs = [
+        _business("b1", "İstanbul"), _business("b2", "Ankara"), _business("b3", "Ankara", is_active=False)
+    ]
+    db.products.docs = [
+        {"id": "p1", "business_id": "b1", "name": "Döner", "price": 90, "is_available": True},
+        {"id": "p2", "business_id": "b2", "name": "Pide", "price": 120, "is_available": True},
+        {"id": "p3", "business_id": "b2", "name": "Ayran", "price": 20, "is_available": False},
+        {"id": "p4", "business_id": "b3", "name": "Çorba", "price": 60, "is_available": True},
+    ]
+    return db
+
+
+def _public(db, city=None):
+    entry = asyncio.run(menu_catalog.get_snapshot(db, menu_catalog.PUBLIC, city))
+    return entry, json.loads(gzip.decompress(entry["body"]))
+
+
+def setup_function():
+    menu_catalog._entries.clear()
+
+
+def test_full_build_per_city_and_global(fake_db):
+    db = _seed(fake_db)
+    assert asyncio.run(menu_catalog.rebuild_all(db)) == 3
+
+    _, everything = _public(db)
+    assert [r["id"] for r in everything["restaurants"]] == ["b1", "b2"]  # b3 is inactive
+    assert [item["name"] for item in everything["restaurants"][1]["menu"]] == ["Pide"]
+
+    _, ankara = _public(db, "ankara")
+    assert ankara["count"] == 1
+
+    legacy = asyncio.run(menu_catalog.get_snapshot(db, menu_catalog.LEGACY))
+    assert len(json.loads(menu_catalog.plain_body(legacy))) == 4
+
+    _, nowhere = _public(db, "Rize")
+    assert nowhere == {"restaurants": [], "count": 0, "message": "Aktif restoran bulunamadı."}
+
+
+def test_refresh_rebuilds_only_touched_restaurant_and_changes_etag(fake_db):
+    db = _seed(fake_db)
+    asyncio.run(menu_catalog.rebuild_all(db))
+    before, _ = _public(db)
+    snapshots = db[menu_catalog.SNAPSHOTS]
+    istanbul_key = menu_catalog.snapshot_key(menu_catalog.PUBLIC, menu_catalog.city_key("İstanbul"))
+    istanbul_generation = asyncio.run(snapshots.find_one({"_id": istanbul_key}))["built_generation"]
+
+    db.products.docs.append({"id": "p5", "business_id": "b2", "name": "Lahmacun", "price": 50, "is_available": True})
+    assert asyncio.run(menu_catalog.refresh_restaurants(db, ["b2"]))
+
+    after, everything = _public(db)
+    assert after["etag"] != before["etag"]
+    assert [item["name"] for item in everything["restaurants"][1]["menu"]] == ["Pide", "Lahmacun"]
+    # Other cities' snapshots are left alone
+    assert asyncio.run(snapshots.find_one({"_id": istanbul_key}))["built_generation"] == istanbul_generation
+
+    # A business that isn't in the catalog rebuilds nothing
+    assert not asyncio.run(menu_catalog.refresh_restaurants(db, ["unknown"]))
+
+
+def _request(**headers):
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/menus/public", "headers": raw})
+
+
+def test_precompressed_response_negotiates_and_revalidates():
+    entry = menu_catalog.encode({"restaurants": []})
+    plain = lambda: menu_catalog.plain_body(entry)
+
+    zipped = precompressed_response(_request(accept_encoding="gzip, br"), entry["etag"], entry["body"], plain)
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.body == entry["body"]
+
+    identity = precompressed_response(_request(), entry["etag"], entry["body"], plain)
+    assert json.loads(identity.body) == {"restaurants": []}
+    assert identity.headers["etag"] == entry["etag"] != zipped.headers["etag"]
+
+    cached = precompressed_response(
+        _request(accept_encoding="gzip", if_none_match=zipped.headers["etag"]), entry["etag"], entry["body"], plain
+    )
+    assert cached.status_code == 304
+
+
+def test_refresh_scheduled_during_a_flush_is_not_stranded(monkeypatch):
+    monkeypatch.setattr(menu_catalog.settings, "MENU_CATALOG_REFRESH_DELAY_S", 0)
+    refreshed = []
+
+    async def refresh(db, business_ids):
+        refreshed.append(sorted(business_ids))
+        if business_ids == ["a"]:
+            # A write lands while the first refresh is running
+            menu_catalog.schedule_refresh(db, "b")
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(menu_catalog, "refresh_restaurants", refresh)
+
+    async def run():
+        menu_catalog.schedule_refresh(None, "a")
+        await menu_catalog._flush_task
+
+    asyncio.run(run())
+    assert refreshed == [["a"], ["b"]]
+    assert not menu_catalog._pending
@@ -0,0 +1,72 @@
+"""
+Unit tests for nearby business discovery (pipeline shape, cursors, cell cache)
+"""
+
+import asyncio
+
+import pytest
+
+from config import cache
+from services import nearby_discovery
+
+
+def _row(business_id, distance):
+    return {
+        "_id": f"oid-{business_id}", "id": business_id, "business_name": business_id.upper(),
+        "address": "Kadıköy", "location": {"type": "Point", "coordinates": [29.03, 40.99]},
+        "is_active": True, "distance": distance,
+        "menu_preview": [{"_id": "m1", "title": "Döner", "price": 90, "category": "Ana Yemek"}]
+    }
+
+
+def setup_function():
+    cache.local_cache.clear()
+
+
+def test_one_aggregation_per_page_and_cell_cache(fake_db):
+    db = fake_db
+    db.users.docs = [_row("b1", 120.0), _row("b2", 300.0), _row("b3", 300.0)]
+
+    page = asyncio.run(nearby_discovery.find_page(db, 40.9901, 29.0301, 5000, 2))
+    assert [b["id"] for b in page["businesses"]] == ["b1", "b2"]
+    assert page["businesses"][0]["menu_items"][0]["title"] == "Döner"
+    assert page["next_cursor"]
+    assert len(db.users.pipelines) == 1
+    pipeline = db.users.pipelines[0]
+    assert "$geoNear" in pipeline[0]
+    assert any("$lookup" in stage for stage in pipeline)
+
+    # A nearby customer in the same geohash cell reuses the page
+    asyncio.run(nearby_discovery.find_page(db, 40.99011, 29.03011, 5000, 2))
+    assert len(db.users.pipelines) == 1
+
+    # The next page continues after the last business of this one
+    db.users.docs = [_row("b3", 300.0)]
+    second = asyncio.run(nearby_discovery.find_page(db, 40.9901, 29.0301, 5000, 2, page["next_cursor"]))
+    assert [b["id"] for b in second["businesses"]] == ["b3"]
+    assert second["next_cursor"] is None
+    geo_near = db.users.pipelines[1][0]["$geoNear"]
+    assert geo_near["minDistance"] == 300.0
+
+
+def test_cursor_is_bound_to_cell_and_radius():
+    cell, _, _ = nearby_discovery.search_cell(40.99, 29.03)
+    cursor = nearby_discovery.encode_cursor(cell, 5000, 250.5, "b7")
+    assert nearby_discovery.decode_cursor(cursor, cell, 5000) == (250.5, "b7")
+
+    with pytest.raises(nearby_discovery.InvalidCursor):
+        nearby_discovery.decode_cursor(cursor, cell, 3000)
+    other_cell, _, _ = nearby_discovery.search_cell(39.92, 32.85)
+    with pytest.raises(nearby_discovery.InvalidCursor):
+        nearby_discovery.decode_cursor(cursor, other_cell, 5000)
+    with pytest.raises(nearby_discovery.InvalidCursor):
+        nearby_discovery.decode_cursor("not-a-cursor", cell, 5000)
+
+
+def test_unpaged_request_returns_everything_in_range(fake_db):
+    db = fake_db
+    db.users.docs = [_row(f"b{i}", 100.0 * i) for i in range(30)]
+    page = asyncio.run(nearby_discovery.find_page(db, 40.99, 29.03, 5000, None))
+    assert len(page["businesses"]) == 30
+    assert page["next_cursor"] is None
+    assert not any("$limit" in stage for stage in db.users.pipelines[0][:3])
@@ -0,0 +1,28 @@
+"""
+Unit tests for counter-based order code allocation
+"""
+
+import asyncio
+
+from utils import order_code
+from utils.order_code import OrderCodeAllocator, format_order_code
+
+
+def test_codes_are_unique_across_workers_with_one_round_trip_per_block(fake_db):
+    db = fake_db
+    workers = [OrderCodeAllocator(block_size=10), OrderCodeAllocator(block_size=10)]
+
+    async def draw():
+        return await asyncio.gather(*(workers[i % 2].next_code(db) for i in range(40)))
+
+    codes = asyncio.run(draw())
+    assert len(set(codes)) == 40
+    assert db[order_code.COUNTERS].calls["find_one_and_update"] == 4
+    assert all(code.startswith("KC-") and len(code.split("-")[2]) == 6 for code in codes)
+
+
+def test_format_is_a_bijection_on_small_ranges():
+    codes = {format_order_code("20250101", seq) for seq in range(5000)}
+    assert len(codes) == 5000
+    # Consecutive numbers don't produce consecutive-looking codes
+    assert format_order_code("20250101", 0)[-6:] != "000000"
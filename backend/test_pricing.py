@@ -0,0 +1,83 @@
+"""
+Unit tests for the cart pricing engine
+"""
+
+import asyncio
+
+import pytest
+
+from services import pricing
+
+
+BUSINESS = {"id": "b1", "delivery_fee": 15, "min_order_amount": 100}
+
+
+@pytest.fixture
+def db(fake_db):
+    fake_db.products.docs = [
+        {"id": "p1", "business_id": "b1", "name": "Lahmacun", "price": 40, "category": "Pide"},
+        {"_id": "p2", "business_id": "b1", "title": "Ayran", "price": 10},
+        {"id": "p3", "business_id": "b1", "name": "Künefe", "price": 80, "is_available": False},
+        {"id": "p4", "business_id": "b2", "name": "Pizza", "price": 120},
+    ]
+    return fake_db
+
+
+def _price(db, items):
+    return asyncio.run(pricing.price_cart(db, BUSINESS, items))
+
+
+def test_prices_whole_basket_with_one_query(db):
+    quote = _price(db, [
+        {"product_id": "p1", "quantity": 2, "notes": "acılı"},
+        {"id": "p2", "quantity": 3},
+    ])
+    assert db.products.calls["find"] == 1
+    assert [line["name"] for line in quote["items"]] == ["Lahmacun", "Ayran"]
+    assert quote["items"][0]["notes"] == "acılı"
+    assert quote["subtotal"] == 110.0
+    assert quote["grand"] == 125.0
+    assert not quote["below_minimum"]
+
+
+@pytest.mark.parametrize("items, status", [
+    ([{"product_id": "missing", "quantity": 1}], 404),
+    ([{"product_id": "p3", "quantity": 1}], 400),  # unavailable
+    ([{"product_id": "p4", "quantity": 1}], 400),  # another restaurant's product
+    ([{"product_id": "p1", "quantity": 0}], 400),
+    ([], 400),
+])
+def test_invalid_baskets_raise(db, items, status):
+    with pytest.raises(pricing.PricingError) as error:
+        _price(db, items)
+    assert error.value.status_code == status
+
+
+def test_minimum_and_coupons(db):
+    quote = _price(db, [{"product_id": "p1", "quantity": 2}])
+    with pytest.raises(pricing.PricingError):
+        pricing.check_minimum(quote)
+
+    cart_coupon = pricing.apply_coupon(quote, {"type": "percent", "scope": "cart", "value": 10})
+    assert cart_coupon["discount"] == 8.0
+    assert cart_coupon["grand"] == 72.0 + 15
+
+    item_coupon = pricing.apply_coupon(quote, {"type": "fixed", "scope": "item", "value": 5})
+    assert item_coupon["discount"] == 10.0
+    assert item_coupon["items"][0]["final_unit_price"] == 35
+
+
+def test_strict_requires_ownership_and_availability(fake_db):
+    db = fake_db
+    db.products.docs = [
+        {"id": "m1", "business_id": "b1", "name": "Mercimek", "price": 30, "is_available": True},
+        {"id": "m2", "name": "Sahipsiz", "price": 30, "is_available": True},
+        {"id": "m3", "business_id": "b1", "name": "Eski", "price": 30},
+    ]
+    assert asyncio.run(pricing.price_cart(db, BUSINESS, [{"product_id": "m1"}], strict=True))["subtotal"] == 30.0
+    for product_id in ("m2", "m3"):
+        # Legacy products without the fields still price in the lenient mode
+        assert _price(db, [{"product_id": product_id}])["subtotal"] == 30.0
+        with pytest.raises(pricing.PricingError) as error:
+            asyncio.run(pricing.price_cart(db, BUSINESS, [{"product_id": product_id}], strict=True))
+        assert error.value.status_code == 400
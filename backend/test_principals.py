@@ -0,0 +1,70 @@
+"""
+Unit tests for the authenticated principal cache
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from config.cache import LocalCache
+from services import principals
+
+
+def setup_function():
+    principals.principal_cache.clear()
+    principals._subject_by_id.clear()
+
+
+def _request():
+    return SimpleNamespace(state=SimpleNamespace())
+
+
+def test_request_memo_and_ttl_cache_share_one_lookup(fake_db):
+    db = fake_db
+    db.users.docs = [{"id": "u1", "email": "a@example.com", "role": "courier", "kyc_status": "pending"}]
+    request = _request()
+
+    user = asyncio.run(principals.load_principal(db, "a@example.com", request))
+    assert user["role"] == "courier"
+    # Callers get copies - mutating one doesn't leak into the cache
+    user["id"] = "changed"
+    again = asyncio.run(principals.load_principal(db, "a@example.com", request))
+    assert again["id"] == "u1"
+    assert asyncio.run(principals.load_principal(db, "a@example.com", _request()))["id"] == "u1"
+    assert db.users.calls["find_one"] == 1
+
+
+def test_invalidate_by_id_drops_cached_principal(fake_db):
+    db = fake_db
+    db.users.docs = [{"id": "u1", "email": "a@example.com", "kyc_status": "pending"}]
+    asyncio.run(principals.load_principal(db, "a@example.com"))
+
+    db.users.docs[0]["kyc_status"] = "approved"
+    principals.invalidate_user("u1")
+    user = asyncio.run(principals.load_principal(db, "a@example.com"))
+    assert user["kyc_status"] == "approved"
+    assert db.users.calls["find_one"] == 2
+
+
+def test_unknown_subject_is_not_cached(fake_db):
+    db = fake_db
+    assert asyncio.run(principals.load_principal(db, "nobody@example.com")) is None
+    db.users.docs.append({"id": "u2", "email": "nobody@example.com"})
+    assert asyncio.run(principals.load_principal(db, "nobody@example.com"))["id"] == "u2"
+
+
+def test_id_index_overflow_evicts_oldest_ids_only(monkeypatch, fake_db):
+    monkeypatch.setattr(principals, "principal_cache", LocalCache(2, 60))
+    monkeypatch.setattr(principals, "_subject_by_id", LocalCache(2, 60))
+    db = fake_db
+    db.users.docs = [{"id": f"u{n}", "email": f"{n}@example.com", "kyc_status": "pending"} for n in range(3)]
+    for n in range(3):
+        asyncio.run(principals.load_principal(db, f"{n}@example.com"))
+
+    # u0 fell out of both caches; u1 and u2 are still reachable by id
+    assert len(principals._subject_by_id) == 2
+    for user in db.users.docs:
+        user["kyc_status"] = "approved"
+    principals.invalidate_user("u1")
+    principals.invalidate_user("u2")
+    assert asyncio.run(principals.load_principal(db, "1@example.com"))["kyc_status"] == "approved"
+    assert asyncio.run(principals.load_principal(db, "2@example.com"))["kyc_status"] == "approved"
@@ -0,0 +1,78 @@
+"""
+Unit tests for Turkish-folded restaurant search grams and the stable discovery queries
+"""
+
+import asyncio
+
+from services import restaurant_search
+from utils.text_search import edge_grams, fold, query_grams
+
+
+def test_turkish_folding_and_grams():
+    assert fold("ÇİĞ KÖFTE") == fold("çiğ köfte") == "cig kofte"
+    assert fold("ISPARTA Işık") == "isparta isik"
+    assert fold("Café") == "cafe"
+
+    grams = set(edge_grams(["Çiğ Köfteci Ali Usta", "Türk Mutfağı"]))
+    for query in ("cig kof", "KÖFTECİ", "türk", "mutfagi ali"):
+        assert set(query_grams(query)) <= grams, query
+    assert not set(query_grams("pizza")) <= grams
+    # Single letters carry no usable gram
+    assert query_grams("a") == []
+
+
+def test_build_query_and_geo_pipeline():
+    assert restaurant_search.build_query() == {"is_open": True}
+    assert restaurant_search.build_query("  ") == {"is_open": True}
+    # Single letters can't use a gram - anchored prefix on the same index instead
+    assert restaurant_search.build_query("Ç") == {"is_open": True, "search_grams": {"$regex": "^c"}}
+    assert restaurant_search.build_query("a kebap") == {"is_open": True, "$and": [
+        {"search_grams": {"$all": ["kebap"]}}, {"search_grams": {"$regex": "^a"}}
+    ]}
+    assert restaurant_search.build_query("?!") == {"is_open": True, "search_grams": {"$in": []}}
+    assert restaurant_search.build_query("Döner Kebap") == {
+        "is_open": True, "search_grams": {"$all": ["doner", "kebap"]}
+    }
+
+    pipeline = restaurant_search.nearby_pipeline(41.0, 29.0, {"is_open": True}, 40, 20)
+    geo_near = pipeline[0]["$geoNear"]
+    assert geo_near["near"]["coordinates"] == [29.0, 41.0]
+    assert geo_near["maxDistance"] == restaurant_search.MAX_DISTANCE_M
+    assert pipeline[1:3] == [{"$skip": 40}, {"$limit": 20}]
+
+
+def _stale(doc, expression):
+    # Stand-ins for the $expr filters: location or search_source out of date
+    if expression["$ne"][1] == restaurant_search._COORDINATES_EXPR:
+        return (doc.get("location") or {}).get("coordinates") != [doc["longitude"], doc["latitude"]]
+    return doc.get("search_source") != restaurant_search.search_source(doc)
+
+
+def test_backfill_only_reindexes_changed_restaurants(fake_db):
+    fresh = {"_id": "r1", "name": "Pide Evi", "cuisine": "Pide", "latitude": 41.0, "longitude": 29.0}
+    fresh.update(restaurant_search.search_fields(fresh))
+    renamed = {"_id": "r2", "name": "Kebapçı Halil", "cuisine": "Kebap", "search_source": "Halil|Kebap"}
+    businesses = fake_db.businesses
+    businesses.docs = [fresh, renamed, {"_id": "r3", "name": "Mantı Durağı"}]
+    businesses.expr = _stale
+
+    assert asyncio.run(restaurant_search.backfill_restaurant_search(fake_db, batch_size=1)) == 2
+    assert businesses.calls["bulk_write"] == 2
+    assert fresh["location"] == {"type": "Point", "coordinates": [29.0, 41.0]}
+    assert "kebapci" in businesses.docs[1]["search_grams"]
+    assert businesses.docs[2]["search_source"] == "Mantı Durağı|"
+
+
+def test_backfill_moves_location_when_coordinates_change(fake_db):
+    moved = {"_id": "r1", "name": "Pide Evi", "latitude": 41.1, "longitude": 29.2,
+             "location": {"type": "Point", "coordinates": [29.0, 41.0]}}
+    moved.update(restaurant_search.search_fields(moved))
+    unplaced = {"_id": "r2", "name": "Mantı Durağı", "latitude": None, "longitude": None}
+    unplaced.update(restaurant_search.search_fields(unplaced))
+    businesses = fake_db.businesses
+    businesses.docs = [moved, unplaced]
+    businesses.expr = _stale
+
+    assert asyncio.run(restaurant_search.backfill_restaurant_search(fake_db)) == 0
+    assert moved["location"] == {"type": "Point", "coordinates": [29.2, 41.1]}
+    assert "location" not in unplaced
@@ -0,0 +1,48 @@
+"""
+Unit tests for the batched user summary loader
+"""
+
+import asyncio
+
+from config import cache
+from services import user_summaries
+from services.user_summaries import UserSummaryLoader, display_name
+
+
+def setup_function():
+    cache.local_cache.clear()
+
+
+def _queried_ids(db):
+    return [sorted(query["id"]["$in"]) for query in db.users.queries]
+
+
+def test_one_query_per_request_and_cache_across_requests(fake_db):
+    db = fake_db
+    db.users.docs = [
+        {"id": "c1", "first_name": "Ayşe", "last_name": "Yılmaz", "phone": "555"},
+        {"id": "b1", "business_name": "Kebapçı"}
+    ]
+    orders = [
+        {"customer_id": "c1", "business_id": "b1"},
+        {"customer_id": "c1", "business_id": "b1"},
+        {"customer_id": "ghost", "business_id": None}
+    ]
+
+    users = UserSummaryLoader(db)
+    asyncio.run(users.load_for_orders(orders, "customer_id", "business_id"))
+    assert _queried_ids(db) == [["b1", "c1", "ghost"]]
+    assert display_name(users.get("c1")) == "Ayşe Yılmaz"
+    assert users.get("b1")["business_name"] == "Kebapçı"
+    assert users.get("ghost") is None
+    assert display_name(users.get("ghost"), "Müşteri") == "Müşteri"
+
+    # The next poll is served from the summary cache (missing ids included)
+    again = UserSummaryLoader(db)
+    asyncio.run(again.load_for_orders(orders, "customer_id", "business_id"))
+    assert len(db.users.queries) == 1
+    assert again.get("c1")["phone"] == "555"
+
+    user_summaries.invalidate("c1")
+    asyncio.run(UserSummaryLoader(db).load_many(["c1", "b1"]))
+    assert _queried_ids(db)[-1] == ["c1"]
@@ -0,0 +1,79 @@
+"""
+Vectorized geo kernels (NumPy)
+Distances and bearings are computed for whole arrays of points at once; all
+inputs broadcast, so one origin against N points (or N pairs) is a single
+call. Scalars in give 0-d results; use float() for a plain number.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+# Metres per degree of latitude (and of longitude at the equator)
+_M_PER_DEG = np.pi * EARTH_RADIUS_M / 180.0
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in metres between (lat1, lng1) and (lat2, lng2)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing_deg(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Initial bearing from point 1 to point 2 in degrees (0 = north, clockwise)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    dlng = lng2 - lng1
+    y = np.sin(dlng) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlng)
+    return (np.degrees(np.arctan2(y, x)) + 360.0) % 360.0
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) enclosing every point within radius_m"""
+    dlat = radius_m / _M_PER_DEG
+    cos_lat = np.cos(np.radians(lat))
+    # Near the poles the box spans every longitude
+    dlng = 180.0 if cos_lat < 1e-9 else min(180.0, radius_m / (_M_PER_DEG * cos_lat))
+    return (max(-90.0, lat - dlat), lng - dlng, min(90.0, lat + dlat), lng + dlng)
+
+
+def in_bounding_box(lats, lngs, box: Tuple[float, float, float, float]) -> np.ndarray:
+    """Boolean mask of the points inside box (longitudes may wrap the antimeridian)"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    min_lat, min_lng, max_lat, max_lng = box
+    # Longitude offset from the box's west edge, wrapped to [0, 360)
+    offset = (lngs - min_lng) % 360.0
+    return (lats >= min_lat) & (lats <= max_lat) & (offset <= max_lng - min_lng)
+
+
+def k_nearest(
+    lat: float,
+    lng: float,
+    lats,
+    lngs,
+    k: int,
+    max_distance_m: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (indices, distances in metres) of the k points closest to (lat, lng), nearest first
+    With max_distance_m, points outside its bounding box are dropped before
+    any trigonometry and farther points are excluded from the result.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    candidates = np.arange(lats.size)
+    if max_distance_m is not None:
+        candidates = candidates[in_bounding_box(lats, lngs, bounding_box(lat, lng, max_distance_m))]
+    distances = haversine_m(lat, lng, lats[candidates], lngs[candidates])
+    if max_distance_m is not None:
+        within = distances <= max_distance_m
+        candidates, distances = candidates[within], distances[within]
+    if k < distances.size:
+        # Partial selection of the k smallest, then sort only those
+        top = np.argpartition(distances, k)[:k]
+        candidates, distances = candidates[top], distances[top]
+    order = np.argsort(distances, kind="stable")
+    return candidates[order], distances[order]
@@ -0,0 +1,78 @@
+"""
+Minimal geohash encoding for area-keyed lookups (subscriptions, caches)
+Precision 5 ~ 4.9km x 4.9km cells, 6 ~ 1.2km x 0.6km
+"""
+from typing import List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def encode(lat: float, lng: float, precision: int = 5) -> str:
+    """Encode a coordinate to a geohash cell of the given length"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # even bits encode longitude
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def bounds(cell: str) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in cell:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def neighbors(cell: str) -> List[str]:
+    """The cell itself plus its 8 surrounding cells (same precision)"""
+    min_lat, min_lng, max_lat, max_lng = bounds(cell)
+    lat = (min_lat + max_lat) / 2
+    lng = (min_lng + max_lng) / 2
+    dlat = max_lat - min_lat
+    dlng = max_lng - min_lng
+
+    cells = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            n_lat = lat + i * dlat
+            if not -90.0 <= n_lat <= 90.0:
+                continue
+            # Wrap across the antimeridian
+            n_lng = (lng + j * dlng + 180.0) % 360.0 - 180.0
+            neighbor = encode(n_lat, n_lng, len(cell))
+            if neighbor not in cells:
+                cells.append(neighbor)
+    return cells
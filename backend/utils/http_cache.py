@@ -0,0 +1,100 @@
+"""
+HTTP revalidation helpers (ETag / If-None-Match)
+Responses are serialized once; the ETag is a hash of the body unless the
+caller supplies one (e.g. from a version counter) so it can skip the work.
+"""
+import hashlib
+import json
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def make_etag(body: bytes, weak: bool = False) -> str:
+    digest = hashlib.sha1(body).hexdigest()[:20]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this representation"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110): W/ prefix is ignored for GET revalidation
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def json_bytes(content: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def etag_body_response(
+    request: Request,
+    etag: str,
+    body: bytes,
+    cache_control: str = "private, no-cache"
+) -> Response:
+    """Already-serialized JSON body with its ETag (304 when the client has it)"""
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+def etag_json_response(
+    request: Request,
+    content: Any,
+    cache_control: str = "private, no-cache",
+    etag: Optional[str] = None
+) -> Response:
+    """
+    JSON response with an ETag; 304 without a body when the client has it
+    no-cache (the default) means clients always revalidate, cheaply.
+    """
+    if etag and etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    body = json_bytes(content)
+    return etag_body_response(request, etag or make_etag(body), body, cache_control)
+
+
+def precompressed_response(
+    request: Request,
+    etag: str,
+    gzip_body: bytes,
+    plain_body: Callable[[], bytes],
+    cache_control: str = "private, no-cache"
+) -> Response:
+    """
+    JSON response from a body gzipped ahead of time
+    Clients accepting gzip get the stored bytes as-is; others get plain_body().
+    The gzip representation carries its own strong ETag ("...-gz").
+    """
+    gzip_ok = "gzip" in request.headers.get("accept-encoding", "").lower()
+    if gzip_ok:
+        etag = etag[:-1] + '-gz"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if gzip_ok:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=gzip_body, media_type="application/json", headers=headers)
+    return Response(content=plain_body(), media_type="application/json", headers=headers)
@@ -1,41 +1,98 @@
 """
 Order Code Generator
-Format: KC-YYYYMMDD-XXXXXX (6-digit base36 random)
+Format: KC-YYYYMMDD-XXXXXX (6 base36 characters)
+
+Codes come from a per-day counter (order_code_counters, one document per UTC
+day). A worker reserves a block of sequence numbers with a single $inc and
+hands them out locally, so creating an order needs no read-before-write and
+two workers can never draw the same code. The sequence number is scrambled
+with a fixed bijection on the 6-character space so codes don't read as a
+running order count (cosmetic, not a secret).
 """
-import random
+import asyncio
 import string
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from config.settings import settings
+
+COUNTERS = "order_code_counters"
 
-def generate_order_code() -> str:
+_CHARS = string.digits + string.ascii_uppercase
+_WIDTH = 6
+_SPACE = len(_CHARS) ** _WIDTH  # codes per day
+# seq -> (seq * _MULTIPLIER + _OFFSET) % _SPACE is a bijection (multiplier coprime to 36)
+_MULTIPLIER = 1664525
+_OFFSET = 1013904223
+
+
+def format_order_code(day: str, seq: int) -> str:
     """
-    Generate unique order code in format: KC-YYYYMMDD-XXXXXX
+    Order code for the day's seq-th number
     Example: KC-20251021-3F2A9B
     """
-    date_part = datetime.now().strftime("%Y%m%d")
-    
-    # Generate 6-character random code (base36: 0-9, A-Z)
-    chars = string.digits + string.ascii_uppercase
-    random_part = ''.join(random.choices(chars, k=6))
-    
-    return f"KC-{date_part}-{random_part}"
+    if not 0 <= seq < _SPACE:
+        raise ValueError(f"Order code sequence exhausted for {day}")
+    value = (seq * _MULTIPLIER + _OFFSET) % _SPACE
+    chars = []
+    for _ in range(_WIDTH):
+        value, digit = divmod(value, len(_CHARS))
+        chars.append(_CHARS[digit])
+    return f"KC-{day}-{''.join(reversed(chars))}"
+
+
+class OrderCodeAllocator:
+    """Hands out order codes from blocks reserved on the per-day counter"""
+
+    def __init__(self, block_size: Optional[int] = None):
+        self.block_size = max(1, block_size or settings.ORDER_CODE_BLOCK_SIZE)
+        self._day: Optional[str] = None
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _reserve(self, db, day: str):
+        counter = await db[COUNTERS].find_one_and_update(
+            {"_id": day},
+            {"$inc": {"seq": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._day = day
+        self._end = counter["seq"]
+        self._next = self._end - self.block_size
+
+    async def next_code(self, db) -> str:
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        async with self._lock:
+            # Unused numbers of a previous day's / worker's block are simply skipped
+            if self._day != day or self._next >= self._end:
+                await self._reserve(db, day)
+            seq = self._next
+            self._next += 1
+        return format_order_code(day, seq)
+
+
+order_code_allocator = OrderCodeAllocator()
 
 
 async def generate_unique_order_code(db) -> str:
     """
-    Generate unique order code with collision check
-    Retries up to 5 times if collision occurs
+    Next unique order code (one counter round trip per block, none otherwise)
     """
-    max_attempts = 5
-    
-    for attempt in range(max_attempts):
-        code = generate_order_code()
-        
-        # Check if code already exists
-        existing = await db.orders.find_one({"order_code": code})
-        
-        if not existing:
-            return code
-    
-    # Fallback: add timestamp microseconds if all attempts failed
-    timestamp = datetime.now().strftime("%H%M%S%f")[:8]
-    return f"KC-{datetime.now().strftime('%Y%m%d')}-{timestamp}"
+    return await order_code_allocator.next_code(db)
+
+
+async def ensure_order_code_indexes(db):
+    """Unique order_code index - backstop against codes issued before the counter"""
+    try:
+        await db.orders.create_index(
+            "order_code",
+            unique=True,
+            partialFilterExpression={"order_code": {"$type": "string"}},
+            name="order_code_unique"
+        )
+    except Exception as e:
+        print(f"⚠️ Order code index setup failed: {e}")
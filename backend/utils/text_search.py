@@ -0,0 +1,50 @@
+"""
+Turkish-aware search folding and edge n-grams
+Text is lowercased with Turkish casing (I -> ı, İ -> i) and then folded to
+ASCII (ç->c, ğ->g, ı->i, ö->o, ş->s, ü->u, other accents dropped), so
+"ÇİĞ KÖFTE", "çiğ köfte" and "cig kofte" all match. Documents store the
+prefixes of every folded word; a query matches when each of its words is
+one of them, which a multikey index answers directly.
+"""
+import re
+import unicodedata
+from typing import Iterable, List
+
+MIN_GRAM = 2
+MAX_GRAM = 12
+
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_TURKISH_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Lowercase + accent-fold a string with Turkish casing rules"""
+    if not text:
+        return ""
+    text = text.translate(_TURKISH_UPPER).lower().translate(_TURKISH_FOLD)
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(fold(text))
+
+
+def edge_grams(values: Iterable[str]) -> List[str]:
+    """Sorted prefixes (MIN_GRAM..MAX_GRAM chars) of every word in values"""
+    grams = set()
+    for value in values:
+        for word in words(value or ""):
+            for size in range(MIN_GRAM, min(len(word), MAX_GRAM) + 1):
+                grams.add(word[:size])
+    return sorted(grams)
+
+
+def query_grams(query: str) -> List[str]:
+    """Grams a document must all contain to match a search query (empty = no usable words)"""
+    grams = []
+    for word in words(query or ""):
+        if len(word) >= MIN_GRAM and word[:MAX_GRAM] not in grams:
+            grams.append(word[:MAX_GRAM])
+    return grams
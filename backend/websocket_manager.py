@@ -4,12 +4,13 @@ Canlı yayın (tercih WS, fallback SSE)
 """
 from fastapi import WebSocket, WebSocketDisconnect
 from typing import Dict, List, Set
-import json
 import asyncio
 from datetime import datetime, timezone
 import uuid
 import logging
 
+from realtime.broadcast import broadcast_text, evict_all, serialize
+
 logger = logging.getLogger(__name__)
 
 class WebSocketManager:
@@ -149,23 +150,7 @@ class WebSocketManager:
             **data
         }
         
-        # Send to all order subscribers
-        disconnected = []
-        for connection_id in self.order_subscribers[order_id].copy():
-            try:
-                websocket = self.active_connections.get(connection_id)
-                if websocket:
-                    await websocket.send_text(json.dumps(message))
-                    logger.info(f"📡 ORDER UPDATE SENT: {order_id} to {connection_id}")
-                else:
-                    disconnected.append(connection_id)
-            except Exception as e:
-                logger.error(f"❌ Error sending order update to {connection_id}: {e}")
-                disconnected.append(connection_id)
-        
-        # Clean up disconnected
-        for connection_id in disconnected:
-            await self.disconnect(connection_id)
+        await self._broadcast(self.order_subscribers[order_id], message, f"order {order_id}")
 
     async def send_courier_update(self, courier_id: str, data: dict):
         """
@@ -182,23 +167,34 @@ class WebSocketManager:
             **data
         }
         
-        # Send to all courier subscribers
-        disconnected = []
-        for connection_id in self.courier_subscribers[courier_id].copy():
-            try:
-                websocket = self.active_connections.get(connection_id)
-                if websocket:
-                    await websocket.send_text(json.dumps(message))
-                    logger.info(f"📡 COURIER UPDATE SENT: {courier_id} to {connection_id}")
-                else:
-                    disconnected.append(connection_id)
-            except Exception as e:
-                logger.error(f"❌ Error sending courier update to {connection_id}: {e}")
-                disconnected.append(connection_id)
+        await self._broadcast(self.courier_subscribers[courier_id], message, f"courier {courier_id}")
+
+    async def _broadcast(self, connection_ids: Set[str], message: dict, channel: str):
+        """
+        Serialize once and send to all subscribers concurrently
+        Subscribers that fail or exceed the send timeout are evicted so a slow
+        client cannot hold back updates for everyone else on the channel.
+        """
+        targets = []
+        missing = []
+        for connection_id in list(connection_ids):
+            websocket = self.active_connections.get(connection_id)
+            if websocket:
+                targets.append((connection_id, websocket))
+            else:
+                missing.append(connection_id)
+        
+        failed = await broadcast_text(targets, serialize(message))
+        logger.debug(f"📡 {channel} update sent to {len(targets) - len(failed)}/{len(targets)} subscribers")
+        
+        if failed:
+            logger.warning(f"⚠️ Evicting {len(failed)} slow/failed subscribers on {channel}")
+        sockets = [self.active_connections[cid] for cid in failed if cid in self.active_connections]
         
         # Clean up disconnected
-        for connection_id in disconnected:
+        for connection_id in failed + missing:
             await self.disconnect(connection_id)
+        await evict_all(sockets)
 
     async def send_courier_location_to_order_subscribers(self, order_id: str, courier_location: dict):
         """